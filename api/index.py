@@ -39,8 +39,10 @@ async def handler(request):
         }
     
     try:
-        # Обрабатываем обновление
+        # Обрабатываем обновление и дожидаемся фоновых загрузок:
+        # после ответа цикл событий будет закрыт
         await bot_instance.handle_webhook_update(body)
+        await bot_instance.drain()
         
         return {
             'statusCode': 200,
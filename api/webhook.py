@@ -10,6 +10,8 @@ src_path = os.path.join(parent_dir, 'src')
 if src_path not in sys.path:
     sys.path.append(src_path)
 
+from pydantic import ValidationError
+
 from bot.main import bot_instance
 
 
@@ -39,20 +41,34 @@ async def handler(request):
         }
     
     try:
-        # Обрабатываем обновление
-        await bot_instance.handle_webhook_update(body)
-        
+        # Проверяем и ставим в очередь - обработка идет в фоне, но первый
+        # короткий ответ обработчика может уйти прямо в теле ответа webhook
+        accepted, reply = await bot_instance.answer_webhook_update(body)
+    except ValidationError as e:
+        print(f"Invalid update: {e}")
         return {
-            'statusCode': 200,
-            'body': json.dumps({'status': 'ok'})
+            'statusCode': 400,
+            'body': json.dumps({'error': 'Invalid Telegram update'})
         }
-        
     except Exception as e:
         print(f"Error: {e}")
         return {
             'statusCode': 500,
             'body': json.dumps({'error': 'Internal server error'})
         }
+    
+    if not accepted:
+        # Очередь переполнена - Telegram повторит доставку позже
+        return {
+            'statusCode': 503,
+            'body': json.dumps({'error': 'Update queue is full'}),
+            'headers': {'Retry-After': '5'}
+        }
+    
+    return {
+        'statusCode': 200,
+        'body': json.dumps(reply or {'status': 'ok'})
+    }
 
 
 # Vercel entry point
@@ -84,10 +100,13 @@ def lambda_handler(event, context):
     
     try:
         result = loop.run_until_complete(handler(request))
+        # Ответ уходит только после возврата из функции, а цикл событий
+        # закрывается - поэтому здесь фоновую обработку нужно дождаться
+        loop.run_until_complete(bot_instance.drain())
         return {
             'statusCode': result['statusCode'],
             'body': result['body'],
-            'headers': {'Content-Type': 'application/json'}
+            'headers': {'Content-Type': 'application/json', **result.get('headers', {})}
         }
     finally:
         loop.close()
@@ -1,6 +1,8 @@
 import os
 import sys
 from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from pydantic import ValidationError
 import uvicorn
 import json
 import asyncio
@@ -8,7 +10,14 @@ import asyncio
 # Добавляем путь к src
 sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
 
+from aiogram.types import Update
+
 from bot.simple_bot import simple_bot
+from bot.webhook_reply import feed_with_reply
+from config.settings import settings
+from services.admission import AdmissionController
+from services.update_dedup import RecentUpdates
+from services.update_queue import UpdateQueue
 
 app = FastAPI()
 
@@ -22,12 +31,37 @@ async def get_bot():
         await bot.__aenter__()
     return bot
 
+async def process_update(update: Update):
+    """Обработка обновления в фоне"""
+    bot = await get_bot()
+    # Запросы, которые вернули обработчики (ответы команд, отказы лимита), отправляем сами
+    await feed_with_reply(bot.dp, bot.bot, update)
+
+# Очередь обновлений: webhook отвечает сразу, обработка идет в фоне
+update_queue = UpdateQueue(
+    process_update,
+    workers=settings.webhook_workers,
+    max_size=settings.webhook_queue_size,
+)
+
+# Нагрузка процесса для /health: обновления в очереди и задержка цикла событий
+admission = AdmissionController(
+    lambda: update_queue.size,
+    max_in_flight=settings.max_in_flight_jobs,
+    max_bytes=settings.max_in_flight_mb * 1024 * 1024,
+    max_loop_lag=settings.max_loop_lag_ms / 1000,
+)
+
+# Недавние update_id: повторные доставки Telegram не обрабатываются заново
+seen_updates = RecentUpdates(settings.update_dedup_size, settings.update_dedup_path)
+
 @app.on_event("startup")
 async def startup_event():
     """Инициализация бота при запуске"""
     global bot
     bot = simple_bot
     await bot.__aenter__()
+    admission.lag_monitor.ensure_started()
     print("🚀 Simple Telegram bot initialized for webhook mode")
 
 @app.get("/")
@@ -41,7 +75,17 @@ async def root():
 
 @app.get("/health")
 async def health():
-    return {"status": "healthy", "bot": "ready"}
+    # Перегруженный процесс отвечает 503, чтобы балансировщик не слал ему новую работу
+    ready = admission.ready
+    content = {
+        "status": "healthy",
+        "bot": "ready" if ready else "busy",
+        "ready": ready,
+        "load": admission.stats()
+    }
+    if not ready:
+        return JSONResponse(status_code=503, content=content)
+    return content
 
 @app.post("/webhook")
 async def webhook(request: Request):
@@ -52,18 +96,29 @@ async def webhook(request: Request):
         if not isinstance(data, dict) or 'update_id' not in data:
             return {"error": "Not a Telegram update"}
         
+        # Повторная доставка уже принятого обновления - ничего не делаем
+        if data['update_id'] in seen_updates:
+            return {"status": "ok"}
+        
         # Получаем инициализированный бот
         bot = await get_bot()
         
-        # Создаем временное сообщение для обработки
-        from aiogram.types import Update
-        update = Update.model_validate(data)
+        update = Update.model_validate(data, context={"bot": bot.bot})
         
-        # Обрабатываем обновление
-        await bot.dp.feed_update(bot.bot, update)
+        # Ставим обновление в очередь, не дожидаясь обработки
+        if not update_queue.submit(update):
+            return JSONResponse(
+                status_code=503,
+                content={"error": "Update queue is full"},
+                headers={"Retry-After": "5"}
+            )
+        seen_updates.add(update.update_id)
         
         return {"status": "ok"}
         
+    except ValidationError as e:
+        print(f"Invalid update: {e}")
+        return {"error": "Invalid Telegram update"}
     except Exception as e:
         print(f"Webhook error: {e}")
         return {"error": str(e)}
@@ -1,6 +1,8 @@
 import os
 import sys
 from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from pydantic import ValidationError
 import uvicorn
 import json
 
@@ -15,6 +17,20 @@ except ImportError as e:
     sys.path.append(os.path.join(os.path.dirname(__file__), 'src', 'bot'))
     from modern_bot import modern_bot
 
+from bot.webhook_reply import WebhookReply
+from config.settings import settings
+from services.update_queue import UpdateQueue
+
+# Очередь обновлений: webhook отвечает сразу, обработка идет в фоне
+async def process_queued(item):
+    await modern_bot.process_update(*item)
+
+update_queue = UpdateQueue(
+    process_queued,
+    workers=settings.webhook_workers,
+    max_size=settings.webhook_queue_size,
+)
+
 app = FastAPI(
     title="Modern Telegram Media Downloader",
     description="Advanced media downloader bot for Pinterest, TikTok, Instagram",
@@ -25,6 +41,7 @@ app = FastAPI(
 async def startup_event():
     """Инициализация бота при запуске"""
     await modern_bot.init_bot()
+    modern_bot.admission.lag_monitor.ensure_started()
     print("🚀 Modern Telegram Bot initialized for webhook mode")
 
 @app.get("/")
@@ -38,7 +55,17 @@ async def root():
 
 @app.get("/health")
 async def health():
-    return {"status": "healthy", "bot": "ready"}
+    # Перегруженный процесс отвечает 503, чтобы балансировщик не слал ему новую работу
+    ready = modern_bot.admission.ready
+    content = {
+        "status": "healthy",
+        "bot": "ready" if ready else "busy",
+        "ready": ready,
+        "load": modern_bot.admission.stats()
+    }
+    if not ready:
+        return JSONResponse(status_code=503, content=content)
+    return content
 
 @app.post("/webhook")
 async def webhook(request: Request):
@@ -49,11 +76,29 @@ async def webhook(request: Request):
         if not isinstance(data, dict) or 'update_id' not in data:
             return {"error": "Not a Telegram update"}
         
-        # Обрабатываем обновление
-        await modern_bot.handle_webhook_update(data)
+        # Повторная доставка уже принятого обновления - ничего не делаем
+        if modern_bot.is_duplicate(data):
+            return {"status": "ok", "bot": "modern"}
+        
+        update = modern_bot.parse_update(data)
+        
+        # Ставим обновление в очередь; первый короткий ответ обработчика
+        # может уйти прямо в теле ответа webhook
+        reply = WebhookReply()
+        if not update_queue.submit((update, reply)):
+            reply.close()
+            return JSONResponse(
+                status_code=503,
+                content={"error": "Update queue is full"},
+                headers={"Retry-After": "5"}
+            )
+        modern_bot.seen_updates.add(update.update_id)
         
-        return {"status": "ok", "bot": "modern"}
+        return await reply.wait(settings.webhook_reply_timeout) or {"status": "ok", "bot": "modern"}
         
+    except ValidationError as e:
+        print(f"Invalid update: {e}")
+        return {"error": "Invalid Telegram update"}
     except Exception as e:
         print(f"Webhook error: {e}")
         return {"error": str(e)}
@@ -0,0 +1,92 @@
+import os
+import sys
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from pydantic import ValidationError
+import uvicorn
+
+# Добавляем путь к src
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from config.settings import settings
+from bot.main import bot_instance
+from bot.handlers.media import admission
+from bot.workers import WorkerProcesses
+
+# Процесс uvicorn только принимает обновления и ставит задания в очередь,
+# загрузку и отправку выполняют отдельные процессы-воркеры
+workers = WorkerProcesses(settings.worker_processes)
+
+app = FastAPI(
+    title="Telegram Media Downloader",
+    description="Webhook frontend with separate download worker processes",
+    version="2.0"
+)
+
+@app.on_event("startup")
+async def startup_event():
+    """Инициализация бота и запуск воркеров"""
+    await bot_instance.init_bot()
+    admission.lag_monitor.ensure_started()
+    workers.start()
+    print(f"🚀 Webhook frontend started with {settings.worker_processes} download workers")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Остановка воркеров"""
+    await workers.stop()
+    bot_instance.seen_updates.flush()
+
+@app.get("/")
+async def root():
+    return {
+        "status": "Telegram Media Downloader is running",
+        "version": "2.0",
+        "workers": settings.worker_processes
+    }
+
+@app.get("/health")
+async def health():
+    # Перегруженный процесс отвечает 503, чтобы балансировщик не слал ему новую работу
+    ready = admission.ready
+    content = {
+        "status": "healthy",
+        "bot": "ready" if ready else "busy",
+        "ready": ready,
+        "load": admission.stats()
+    }
+    if not ready:
+        return JSONResponse(status_code=503, content=content)
+    return content
+
+@app.post("/webhook")
+async def webhook(request: Request):
+    try:
+        data = await request.json()
+
+        # Проверяем что это обновление от Telegram
+        if not isinstance(data, dict) or 'update_id' not in data:
+            return {"error": "Not a Telegram update"}
+
+        # Ставим обновление в очередь; первый короткий ответ обработчика
+        # может уйти прямо в теле ответа webhook
+        accepted, reply = await bot_instance.answer_webhook_update(data)
+        if not accepted:
+            return JSONResponse(
+                status_code=503,
+                content={"error": "Update queue is full"},
+                headers={"Retry-After": "5"}
+            )
+
+        return reply or {"status": "ok"}
+
+    except ValidationError as e:
+        print(f"Invalid update: {e}")
+        return {"error": "Invalid Telegram update"}
+    except Exception as e:
+        print(f"Webhook error: {e}")
+        return {"error": str(e)}
+
+if __name__ == "__main__":
+    port = int(os.getenv("PORT", 8080))
+    uvicorn.run(app, host="0.0.0.0", port=port)
@@ -36,8 +36,10 @@ async def async_handler(event: Dict[str, Any]) -> Dict[str, Any]:
         }
     
     try:
-        # Обрабатываем обновление
+        # Обрабатываем обновление и дожидаемся фоновых загрузок:
+        # после ответа цикл событий будет закрыт
         await bot_instance.handle_webhook_update(body)
+        await bot_instance.drain()
         
         return {
             'statusCode': 200,
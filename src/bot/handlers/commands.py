@@ -3,6 +3,8 @@ from aiogram.filters import Command
 from aiogram.types import Message, ReplyKeyboardMarkup, KeyboardButton
 from loguru import logger
 
+from bot.handlers.media import job_runner, mark_cancelled
+
 # Создаем роутер для обработки команд
 router = Router()
 
@@ -20,7 +22,7 @@ main_keyboard = ReplyKeyboardMarkup(
 @router.message(Command("start"))
 async def cmd_start(message: Message):
     """Обработчик команды /start"""
-    await message.answer(
+    return message.answer(
         "Добро пожаловать!\n\n"
         "Вы можете скинуть мне ссылку на пост в <b>Instagram</b>, <b>Pinterest</b> или <b>TikTok</b> откуда нужно выгрузить фото, видео и текст — через пару секунд эта фотка или видос будут у вас!\n\n"
         "На данный момент, я поддерживаю только фото, видео, карусели, текст и сторис из <b>Instagram</b>, <b>Pinterest</b> и <b>TikTok</b>!",
@@ -32,7 +34,7 @@ async def cmd_start(message: Message):
 @router.message(Command("donate"))
 async def cmd_donate(message: Message):
     """Обработчик команды /donate"""
-    await message.answer(
+    return message.answer(
         "👋 Нравится бот? Поддержите его автора донатом и получите в благодарность бонусную подписку!\n\n"
         "<b>Что она даёт:</b>\n"
         "— отключение рекламы;\n"
@@ -72,6 +74,7 @@ async def cmd_help(message: Message):
 🔧 <b>Команды:</b>
 /start - Начать работу
 /help - Эта справка
+/cancel - Отменить загрузки
 
 ❓ <b>Проблемы?</b>
 Если что-то не работает, проверьте:
@@ -80,19 +83,29 @@ async def cmd_help(message: Message):
 • Размер файла не превышает лимит
     """
     
-    await message.answer(help_text, reply_markup=main_keyboard)
+    return message.answer(help_text, reply_markup=main_keyboard)
+
+
+@router.message(Command("cancel"))
+async def cmd_cancel(message: Message):
+    """Обработчик команды /cancel: отменяет незавершенные загрузки пользователя в чате"""
+    cancelled = job_runner.cancel_for(message.from_user.id, message.chat.id)
+    if not cancelled:
+        return message.answer("🤷 Нет загрузок, которые можно отменить.")
+    await mark_cancelled(message.bot, cancelled, "⛔ Загрузка отменена")
+    return message.answer(f"⛔ Отменено загрузок: {len(cancelled)}")
 
 
 @router.message(F.text == "❓ Помощь")
 async def help_button(message: Message):
     """Обработчик кнопки помощи"""
-    await cmd_help(message)
+    return await cmd_help(message)
 
 
 @router.message(F.text == "📸 Отправить ссылку на фото/видео")
 async def send_link_button(message: Message):
     """Обработчик кнопки отправки ссылки"""
-    await message.answer(
+    return message.answer(
         "🔗 Отправьте мне ссылку на медиа из Pinterest, TikTok или Instagram.\n\n"
         "Просто вставьте ссылку в чат, и я всё скачаю! 🚀",
         reply_markup=main_keyboard
@@ -0,0 +1,97 @@
+import time
+from typing import List
+
+from aiogram import Router
+from aiogram.types import (
+    InlineQuery,
+    InlineQueryResultCachedPhoto,
+    InlineQueryResultCachedVideo,
+    InlineQueryResultsButton,
+)
+from loguru import logger
+
+from bot.handlers.media import (
+    admission,
+    cost_estimator,
+    file_ids,
+    get_platform_name,
+    is_valid_url,
+    job_runner,
+    membership,
+    scheduler,
+)
+from config.settings import settings
+from services.file_id_index import VIDEO, CachedMedia, media_key
+
+# Создаем роутер для inline-режима
+router = Router()
+
+# Повторная фоновая загрузка той же ссылки - не чаще раза в столько секунд
+WARM_RETRY_SECONDS = 600
+
+
+def build_results(platform: str, cached: List[CachedMedia]) -> list:
+    """Inline-результаты из file_id: Telegram отправляет их без загрузки файла"""
+    results = []
+    for i, media in enumerate(cached):
+        if media.kind == VIDEO:
+            results.append(InlineQueryResultCachedVideo(
+                id=str(i), video_file_id=media.file_id, title=f"🎬 {platform}: видео {i + 1}"
+            ))
+        else:
+            results.append(InlineQueryResultCachedPhoto(id=str(i), photo_file_id=media.file_id))
+    return results
+
+
+def start_warming(query: InlineQuery, url: str, key: str) -> bool:
+    """Ставит фоновую загрузку медиа в служебный чат; False - загрузка сейчас невозможна"""
+    user_id = query.from_user.id
+    if settings.inline_cache_chat_id is None or admission.check():
+        return False
+    if job_runner.outstanding_for(user_id) >= scheduler.max_queued_per_user:
+        return False
+
+    platform = get_platform_name(url)
+    # Ключ задания повторяется в пределах окна: набор запроса не плодит загрузки
+    job_key = f"warm:{key}:{int(time.time() // WARM_RETRY_SECONDS)}"
+    # Очередь заданий - по запросившему пользователю, а не по служебному чату:
+    # иначе все фоновые загрузки бота шли бы строго по одной
+    job_runner.enqueue(job_key, user_id, user_id, {
+        'warm': True,
+        'url': url,
+        'key': key,
+        'platform': platform,
+        'priority': membership.class_for(user_id),
+        'cost': cost_estimator.estimate(url, platform),
+    })
+    return True
+
+
+@router.inline_query()
+async def handle_inline_query(query: InlineQuery):
+    """Inline-режим: медиа по ссылке отдается из индекса file_id, без загрузки и ожидания в обработчике"""
+    url = query.query.strip()
+    if not is_valid_url(url):
+        return query.answer(
+            [],
+            cache_time=settings.inline_cache_time,
+            button=InlineQueryResultsButton(text="Вставьте ссылку на Pinterest, TikTok или Instagram", start_parameter="inline"),
+        )
+
+    key = media_key(url)
+    cached = file_ids.get(key)
+    if not cached:
+        # Медиа загружается воркером в фоне: отвечаем сразу, повторный запрос возьмет file_id из индекса
+        warming = start_warming(query, url, key)
+        logger.info(f"Inline query miss for {key}")
+        return query.answer(
+            [],
+            cache_time=0,
+            is_personal=True,
+            button=InlineQueryResultsButton(
+                text="⏳ Медиа готовится — повторите через пару секунд" if warming else "Скачать в личном чате с ботом",
+                start_parameter="inline",
+            ),
+        )
+
+    return query.answer(build_results(get_platform_name(url), cached), cache_time=settings.inline_cache_time)
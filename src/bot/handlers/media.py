@@ -1,12 +1,32 @@
 import re
 import asyncio
-from typing import Optional
-from aiogram import Router, types, F
-from aiogram.types import Message, BufferedInputFile
+import html
+from contextlib import AsyncExitStack
+from typing import Dict, List, Optional, Set, Tuple
+from aiogram import Bot, Router, types, F
+from aiogram.types import InputMediaDocument, InputMediaPhoto, InputMediaVideo, Message, Update
 from aiogram.exceptions import TelegramAPIError
 from loguru import logger
 
+from bot.middlewares.group_filter import is_group
+from bot.session import max_upload_mb, outbox
+from services.admission import AdmissionController
+from services.bulkhead import Bulkheads, KeyedSemaphore, parse_limits
+from services.delivery import PART_PREFIX, plan_delivery
+from services.download_scheduler import DEFAULT_LANES, FREE, DownloadScheduler, LaneConfig
 from services.enhanced_downloader import EnhancedMediaDownloader
+from services.file_id_index import PHOTO, VIDEO, CachedMedia, FileIdIndex, media_key
+from services.format_selector import FileTooLargeError
+from services.job_runner import JobRunner
+from services.job_cost import CostEstimator
+from services.job_store import JobStore, StoredJob
+from services.links import extract_urls, might_contain_link
+from services.outbound_limiter import LOW, send_priority
+from services.progress import DOWNLOAD, PROCESSING, UPLOAD, EditBudget, ProgressReporter, ProgressState, report
+from services.rate_limiter import FrequencyCap
+from services.priority import MembershipCache, parse_ids
+from services.image_processor import ImageProcessor, image_extension
+from services.video_processor import VideoProcessor
 from config.settings import settings
 
 # Создаем роутер для обработки медиа
@@ -17,8 +37,64 @@ PINTEREST_PATTERN = re.compile(r'https?://(www\.)?(pinterest\.com|pin\.it)/.+')
 TIKTOK_PATTERN = re.compile(r'https?://(www\.)?tiktok\.com/@.+')
 INSTAGRAM_PATTERN = re.compile(r'https?://(www\.)?(instagram\.com|instagr\.am)/.+')
 
-# Словарь для отслеживания состояния загрузки
-loading_states = {}
+# Очередь загрузок: общий пул воркеров, классы приоритета и справедливая очередь для каждого пользователя
+scheduler = DownloadScheduler(
+    workers=settings.download_workers,
+    max_queued_per_user=settings.max_queued_per_user,
+    idle_ttl=settings.user_state_ttl_seconds,
+    lanes=[
+        LaneConfig(lane.name, lane.weight, settings.free_worker_share if lane.name == FREE else lane.share)
+        for lane in DEFAULT_LANES
+    ],
+    max_wait=settings.max_queue_wait_seconds,
+)
+
+# Администраторы и поддержавшие проект обслуживаются в первую очередь
+membership = MembershipCache(
+    admins=parse_ids(settings.admin_ids),
+    supporters=parse_ids(settings.supporter_ids),
+    path=settings.supporters_file,
+)
+
+# Сообщение про донат пользователь видит не чаще раза в promo_interval_hours
+promo_cap = FrequencyCap(settings.promo_interval_hours * 3600)
+
+# Оценка размера медиа: короткие задания планировщик выполняет раньше
+cost_estimator = CostEstimator()
+
+# Постоянная очередь заданий: загрузки переживают перезапуск процесса
+job_store = JobStore(
+    settings.job_db_path,
+    lease_seconds=settings.job_lease_seconds,
+    max_attempts=settings.job_max_attempts,
+)
+
+# Одновременные загрузки одного пользователя по всем его сообщениям
+user_downloads = KeyedSemaphore(settings.links_per_user_concurrency)
+
+# file_id уже отправленных медиа: inline-режим отвечает из индекса без загрузки
+file_ids = FileIdIndex(settings.file_id_db_path)
+
+# Отдельные лимиты, соединения и потоки для каждой платформы: сбой одной не тормозит другие
+bulkheads = Bulkheads(
+    max_concurrent=settings.platform_concurrency,
+    max_connections=settings.platform_connections,
+    executor_workers=settings.platform_executor_workers,
+    limits=parse_limits(settings.platform_limits),
+)
+
+# Правки сообщений о ходе загрузки: общий бюджет на чат и на весь бот
+progress_budget = EditBudget(settings.progress_interval_seconds, settings.progress_global_rate)
+
+# Пул процессов для подготовки фото (общий для всех запросов)
+image_processor = ImageProcessor(max_workers=settings.image_workers)
+
+# Пул ffmpeg для faststart, пережатия и нарезки видео
+video_processor = VideoProcessor(
+    max_workers=settings.ffmpeg_workers,
+    threads=settings.ffmpeg_threads,
+    timeout=settings.ffmpeg_timeout_seconds,
+)
 
 
 def is_valid_url(url: str) -> bool:
@@ -44,116 +120,486 @@ def get_platform_name(url: str) -> str:
         return "Неизвестная платформа"
 
 
+async def run_stored_job(bot: Bot, job: StoredJob):
+    """Выполняет сохраненное задание, в том числе восстановленное после перезапуска"""
+    payload = job.payload
+    if payload.get('warm'):
+        await warm_inline_media(bot, payload['url'], payload['key'])
+        return
+    message = Message.model_validate(payload['message'], context={"bot": bot})
+    loading_message = Message.model_validate(payload['loading_message'], context={"bot": bot})
+    # Задания, сохраненные до поддержки нескольких ссылок, содержат одну ссылку
+    await process_media_links(message, loading_message, payload.get('urls') or [payload['url']])
+
+
+job_runner = JobRunner(job_store, scheduler, run_stored_job, poll_interval=settings.job_poll_interval)
+
+# Контроль нагрузки: при перегрузке новые ссылки сразу получают отказ
+admission = AdmissionController(
+    job_runner.in_flight,
+    max_in_flight=settings.max_in_flight_jobs,
+    max_bytes=settings.max_in_flight_mb * 1024 * 1024,
+    max_loop_lag=settings.max_loop_lag_ms / 1000,
+)
+
+
 @router.message(F.text & ~F.command)
-async def handle_media_link(message: Message):
-    """Обработчик ссылок на медиа"""
-    url = message.text.strip()
+async def handle_media_link(message: Message, event_update: Update):
+    """Обработчик ссылок на медиа: одной или нескольких в сообщении"""
     user_id = message.from_user.id
+    urls = []
+    # Регулярные выражения - только если в тексте вообще есть домен поддерживаемой платформы
+    if might_contain_link(message.text, message.entities):
+        urls = [url for url in extract_urls(message.text, message.entities) if is_valid_url(url)]
     
-    # Проверяем, не загружает ли пользователь что-то уже
-    if loading_states.get(user_id, False):
-        await message.answer(
-            "⏳ Пожалуйста, подождите! Ваша предыдущая загрузка еще не завершена."
-        )
-        return
-    
-    # Проверяем валидность URL
-    if not is_valid_url(url):
-        await message.answer(
+    # Проверяем, есть ли в сообщении поддерживаемые ссылки
+    # Короткие ответы возвращаются из обработчика и могут уйти прямо в ответе webhook
+    if not urls:
+        # В группе сообщение без подходящей ссылки адресовано не боту
+        if is_group(message):
+            return None
+        return message.answer(
             "❌ Неверная ссылка! Пожалуйста, отправьте ссылку на:\n"
             "• Pinterest\n"
             "• TikTok\n"
             "• Instagram\n\n"
             "Пример: https://pinterest.com/pin/123456789/"
         )
+    
+    # Бот перегружен - отвечаем сразу, не создавая задание
+    if admission.check():
+        return message.answer(
+            "🔥 Бот сейчас перегружен. Пожалуйста, отправьте ссылку еще раз через пару минут."
+        )
+    
+    # Повторная доставка того же обновления: задание уже принято
+    job_key = f"update:{event_update.update_id}"
+    if job_store.exists(job_key):
+        logger.info(f"Update {event_update.update_id} already has a job, skipping")
         return
     
-    platform = get_platform_name(url)
+    # Новая ссылка заменяет предыдущие: брошенные загрузки не занимают воркеры.
+    # Без незавершенных заданий пользователя транзакцию отмены не открываем
+    if settings.supersede_previous_links and job_runner.outstanding_for(user_id):
+        superseded = job_runner.cancel_for(user_id, message.chat.id)
+        await mark_cancelled(message.bot, superseded, "⏭ Загрузка отменена: пришла новая ссылка")
+    
+    # Проверяем, не переполнена ли очередь пользователя
+    if job_runner.outstanding_for(user_id) >= scheduler.max_queued_per_user:
+        return message.answer(
+            "⏳ Пожалуйста, подождите! Ваши предыдущие загрузки еще не завершены."
+        )
+    
+    # Все ссылки сообщения - одно задание: они скачиваются параллельно и приходят по порядку
+    extra_links = len(urls) - settings.max_links_per_message
+    urls = urls[:settings.max_links_per_message]
+    platforms = [get_platform_name(url) for url in urls]
+    queued_ahead = job_runner.outstanding_for(user_id)
+    queue_line = f"📋 Ссылка добавлена в очередь (перед ней: {queued_ahead})\n" if queued_ahead else ""
+    if len(urls) == 1:
+        links_line = f"🔍 Определяю платформу: {platforms[0]}\n"
+    else:
+        links_line = f"🔗 Ссылок в сообщении: {len(urls)} ({', '.join(dict.fromkeys(platforms))})\n"
+    if extra_links > 0:
+        links_line += f"⚠️ Обработаю только первые {len(urls)} ссылок\n"
     
     # Отправляем сообщение о начале загрузки
     loading_message = await message.answer(
-        f"🔍 Определяю платформу: {platform}\n"
+        f"{links_line}"
+        f"{queue_line}"
         f"⬇️ Начинаю загрузку медиа...\n"
         f"⏳ Это может занять некоторое время..."
     )
     
-    # Устанавливаем флаг загрузки
-    loading_states[user_id] = True
-    
+    # Задание сохраняется в базу и выполняется воркером планировщика, обработчик сразу освобождается
+    job_runner.enqueue(job_key, user_id, message.chat.id, {
+        'urls': urls,
+        'priority': membership.class_for(user_id),
+        'cost': sum(cost_estimator.estimate(url, platform) for url, platform in zip(urls, platforms)),
+        'message': message.model_dump(mode='json', exclude_none=True, by_alias=True),
+        'loading_message': loading_message.model_dump(mode='json', exclude_none=True, by_alias=True),
+    })
+
+
+async def mark_cancelled(bot: Bot, jobs: List[StoredJob], text: str):
+    """Заменяет сообщения о загрузке отмененных заданий"""
+    for job in jobs:
+        loading_message = job.payload.get('loading_message')
+        if not loading_message:
+            continue
+        try:
+            await bot.edit_message_text(text, chat_id=job.chat_id, message_id=loading_message['message_id'])
+        except TelegramAPIError as e:
+            logger.debug(f"Could not mark job {job.key} as cancelled: {e}")
+
+
+async def download(url: str, upload_mb: int) -> dict:
+    """Скачивает медиа по ссылке с учетом лимита размера отправляемого файла"""
+    # Видео больше лимита можно скачать, только если есть чем его потом ужать
+    max_download_size_mb = max(settings.max_download_size_mb, upload_mb) if video_processor.available else None
+    async with EnhancedMediaDownloader(
+        max_file_size_mb=upload_mb,
+        max_download_size_mb=max_download_size_mb,
+        cache_dir=settings.cache_dir,
+        bulkheads=bulkheads,
+    ) as downloader:
+        return await downloader.download_media(url)
+
+
+def remember_file_ids(url: str, sent_media: List[CachedMedia]):
+    """Запоминает file_id отправленных медиа для inline-ответов"""
     try:
-        # Скачиваем медиа
-        async with EnhancedMediaDownloader() as downloader:
-            result = await downloader.download_media(url)
-            
-        items = result.get('items', [])
-        post_text = result.get('text')
-            
-        if not items:
-            await loading_message.edit_text(
-                f"❌ Не удалось скачать медиа с {platform}\n\n"
-                f"Попробуйте другую ссылку."
-            )
-            return
-            
-        # Удаляем сообщение о загрузке перед отправкой файлов
-        await loading_message.delete()
+        file_ids.put(media_key(url), sent_media)
+    except Exception as e:
+        logger.warning(f"Could not save file_id for {url}: {e}")
+
+
+async def warm_inline_media(bot: Bot, url: str, key: str):
+    """Загружает медиа в служебный чат, чтобы inline-запрос по ссылке получил file_id"""
+    if file_ids.get(key):
+        return
+
+    upload_mb = max_upload_mb()
+    result = await download(url, upload_mb)
+    items = result.get('items', [])
+    held_bytes = sum(len(item['data']) for item in items)
+    admission.hold_bytes(held_bytes)
+
+    try:
+        sent_media = []
+        max_bytes = upload_mb * 1024 * 1024
+        chat_id = settings.inline_cache_chat_id
+        # Служебные отправки уступают очередь ответам пользователям
+        with send_priority(LOW):
+            for i, item in enumerate(items):
+                if item['type'] == 'video':
+                    video_parts = await video_processor.fit_video(item['data'], max_bytes)
+                    # Нарезанное на части видео одним inline-результатом не отдать
+                    if len(video_parts) != 1:
+                        logger.info(f"Media {key} does not fit into one video, not cached for inline mode")
+                        return
+                    async with outbox.file(video_parts[0], f"video_{i+1}.mp4") as input_file:
+                        sent = await bot.send_video(
+                            chat_id, input_file, supports_streaming=True, disable_notification=True
+                        )
+                    sent_media.append(CachedMedia(VIDEO, sent.video.file_id))
+                else:
+                    if len(item['data']) > max_bytes:
+                        return
+                    photo_data = await image_processor.prepare_photo(item['data'])
+                    async with outbox.file(photo_data, f"photo_{i+1}.jpg") as input_file:
+                        sent = await bot.send_photo(chat_id, input_file, disable_notification=True)
+                    sent_media.append(CachedMedia(PHOTO, sent.photo[-1].file_id))
+
+        if sent_media:
+            remember_file_ids(url, sent_media)
+            logger.info(f"Cached {len(sent_media)} file_id for inline mode: {key}")
+    finally:
+        admission.release_bytes(held_bytes)
+
+
+def render_progress(platform: str, state: ProgressState) -> str:
+    """Текст сообщения о загрузке для текущего состояния задания"""
+    lines = [f"🔍 Платформа: {platform}"]
+    if state.stage == DOWNLOAD:
+        method = f" ({state.strategy})" if state.strategy else ""
+        lines.append(f"⬇️ Скачиваю медиа{method}...")
+        if state.items > 1:
+            lines.append(f"🔗 Готово ссылок: {state.item}/{state.items}")
+        if state.received:
+            size = f"{state.received / (1024 * 1024):.1f}MB"
+            if state.total:
+                size += f" из {state.total / (1024 * 1024):.1f}MB ({state.received * 100 // state.total}%)"
+            lines.append(f"📦 Получено {size}")
+    elif state.stage == PROCESSING:
+        lines.append(f"⚙️ Обрабатываю файл {state.item}/{state.items}...")
+    elif state.stage == UPLOAD:
+        lines.append(f"📤 Отправляю файл {state.item}/{state.items}...")
+    return "\n".join(lines)
+
+
+def create_progress(message: Message, loading_message: Message, platform: str) -> ProgressReporter:
+    """Репортер, который показывает ход задания в сообщении о загрузке"""
+    async def edit(text: str):
+        # Прогресс уступает очередь ответам и медиа
+        with send_priority(LOW):
+            await loading_message.edit_text(text)
+
+    return ProgressReporter(
+        chat_id=message.chat.id,
+        edit=edit,
+        chat_action=lambda action: message.bot.send_chat_action(message.chat.id, action),
+        render=lambda state: render_progress(platform, state),
+        budget=progress_budget,
+        interval=settings.progress_interval_seconds,
+        max_edits=settings.progress_max_edits,
+    )
+
+
+# Больше медиа в одном альбоме Telegram не принимает
+ALBUM_LIMIT = 10
+
+
+class MediaSender:
+    """Отправляет медиа ссылок по порядку, объединяя фото и видео в альбомы.
+
+    Альбом набирается из медиа подряд идущих ссылок (до ALBUM_LIMIT штук),
+    оригиналы фото уходят следом альбомом документов. Видео, нарезанное на
+    части, предупреждения о пропущенных файлах и длинный текст поста
+    отправляются отдельными сообщениями и закрывают текущий альбом, чтобы
+    порядок в чате совпадал с порядком ссылок.
+    """
+
+    def __init__(self, message: Message, upload_mb: int, signature: str):
+        self.message = message
+        self.upload_mb = upload_mb
+        self.max_bytes = upload_mb * 1024 * 1024
+        self.signature = signature
+        # Текст поста, которым можно заменить сообщение о загрузке (для одной ссылки)
+        self.status_text: Optional[str] = None
+        self.delivered = 0
+        self._files = 0
+        self._pending: List[Tuple[int, str, bytes, str, str]] = []
+        self._documents: List[Tuple[bytes, str]] = []
+        self._urls: List[str] = []
+        self._expected: List[int] = []
+        # file_id попадает в индекс, только если вся публикация ушла без пропусков и нарезки
+        self._sent: Dict[int, List[CachedMedia]] = {}
+        self._partial: Set[int] = set()
+
+    @property
+    def total(self) -> int:
+        """Сколько файлов во всех ссылках, добавленных на данный момент"""
+        return sum(self._expected)
+
+    async def add_link(self, url: str, items: List[dict], post_text: Optional[str], text_in_status: bool = False):
+        link = len(self._urls)
+        self._urls.append(url)
+        self._expected.append(len(items))
+        user_id = self.message.from_user.id
+        plan = plan_delivery(post_text, self.signature)
         
-        # Инфо о боте для подписи
-        bot_info = await message.bot.get_me()
-        bot_username = bot_info.username
+        # Длинный текст поста: в сообщение о загрузке или отдельным сообщением перед медиа
+        if plan.status_text and text_in_status:
+            self.status_text = plan.status_text
+        elif plan.status_text:
+            await self.flush()
+            await self.message.answer(plan.status_text, parse_mode="HTML")
+            self.delivered += 1
         
-        # Отправляем текст поста, если он есть
-        if post_text:
-            await message.answer(f"📝 <b>Текст поста:</b>\n\n{post_text}", parse_mode="HTML")
-            
-        for i, item in enumerate(items):
+        sent_first = False
+        for item in items:
+            self._files += 1
+            number = self._files
             media_data = item['data']
             file_type = item['type']
+            file_size_mb = len(media_data) / (1024 * 1024)
+            
+            # Видео: faststart, а если не влезает в лимит - пережатие или нарезка на части
+            video_parts = []
+            if file_type == 'video':
+                report(stage=PROCESSING, item=number, items=self.total, action='upload_video')
+                video_parts = await video_processor.fit_video(media_data, self.max_bytes)
+                if not video_parts:
+                    await self._skip(link, number, file_size_mb)
+                    continue
             
             # Проверяем размер файла
-            file_size_mb = len(media_data) / (1024 * 1024)
-            if file_size_mb > settings.max_file_size_mb:
-                await message.answer(f"⚠️ Файл {i+1} слишком большой ({file_size_mb:.1f}MB) и был пропущен.")
+            elif file_size_mb > self.upload_mb:
+                await self._skip(link, number, file_size_mb)
                 continue
-
-            # Определяем имя и подпись
-            suffix = f"_{i+1}" if len(items) > 1 else ""
-            if file_type == 'video':
-                filename = f"video_{user_id}{suffix}.mp4"
-                caption = f"Рад был помочь! Ваш, @{bot_username}"
-            else:
-                filename = f"photo_{user_id}{suffix}.jpg"
-                caption = f"Рад был помочь! Ваш, @{bot_username}"
             
-            # Создаем файл
-            input_file = BufferedInputFile(file=media_data, filename=filename)
+            # Определяем имя и подпись: текст поста - только у первого медиа ссылки
+            filename = f"{'video' if file_type == 'video' else 'photo'}_{user_id}_{number}"
+            caption = plan.caption if sent_first else plan.first_caption
+            sent_first = True
             
             if file_type == 'video':
-                await message.answer_video(video=input_file, caption=caption)
+                if len(video_parts) == 1:
+                    self._pending.append((link, VIDEO, video_parts[0], f"{filename}.mp4", caption))
+                else:
+                    await self._send_parts(link, video_parts, f"{filename}.mp4", caption)
             else:
-                # Отправляем как фото
-                await message.answer_photo(photo=input_file, caption=caption)
-                
-                # Отправляем как документ (для ценителей качества)
-                doc_file = BufferedInputFile(file=media_data, filename=filename)
-                await message.answer_document(
-                    document=doc_file,
+                # Уменьшенный JPEG в пределах ограничений Telegram, оригинал - документом
+                photo_data = await image_processor.prepare_photo(media_data)
+                self._pending.append((link, PHOTO, photo_data, f"{filename}.jpg", caption))
+                self._documents.append((media_data, f"{filename}.{image_extension(media_data)}"))
+            
+            if len(self._pending) >= ALBUM_LIMIT:
+                await self.flush()
+
+    async def _skip(self, link: int, number: int, file_size_mb: float):
+        self._partial.add(link)
+        await self.flush()
+        await self.message.answer(f"⚠️ Файл {number} слишком большой ({file_size_mb:.1f}MB) и был пропущен.")
+
+    async def _send_parts(self, link: int, video_parts: List[bytes], filename: str, caption: str):
+        """Видео, нарезанное на части, - отдельными сообщениями"""
+        self._partial.add(link)
+        await self.flush()
+        report(stage=UPLOAD, item=self._files, items=self.total, action='upload_video')
+        for part_number, part_data in enumerate(video_parts, start=1):
+            part_caption = PART_PREFIX.format(number=part_number, total=len(video_parts)) + caption
+            async with outbox.file(part_data, filename) as input_file:
+                await self.message.answer_video(video=input_file, caption=part_caption, supports_streaming=True)
+        self.delivered += 1
+
+    async def flush(self):
+        """Отправляет накопленные медиа: одно - обычным сообщением, несколько - альбомом"""
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, []
+        documents, self._documents = self._documents, []
+        
+        has_video = any(kind == VIDEO for _, kind, _, _, _ in pending)
+        report(stage=UPLOAD, item=self._files, items=self.total,
+               action='upload_video' if has_video else 'upload_photo')
+        async with AsyncExitStack() as stack:
+            files = [await stack.enter_async_context(outbox.file(data, filename)) for _, _, data, filename, _ in pending]
+            if len(pending) == 1:
+                _, kind, _, _, caption = pending[0]
+                if kind == VIDEO:
+                    sent = [await self.message.answer_video(video=files[0], caption=caption, supports_streaming=True)]
+                else:
+                    sent = [await self.message.answer_photo(photo=files[0], caption=caption)]
+            else:
+                sent = await self.message.answer_media_group([
+                    InputMediaVideo(media=input_file, caption=caption, supports_streaming=True) if kind == VIDEO
+                    else InputMediaPhoto(media=input_file, caption=caption)
+                    for input_file, (_, kind, _, _, caption) in zip(files, pending)
+                ])
+        
+        for (link, kind, _, _, _), sent_message in zip(pending, sent):
+            file_id = sent_message.video.file_id if kind == VIDEO else sent_message.photo[-1].file_id
+            self._sent.setdefault(link, []).append(CachedMedia(kind, file_id))
+        self.delivered += len(pending)
+        
+        if documents:
+            await self._send_documents(documents)
+
+    async def _send_documents(self, documents: List[Tuple[bytes, str]]):
+        """Оригиналы фото без изменений (для ценителей качества)"""
+        async with AsyncExitStack() as stack:
+            files = [await stack.enter_async_context(outbox.file(data, filename)) for data, filename in documents]
+            if len(files) == 1:
+                await self.message.answer_document(
+                    document=files[0],
                     caption="Для ценителей качества — изображение документом!"
                 )
+            else:
+                # Подпись альбома документов - у последнего файла
+                await self.message.answer_media_group([
+                    InputMediaDocument(
+                        media=input_file,
+                        caption="Для ценителей качества — изображения документами!" if i == len(files) - 1 else None,
+                    )
+                    for i, input_file in enumerate(files)
+                ])
+
+    def remember_file_ids(self):
+        for link, url in enumerate(self._urls):
+            sent_media = self._sent.get(link, [])
+            if link not in self._partial and sent_media and len(sent_media) == self._expected[link]:
+                remember_file_ids(url, sent_media)
+
+
+async def process_media_links(message: Message, loading_message: Message, urls: List[str]):
+    """Скачивает медиа по ссылкам параллельно и отправляет пользователю в порядке ссылок"""
+    user_id = message.from_user.id
+    platform = get_platform_name(urls[0]) if len(urls) == 1 else ", ".join(dict.fromkeys(map(get_platform_name, urls)))
+    upload_mb = max_upload_mb()
+    held_bytes = 0
+    failed: List[str] = []
+    # Ссылки одного сообщения скачиваются параллельно, но не больше лимита на сообщение и на пользователя
+    message_slots = asyncio.Semaphore(settings.links_per_message_concurrency)
+    
+    async def fetch(url: str) -> dict:
+        nonlocal held_bytes
+        async with message_slots, user_downloads.slot(user_id):
+            result = await download(url, upload_mb)
+        # Скачанные медиа занимают память до окончания отправки
+        size = sum(len(item['data']) for item in result.get('items', []))
+        held_bytes += size
+        admission.hold_bytes(size)
+        if size:
+            cost_estimator.record(url, get_platform_name(url), size)
+        return result
+    
+    try:
+        # Инфо о боте для подписи (запрашивается один раз при запуске)
+        bot_info = await message.bot.me()
+        sender = MediaSender(message, upload_mb, f"Рад был помочь! Ваш, @{bot_info.username}")
         
-        # Отправляем сообщение про донат
-        await message.answer(
-            "👋 Нравится бот? Поддержите его автора донатом и получите в благодарность бонусную подписку!\n\n"
-            "<b>Что она даёт:</b>\n"
-            "— отключение рекламы;\n"
-            "— отсутствие просьб подписаться на «Семейку ботов»;\n"
-            "— скачивание медиа без подписей.\n\n"
-            "Нажмите /donate, чтобы выбрать удобный способ поддержки.",
-            parse_mode="HTML"
-        )
+        # Пока идут загрузка и отправка, сообщение о загрузке показывает их ход
+        async with create_progress(message, loading_message, platform):
+            tasks = [asyncio.create_task(fetch(url)) for url in urls]
+            try:
+                # Результаты отправляются по порядку ссылок, остальные тем временем докачиваются
+                for index, (url, task) in enumerate(zip(urls, tasks)):
+                    try:
+                        result = await task
+                    except Exception as e:
+                        # Одиночная ссылка обрабатывается как раньше, в пачке ошибка одной не мешает остальным
+                        if len(urls) == 1:
+                            raise
+                        logger.warning(f"Download failed for {url}: {e}")
+                        result = {}
+                    
+                    if len(urls) > 1:
+                        report(stage=DOWNLOAD, item=index + 1, items=len(urls), strategy=None, received=0, total=None)
+                    items = result.get('items', [])
+                    if not items:
+                        failed.append(url)
+                        continue
+                    await sender.add_link(url, items, result.get('text'), text_in_status=len(urls) == 1)
+                await sender.flush()
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+        
+        if not sender.delivered:
+            await loading_message.edit_text(
+                f"❌ Не удалось скачать медиа с {platform}\n\n"
+                f"Попробуйте другую ссылку."
+            )
+            return
+        
+        # Длинный текст поста заменяет сообщение о загрузке, список неудачных ссылок - тоже,
+        # иначе оно больше не нужно. Сообщение стоит выше медиа, так что порядок в чате не меняется
+        if sender.status_text:
+            await loading_message.edit_text(sender.status_text, parse_mode="HTML")
+        elif failed:
+            await loading_message.edit_text(
+                "⚠️ Не удалось скачать медиа по ссылкам:\n" + "\n".join(html.escape(url) for url in failed),
+                disable_web_page_preview=True,
+            )
+        else:
+            await loading_message.delete()
         
-        logger.info(f"Успешно отправлено {len(items)} файлов пользователю {user_id} с {platform}")
+        sender.remember_file_ids()
+        
+        # Сообщение про донат: не чаще promo_interval_hours и не тем, кто уже поддержал проект
+        if membership.class_for(user_id) == FREE and promo_cap.allow(user_id):
+            with send_priority(LOW):
+                await message.answer(
+                    "👋 Нравится бот? Поддержите его автора донатом и получите в благодарность бонусную подписку!\n\n"
+                    "<b>Что она даёт:</b>\n"
+                    "— отключение рекламы;\n"
+                    "— отсутствие просьб подписаться на «Семейку ботов»;\n"
+                    "— скачивание медиа без подписей.\n\n"
+                    "Нажмите /donate, чтобы выбрать удобный способ поддержки.",
+                    parse_mode="HTML"
+                )
+        
+        logger.info(f"Успешно отправлено {sender.delivered} медиа пользователю {user_id} ({len(urls)} ссылок)")
             
+    except FileTooLargeError as e:
+        await loading_message.edit_text(
+            f"❌ Файл слишком большой ({e.size / (1024 * 1024):.1f}MB)\n"
+            f"Лимит: {e.limit / (1024 * 1024):.0f}MB"
+        )
+        
     except asyncio.TimeoutError:
         await loading_message.edit_text(
             f"⏰ Время загрузки истекло (> {settings.timeout_seconds} сек)\n"
@@ -175,14 +621,13 @@ async def handle_media_link(message: Message):
         )
         
     finally:
-        # Сбрасываем флаг загрузки
-        loading_states[user_id] = False
+        admission.release_bytes(held_bytes)
 
 
 @router.message(F.photo | F.video | F.animation | F.document)
 async def handle_other_media(message: Message):
     """Обработчик других типов медиа (не ссылок)"""
-    await message.answer(
+    return message.answer(
         "🔗 Пожалуйста, отправьте ссылку на медиа, а не сам файл.\n\n"
         "Я работаю со ссылками из:\n"
         "• Pinterest\n"
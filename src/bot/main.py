@@ -2,15 +2,25 @@ import asyncio
 import logging
 import os
 from contextlib import suppress
+from typing import Any, Dict, Optional, Tuple
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
 from aiogram.enums import ParseMode
 from aiogram.exceptions import TelegramAPIError
+from aiogram.types import Update
 from loguru import logger
 
 from config.settings import settings
 from bot.handlers.commands import router as commands_router
-from bot.handlers.media import router as media_router
+from bot.handlers.inline import router as inline_router
+from bot.handlers.media import router as media_router, scheduler as download_scheduler, job_runner, job_store, file_ids
+from bot.middlewares.flood_control import create_flood_control_middleware
+from bot.middlewares.group_filter import GroupPrefilterMiddleware
+from bot.middlewares.rate_limit import create_rate_limit_middleware
+from bot.session import create_session
+from bot.webhook_reply import WebhookReply, feed_with_reply
+from services.update_dedup import RecentUpdates
+from services.update_queue import UpdateQueue
 
 
 # Настройка логирования
@@ -39,29 +49,63 @@ else:
     )
 
 
+def create_bot() -> Bot:
+    """Создает экземпляр бота с настройками по умолчанию"""
+    bot = Bot(
+        token=settings.telegram_bot_token,
+        session=create_session(),
+        default=DefaultBotProperties(
+            parse_mode=ParseMode.HTML
+        )
+    )
+    # Исходящие запросы укладываются в лимиты Telegram и переживают 429
+    bot.session.middleware(create_flood_control_middleware())
+    return bot
+
+
 class TelegramBot:
     """Основной класс Telegram бота"""
     
     def __init__(self):
         self.bot = None
         self.dp = None
+        # Очередь обновлений webhook: ответ Telegram не ждет обработки
+        self.updates = UpdateQueue(
+            self._process_queued,
+            workers=settings.webhook_workers,
+            max_size=settings.webhook_queue_size,
+        )
+        # Недавние update_id: повторные доставки Telegram не обрабатываются заново
+        self.seen_updates = RecentUpdates(settings.update_dedup_size, settings.update_dedup_path)
     
     async def init_bot(self):
         """Инициализация бота и диспетчера"""
         # Создаем экземпляр бота
-        self.bot = Bot(
-            token=settings.telegram_bot_token,
-            default=DefaultBotProperties(
-                parse_mode=ParseMode.HTML
-            )
-        )
+        self.bot = create_bot()
         
         # Создаем диспетчер
         self.dp = Dispatcher()
         
+        # Данные бота для подписей запрашиваются один раз, дальше bot.me() берет их из кэша
+        await self.bot.me()
+        
+        # Переписка в группах без ссылок отсекается первой, затем проверяются лимиты частоты ссылок
+        self.dp.message.outer_middleware(GroupPrefilterMiddleware())
+        self.dp.message.outer_middleware(create_rate_limit_middleware())
+        
         # Включаем роутеры
         self.dp.include_router(commands_router)
         self.dp.include_router(media_router)
+        self.dp.include_router(inline_router)
+        
+        # Продолжаем загрузки, прерванные прошлым запуском; при отдельных
+        # процессах-воркерах этот процесс только принимает задания
+        job_runner.start(self.bot, execute_jobs=settings.worker_processes == 0)
+        
+        # Устаревшие file_id inline-режиму уже не отдаются - чистим их при запуске
+        removed = file_ids.purge()
+        if removed:
+            logger.info(f"Removed {removed} expired file_id entries")
         
         logger.info("Бот успешно инициализирован")
     
@@ -75,10 +119,11 @@ class TelegramBot:
             # Удаляем вебхук если он был установлен
             await self.bot.delete_webhook(drop_pending_updates=True)
             
-            # Запускаем polling
+            # Запускаем polling: Telegram присылает только те типы обновлений, которые есть в обработчиках
             await self.dp.start_polling(
                 self.bot,
-                handle_signals=False
+                handle_signals=False,
+                allowed_updates=self.dp.resolve_used_update_types()
             )
             
         except TelegramAPIError as e:
@@ -102,11 +147,11 @@ class TelegramBot:
         logger.info(f"Установка webhook: {webhook_url}")
         
         try:
-            # Устанавливаем webhook
+            # Устанавливаем webhook: Telegram присылает только те типы обновлений, которые есть в обработчиках
             await self.bot.set_webhook(
                 url=webhook_url,
                 drop_pending_updates=True,
-                allowed_updates=["message", "callback_query"]
+                allowed_updates=self.dp.resolve_used_update_types()
             )
             
             logger.info("Webhook успешно установлен")
@@ -115,22 +160,75 @@ class TelegramBot:
             logger.error(f"Ошибка при установке webhook: {e}")
             raise
     
-    async def handle_webhook_update(self, update_data: dict):
-        """Обработка входящего обновления от webhook"""
+    async def parse_update(self, update_data: dict) -> Update:
+        """Проверяет и разбирает входящее обновление"""
         if not self.dp:
             await self.init_bot()
-        
+        return Update.model_validate(update_data, context={"bot": self.bot})
+    
+    async def process_update(self, update: Update, reply: Optional[WebhookReply] = None):
+        """Обработка обновления диспетчером"""
         try:
-            # Создаем объект обновления
-            from aiogram.types import Update
-            update = Update.model_validate(update_data, context={"bot": self.bot})
-            
-            # Обрабатываем обновление
-            await self.dp.feed_update(self.bot, update)
-            
+            await feed_with_reply(self.dp, self.bot, update, reply)
         except Exception as e:
             logger.error(f"Ошибка при обработке webhook обновления: {e}")
             raise
+    
+    async def _process_queued(self, item: Tuple[Update, Optional[WebhookReply]]):
+        await self.process_update(*item)
+    
+    async def _submit_webhook_update(self, update_data: dict, reply: Optional[WebhookReply]) -> bool:
+        update_id = update_data.get('update_id')
+        if update_id in self.seen_updates:
+            logger.info(f"Повторная доставка обновления {update_id}, пропускаем")
+            if reply is not None:
+                reply.close()
+            return True
+        
+        update = await self.parse_update(update_data)
+        if not self.updates.submit((update, reply)):
+            return False
+        # Отмечаем только принятые обновления: отклоненное Telegram доставит снова
+        self.seen_updates.add(update.update_id)
+        return True
+    
+    async def enqueue_webhook_update(self, update_data: dict) -> bool:
+        """Ставит обновление в очередь; False, если очередь переполнена"""
+        return await self._submit_webhook_update(update_data, None)
+    
+    async def answer_webhook_update(self, update_data: dict) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        """Ставит обновление в очередь и ждет первый запрос обработчика для тела ответа webhook.
+        
+        Возвращает (принято ли обновление, запрос для ответа или None). Ожидание
+        ограничено webhook_reply_timeout: дальше обработка продолжается в фоне.
+        """
+        reply = WebhookReply()
+        if not await self._submit_webhook_update(update_data, reply):
+            return False, None
+        return True, await reply.wait(settings.webhook_reply_timeout)
+    
+    async def handle_webhook_update(self, update_data: dict):
+        """Обработка входящего обновления от webhook"""
+        update_id = update_data.get('update_id')
+        if update_id in self.seen_updates:
+            logger.info(f"Повторная доставка обновления {update_id}, пропускаем")
+            return
+        
+        update = await self.parse_update(update_data)
+        await self.process_update(update)
+        self.seen_updates.add(update.update_id)
+    
+    async def drain(self):
+        """Дожидается обработки принятых обновлений и фоновых загрузок.
+        
+        Нужен в serverless-окружениях, где цикл событий закрывается сразу
+        после ответа и фоновые задачи иначе были бы потеряны.
+        """
+        await self.updates.join()
+        await download_scheduler.join()
+        self.seen_updates.flush()
+        # Отложенные записи очереди заданий коммитим до закрытия цикла событий
+        job_store.flush()
 
 
 # Глобальный экземпляр бота
@@ -0,0 +1,77 @@
+import asyncio
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import TelegramMethod
+from aiogram.methods.base import Response, TelegramType
+from loguru import logger
+
+from config.settings import settings
+from services.outbound_limiter import HIGH, NORMAL, OutboundLimiter, outbound_priority
+
+# Методы, которые отправляют или меняют сообщения и попадают под лимиты Telegram
+LIMITED_PREFIXES = ('Send', 'Copy', 'Forward', 'Edit')
+UNLIMITED_METHODS = {'SendChatAction'}
+# Ответы и статусы важнее медиа: пользователь сразу видит реакцию бота
+HIGH_PRIORITY_METHODS = {'SendMessage', 'EditMessageText', 'EditMessageCaption'}
+
+
+class FloodControlMiddleware(BaseRequestMiddleware):
+    """Middleware сессии бота: пропускает исходящие запросы через OutboundLimiter.
+
+    Отправка сообщений ждет разрешения в пределах общего лимита и лимита чата.
+    Если Telegram все же отвечает TelegramRetryAfter, чат ставится на паузу и
+    запрос повторяется (до max_retries раз), так что обработчики видят ошибку
+    только при затяжном флуд-контроле.
+    """
+
+    def __init__(self, limiter: OutboundLimiter, max_retries: int = 3):
+        self.limiter = limiter
+        self.max_retries = max_retries
+
+    @staticmethod
+    def _priority(name: str) -> int:
+        priority = outbound_priority.get()
+        if priority is not None:
+            return priority
+        return HIGH if name in HIGH_PRIORITY_METHODS else NORMAL
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        name = type(method).__name__
+        limited = name.startswith(LIMITED_PREFIXES) and name not in UNLIMITED_METHODS
+        chat_id = getattr(method, 'chat_id', None)
+
+        attempt = 0
+        while True:
+            if limited:
+                await self.limiter.acquire(chat_id, self._priority(name))
+            try:
+                return await make_request(bot, method)
+            except TelegramRetryAfter as e:
+                attempt += 1
+                if attempt > self.max_retries:
+                    raise
+                logger.warning(f"Flood control on {name} to chat {chat_id}: retry in {e.retry_after}s")
+                if limited:
+                    self.limiter.pause(e.retry_after, chat_id)
+                else:
+                    await asyncio.sleep(e.retry_after)
+
+
+def create_flood_control_middleware() -> FloodControlMiddleware:
+    """Middleware с лимитами исходящих запросов из настроек"""
+    return FloodControlMiddleware(
+        OutboundLimiter(
+            global_rate=settings.outbound_global_rate,
+            global_burst=settings.outbound_global_rate,
+            chat_rate=settings.outbound_chat_rate,
+            chat_burst=settings.outbound_chat_burst,
+        ),
+        max_retries=settings.outbound_max_retries,
+    )
@@ -0,0 +1,39 @@
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.enums import ChatType
+from aiogram.types import Message, TelegramObject
+
+from services.links import might_contain_link
+
+GROUP_CHAT_TYPES = {ChatType.GROUP, ChatType.SUPERGROUP}
+
+
+def is_group(message: Message) -> bool:
+    return message.chat.type in GROUP_CHAT_TYPES
+
+
+class GroupPrefilterMiddleware(BaseMiddleware):
+    """Внешний middleware сообщений: в группах пропускает дальше только команды и ссылки.
+
+    В группе бот видит всю переписку, и почти все сообщения к нему не
+    относятся. Такие сообщения отбрасываются по дешевой проверке доменов -
+    до лимитов частоты, роутеров и регулярных выражений, и бот на них
+    ничего не отвечает. В личных чатах сообщения проходят как раньше.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: Message,
+        data: Dict[str, Any],
+    ) -> Any:
+        if not is_group(event):
+            return await handler(event, data)
+
+        text = event.text or event.caption
+        if text and text.startswith('/'):
+            return await handler(event, data)
+        if might_contain_link(text, event.entities or event.caption_entities):
+            return await handler(event, data)
+        return None
@@ -0,0 +1,60 @@
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import Message, TelegramObject
+from loguru import logger
+
+from config.settings import settings
+from services.rate_limiter import KeyedBuckets, RateLimiter
+
+REJECT_MESSAGES = {
+    RateLimiter.USER: "🐢 Слишком много ссылок подряд! Подождите немного и попробуйте снова.",
+    RateLimiter.CHAT: "🐢 В этом чате слишком много запросов. Подождите немного и попробуйте снова.",
+    RateLimiter.GLOBAL: "🔥 Бот сейчас перегружен. Попробуйте через пару минут.",
+}
+
+
+class RateLimitMiddleware(BaseMiddleware):
+    """Внешний middleware сообщений: отсекает лишние ссылки до обработчиков.
+
+    Лимитируются только текстовые сообщения, не являющиеся командами, - именно
+    они запускают загрузку. Отказ отправляется пользователю не чаще одного раза
+    за notify_interval секунд, чтобы спам не тратил лимиты Telegram.
+    """
+
+    def __init__(self, limiter: RateLimiter, notify_interval: float = 30):
+        self.limiter = limiter
+        self.notifications = KeyedBuckets(rate=1 / notify_interval, burst=1)
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: Message,
+        data: Dict[str, Any],
+    ) -> Any:
+        if not event.text or event.text.startswith('/') or event.from_user is None:
+            return await handler(event, data)
+
+        scope = self.limiter.acquire(event.from_user.id, event.chat.id)
+        if scope is None:
+            return await handler(event, data)
+
+        logger.info(f"Rate limit ({scope}) hit by user {event.from_user.id} in chat {event.chat.id}")
+        notification = self.notifications.get(event.from_user.id)
+        if notification.can_take():
+            notification.take()
+            # Ответ возвращается, а не отправляется: его можно вернуть прямо в ответе webhook
+            return event.answer(REJECT_MESSAGES[scope])
+        return None
+
+
+def create_rate_limit_middleware() -> RateLimitMiddleware:
+    """Middleware с лимитами из настроек"""
+    return RateLimitMiddleware(RateLimiter(
+        user_rate=settings.rate_limit_user_rate,
+        user_burst=settings.rate_limit_user_burst,
+        chat_rate=settings.rate_limit_chat_rate,
+        chat_burst=settings.rate_limit_chat_burst,
+        global_rate=settings.rate_limit_global_rate,
+        global_burst=settings.rate_limit_global_burst,
+    ))
@@ -1,8 +1,10 @@
 import asyncio
+from typing import Optional
 from aiogram import Bot, Dispatcher, Router, types, F
 from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.filters import Command
 from aiogram.enums import ParseMode
+from aiogram.methods import SendMessage
 from loguru import logger
 import sys
 import os
@@ -11,7 +13,15 @@ import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
 
 from config.settings import settings
+from services.admission import AdmissionController
+from services.download_scheduler import DownloadScheduler, QueueFullError
 from services.enhanced_downloader import EnhancedMediaDownloader
+from bot.middlewares.flood_control import create_flood_control_middleware
+from bot.middlewares.group_filter import GroupPrefilterMiddleware
+from bot.middlewares.rate_limit import create_rate_limit_middleware
+from bot.session import create_session, max_upload_mb
+from bot.webhook_reply import WebhookReply, feed_with_reply
+from services.update_dedup import RecentUpdates
 
 class ModernTelegramBot:
     def __init__(self):
@@ -19,6 +29,20 @@ class ModernTelegramBot:
         self.dp = None
         self.downloader = None
         self.router = Router()
+        # Недавние update_id: повторные доставки Telegram не обрабатываются заново
+        self.seen_updates = RecentUpdates(settings.update_dedup_size, settings.update_dedup_path)
+        # Загрузки идут в очереди: обработчик не держит ответ webhook до конца загрузки
+        self.downloads = DownloadScheduler(
+            workers=settings.download_workers,
+            max_queued_per_user=settings.max_queued_per_user,
+        )
+        # Нагрузка процесса: перегруженный бот не принимает новые ссылки и не готов в /health
+        self.admission = AdmissionController(
+            lambda: self.downloads.queued + self.downloads.running,
+            max_in_flight=settings.max_in_flight_jobs,
+            max_bytes=settings.max_in_flight_mb * 1024 * 1024,
+            max_loop_lag=settings.max_loop_lag_ms / 1000,
+        )
         self._setup_handlers()
     
     def _setup_handlers(self):
@@ -27,17 +51,17 @@ class ModernTelegramBot:
         @self.router.message(Command("start"))
         async def cmd_start(message: Message):
             """Команда /start"""
-            await self._send_welcome(message)
+            return self._send_welcome(message)
         
         @self.router.message(Command("help"))
         async def cmd_help(message: Message):
             """Команда /help"""
-            await self._send_help(message)
+            return self._send_help(message)
         
         @self.router.message(F.text & ~F.command)
         async def handle_text(message: Message):
             """Обработка текстовых сообщений"""
-            await self._handle_media_link(message)
+            return await self._handle_media_link(message)
         
         @self.router.callback_query(F.data.startswith("info_"))
         async def handle_info(callback: CallbackQuery):
@@ -102,18 +126,22 @@ class ModernTelegramBot:
         """Инициализация бота"""
         self.bot = Bot(
             token=settings.telegram_bot_token,
+            session=create_session(),
             parse_mode=ParseMode.HTML
         )
+        self.bot.session.middleware(create_flood_control_middleware())
         self.dp = Dispatcher()
+        self.dp.message.outer_middleware(GroupPrefilterMiddleware())
+        self.dp.message.outer_middleware(create_rate_limit_middleware())
         self.dp.include_router(self.router)
         
         # Инициализуем downloader
-        self.downloader = EnhancedMediaDownloader()
+        self.downloader = EnhancedMediaDownloader(max_file_size_mb=max_upload_mb())
         await self.downloader.__aenter__()
         
         logger.info("🚀 Modern Telegram Bot initialized")
     
-    async def _send_welcome(self, message: Message):
+    def _send_welcome(self, message: Message) -> SendMessage:
         """Отправка приветственного сообщения"""
         welcome_text = """
 🎬 <b>Media Downloader Bot</b>
@@ -149,9 +177,9 @@ class ModernTelegramBot:
             ]
         ])
         
-        await message.answer(welcome_text, reply_markup=keyboard)
+        return message.answer(welcome_text, reply_markup=keyboard)
     
-    async def _send_help(self, message: Message):
+    def _send_help(self, message: Message) -> SendMessage:
         """Отправка справки"""
         help_text = """
 📖 <b>Справка по использованию</b>
@@ -187,7 +215,7 @@ class ModernTelegramBot:
             ]
         ])
         
-        await message.answer(help_text, reply_markup=keyboard)
+        return message.answer(help_text, reply_markup=keyboard)
     
     async def _handle_media_link(self, message: Message):
         """Обработка ссылок на медиа"""
@@ -197,7 +225,7 @@ class ModernTelegramBot:
         # Проверяем валидность URL
         platform = self._detect_platform(url)
         if platform == "unknown":
-            await message.answer(
+            return message.answer(
                 "❌ <b>Неверная ссылка!</b>\n\n"
                 "Поддерживаемые платформы:\n"
                 "• 📌 Pinterest\n"
@@ -206,12 +234,31 @@ class ModernTelegramBot:
                 "Отправьте правильную ссылку!",
                 parse_mode=ParseMode.HTML
             )
-            return
         
         # Используем downloader для определения платформы
         downloader_platform = self.downloader.detect_platform(url)
         logger.info(f"Detected platform: {platform} (downloader: {downloader_platform})")
         
+        # Бот перегружен - отвечаем сразу, не ставя загрузку в очередь
+        if self.admission.check():
+            return message.answer(
+                "🔥 Бот сейчас перегружен. Пожалуйста, отправьте ссылку еще раз через пару минут."
+            )
+        
+        try:
+            self.downloads.submit(
+                user_id, message.chat.id,
+                lambda: self._download_and_send(message, url, platform),
+            )
+        except QueueFullError:
+            return message.answer(
+                "⏳ Пожалуйста, подождите! Ваши предыдущие загрузки еще не завершены."
+            )
+    
+    async def _download_and_send(self, message: Message, url: str, platform: str):
+        """Загрузка медиа и отправка пользователю (выполняется в очереди загрузок)"""
+        user_id = message.from_user.id
+        
         # Отправляем сообщение о начале загрузки
         loading_text = f"""
 🔍 <b>Обнаружена платформа:</b> {platform}
@@ -235,11 +282,11 @@ class ModernTelegramBot:
             file_size_mb = len(media_data) / (1024 * 1024)
             
             # Проверяем размер
-            if file_size_mb > settings.max_file_size_mb:
+            if file_size_mb > max_upload_mb():
                 await loading_message.edit_text(
                     f"❌ <b>Файл слишком большой!</b>\n\n"
                     f"📊 Размер: {file_size_mb:.1f}MB\n"
-                    f"📏 Лимит: {settings.max_file_size_mb}MB",
+                    f"📏 Лимит: {max_upload_mb()}MB",
                     parse_mode=ParseMode.HTML
                 )
                 return
@@ -361,22 +408,41 @@ class ModernTelegramBot:
             # По умолчанию считаем видео если размер > 1MB
             return 'video' if len(data) > 1024 * 1024 else 'photo'
     
+    def parse_update(self, update_data: dict) -> types.Update:
+        """Проверка и разбор входящего обновления"""
+        return types.Update.model_validate(update_data, context={"bot": self.bot})
+    
+    async def process_update(self, update: types.Update, reply: Optional[WebhookReply] = None):
+        """Обработка обновления диспетчером; первый запрос обработчика может уйти в ответ webhook"""
+        try:
+            await feed_with_reply(self.dp, self.bot, update, reply)
+        except Exception as e:
+            logger.error(f"Webhook error: {e}")
+    
+    def is_duplicate(self, update_data: dict) -> bool:
+        """Проверка повторной доставки обновления"""
+        return update_data.get('update_id') in self.seen_updates
+    
     async def handle_webhook_update(self, update_data: dict):
         """Обработка webhook обновлений"""
+        if self.is_duplicate(update_data):
+            logger.info(f"Duplicate update {update_data.get('update_id')} skipped")
+            return
+        
         try:
-            update = types.Update.model_validate(update_data)
-            await self.dp.feed_webhook_update(
-                bot=self.bot,
-                update=update
-            )
+            update = self.parse_update(update_data)
+            self.seen_updates.add(update.update_id)
         except Exception as e:
             logger.error(f"Webhook error: {e}")
+            return
+        await self.process_update(update)
     
     async def start_polling(self):
         """Запуск бота в режиме polling"""
         await self.dp.start_polling(
             self.bot,
-            handle_signals=False
+            handle_signals=False,
+            allowed_updates=self.dp.resolve_used_update_types()
         )
 
 # Глобальный экземпляр
@@ -0,0 +1,205 @@
+import asyncio
+import os
+import time
+import uuid
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Union
+from urllib.parse import unquote, urlparse
+
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import PRODUCTION, TelegramAPIServer
+from aiogram.methods import TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiogram.types import BufferedInputFile, FSInputFile, InputFile
+from aiohttp import TCPConnector
+from loguru import logger
+
+from config.settings import settings
+
+
+def is_local_api() -> bool:
+    """Работает ли бот через собственный сервер telegram-bot-api"""
+    return bool(settings.bot_api_url)
+
+
+def max_upload_mb() -> int:
+    """Лимит размера отправляемого файла: у локального сервера он намного больше"""
+    return settings.local_api_max_file_size_mb if is_local_api() else settings.max_file_size_mb
+
+
+@dataclass
+class MethodStats:
+    """Накопленная статистика запросов одного метода Bot API"""
+
+    calls: int = 0
+    errors: int = 0
+    bytes: int = 0
+    seconds: float = 0.0
+
+    @property
+    def throughput(self) -> float:
+        """Средняя скорость отправки, байт в секунду"""
+        return self.bytes / self.seconds if self.seconds else 0.0
+
+
+# Хук наблюдения: (метод, байт файлов, секунд, успех)
+RequestHook = Callable[[str, int, float, bool], None]
+
+
+def _input_file_size(value: Any) -> int:
+    if isinstance(value, BufferedInputFile):
+        return len(value.data)
+    path = None
+    if isinstance(value, FSInputFile):
+        path = value.path
+    elif isinstance(value, str) and value.startswith('file://'):
+        # Локальный сервер отвечает только после загрузки файла в Telegram
+        path = unquote(urlparse(value).path)
+    if path is None:
+        return 0
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def payload_size(method: TelegramMethod) -> int:
+    """Сколько байт файлов уходит в запросе (включая медиа внутри альбома)"""
+    size = 0
+    for _, value in method:
+        if isinstance(value, (InputFile, str)):
+            size += _input_file_size(value)
+        elif isinstance(value, list):
+            size += sum(_input_file_size(getattr(item, 'media', None)) for item in value)
+        else:
+            size += _input_file_size(getattr(value, 'media', None))
+    return size
+
+
+class TunedAiohttpSession(AiohttpSession):
+    """Сессия aiogram для больших загрузок.
+
+    Соединения с Bot API держатся открытыми (keep-alive) и переиспользуются
+    между запросами. Таймаут запроса с файлами растет с размером: base_timeout
+    плюс время отправки при скорости не ниже min_upload_rate байт в секунду,
+    но не больше max_timeout, поэтому мелкие вызовы по-прежнему быстро
+    отваливаются при сбое сети. По каждому методу копятся вызовы, байты и
+    секунды; add_hook подписывает внешний сбор метрик.
+    """
+
+    def __init__(
+        self,
+        base_timeout: float = 15,
+        min_upload_rate: float = 256 * 1024,
+        max_timeout: float = 600,
+        keepalive_timeout: float = 60,
+        connection_limit: int = 100,
+        **kwargs: Any,
+    ):
+        super().__init__(**kwargs)
+        self.timeout = base_timeout
+        self.min_upload_rate = min_upload_rate
+        self.max_timeout = max_timeout
+        self.stats: Dict[str, MethodStats] = {}
+        self._hooks: List[RequestHook] = []
+        # Прокси использует свой тип коннектора, его настройки не трогаем
+        if self._connector_type is TCPConnector:
+            self._connector_init.update(
+                limit=connection_limit,
+                keepalive_timeout=keepalive_timeout,
+                ttl_dns_cache=300,
+            )
+
+    def add_hook(self, hook: RequestHook):
+        self._hooks.append(hook)
+
+    def upload_timeout(self, size: int) -> float:
+        return min(self.max_timeout, self.timeout + size / self.min_upload_rate)
+
+    async def make_request(
+        self, bot: Bot, method: TelegramMethod[TelegramType], timeout: Optional[int] = None
+    ) -> TelegramType:
+        name = type(method).__name__
+        size = payload_size(method)
+        if timeout is None and size:
+            timeout = self.upload_timeout(size)
+
+        started = time.monotonic()
+        ok = False
+        try:
+            result = await super().make_request(bot, method, timeout=timeout)
+            ok = True
+            return result
+        finally:
+            self._record(name, size, time.monotonic() - started, ok)
+
+    def _record(self, name: str, size: int, seconds: float, ok: bool):
+        stats = self.stats.setdefault(name, MethodStats())
+        stats.calls += 1
+        stats.bytes += size
+        stats.seconds += seconds
+        if not ok:
+            stats.errors += 1
+        if size:
+            logger.debug(f"{name}: {size / (1024 * 1024):.1f}MB in {seconds:.1f}s (ok={ok})")
+        for hook in self._hooks:
+            try:
+                hook(name, size, seconds, ok)
+            except Exception as e:
+                logger.warning(f"Request hook failed: {e}")
+
+
+def create_session() -> TunedAiohttpSession:
+    """Сессия для Bot API: api.telegram.org или собственный сервер telegram-bot-api"""
+    api = PRODUCTION
+    if is_local_api():
+        logger.info(f"Using local Bot API server at {settings.bot_api_url}")
+        api = TelegramAPIServer.from_base(settings.bot_api_url, is_local=True)
+    return TunedAiohttpSession(
+        api=api,
+        base_timeout=settings.bot_api_timeout,
+        min_upload_rate=settings.bot_api_min_upload_kbps * 1024,
+        max_timeout=settings.bot_api_max_timeout,
+        keepalive_timeout=settings.bot_api_keepalive_seconds,
+    )
+
+
+class LocalOutbox:
+    """Файлы для отправки через локальный сервер Bot API.
+
+    Локальный сервер читает файл по пути file://, поэтому байты не идут
+    multipart-запросом: медиа записывается в каталог, доступный серверу, и
+    удаляется сразу после отправки. Без каталога (публичный Bot API) файл
+    загружается как обычно.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory
+
+    @asynccontextmanager
+    async def file(self, data: bytes, filename: str) -> AsyncIterator[Union[BufferedInputFile, str]]:
+        if not self.directory:
+            yield BufferedInputFile(file=data, filename=filename)
+            return
+
+        path = Path(self.directory).resolve() / f"{uuid.uuid4().hex}_{filename}"
+
+        def write():
+            os.makedirs(path.parent, exist_ok=True)
+            path.write_bytes(data)
+
+        await asyncio.to_thread(write)
+        try:
+            yield path.as_uri()
+        finally:
+            try:
+                path.unlink()
+            except OSError as e:
+                logger.warning(f"Could not remove sent file {path}: {e}")
+
+
+# Каталог отправки нужен только при локальном сервере
+outbox = LocalOutbox(settings.local_api_files_dir if is_local_api() else None)
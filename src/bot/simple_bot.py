@@ -14,11 +14,18 @@ from typing import Optional
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
 
 from config.settings import settings
+from bot.middlewares.flood_control import create_flood_control_middleware
+from bot.middlewares.group_filter import GroupPrefilterMiddleware
+from bot.middlewares.rate_limit import create_rate_limit_middleware
+from bot.session import create_session, max_upload_mb
 
 class SimpleTelegramBot:
     def __init__(self):
-        self.bot = Bot(token=settings.telegram_bot_token)
+        self.bot = Bot(token=settings.telegram_bot_token, session=create_session())
+        self.bot.session.middleware(create_flood_control_middleware())
         self.dp = Dispatcher()
+        self.dp.message.outer_middleware(GroupPrefilterMiddleware())
+        self.dp.message.outer_middleware(create_rate_limit_middleware())
         self.router = Router()
         self.session = None
         self._setup_handlers()
@@ -161,11 +168,11 @@ class SimpleTelegramBot:
             
             # Проверяем размер файла
             file_size_mb = len(media_data) / (1024 * 1024)
-            if file_size_mb > settings.max_file_size_mb:
+            if file_size_mb > max_upload_mb():
                 await loading_message.edit_text(
                     f"❌ <b>Файл слишком большой!</b>\n\n"
                     f"📊 Размер: {file_size_mb:.1f}MB\n"
-                    f"📏 Лимит: {settings.max_file_size_mb}MB",
+                    f"📏 Лимит: {max_upload_mb()}MB",
                     parse_mode=ParseMode.HTML
                 )
                 return
@@ -0,0 +1,66 @@
+import asyncio
+from typing import Any, Dict, Optional
+
+from aiogram import Bot, Dispatcher
+from aiogram.methods import TelegramMethod
+from aiogram.types import Update
+from loguru import logger
+
+
+def serialize_method(bot: Bot, method: TelegramMethod) -> Optional[Dict[str, Any]]:
+    """Запрос к Bot API в виде тела ответа webhook; None, если в запросе есть файлы"""
+    files: Dict[str, Any] = {}
+    payload: Dict[str, Any] = {'method': method.__api_method__}
+    for key, value in method.model_dump(warnings=False).items():
+        value = bot.session.prepare_value(value, bot=bot, files=files)
+        if value is not None:
+            payload[key] = value
+    # Файлы в JSON-ответе не передать - такой запрос отправляется обычным способом
+    return None if files else payload
+
+
+class WebhookReply:
+    """Место для первого запроса обработчика, который уйдет в теле ответа webhook.
+
+    Telegram выполняет запрос из тела ответа сам, так что один исходящий
+    HTTPS-запрос экономится. Если обработчик не успел за отведенное время,
+    место закрывается и запрос отправляется как обычно.
+    """
+
+    def __init__(self):
+        self._future: asyncio.Future = asyncio.get_running_loop().create_future()
+
+    def offer(self, bot: Bot, method: TelegramMethod) -> bool:
+        """Занимает место запросом; False - запрос нужно отправить самому"""
+        if self._future.done():
+            return False
+        payload = serialize_method(bot, method)
+        if payload is None:
+            return False
+        self._future.set_result(payload)
+        return True
+
+    def close(self):
+        if not self._future.done():
+            self._future.set_result(None)
+
+    async def wait(self, timeout: float) -> Optional[Dict[str, Any]]:
+        done, _ = await asyncio.wait({self._future}, timeout=timeout)
+        if not done:
+            self._future.cancel()
+            return None
+        return self._future.result()
+
+
+async def feed_with_reply(dp: Dispatcher, bot: Bot, update: Update, reply: Optional[WebhookReply] = None):
+    """Обрабатывает обновление; запрос, который вернул обработчик, уходит в ответ webhook или отправляется"""
+    try:
+        result = await dp.feed_update(bot, update)
+        if isinstance(result, TelegramMethod):
+            if reply is not None and reply.offer(bot, result):
+                logger.debug(f"Update {update.update_id} answered in webhook response: {result.__api_method__}")
+            else:
+                await dp.silent_call_request(bot=bot, result=result)
+    finally:
+        if reply is not None:
+            reply.close()
@@ -0,0 +1,100 @@
+import asyncio
+import multiprocessing
+import signal
+from typing import Callable, List, Optional
+
+from loguru import logger
+
+from config.settings import settings
+
+# Как часто проверять, живы ли процессы-воркеры
+SUPERVISE_INTERVAL = 5
+STOP_TIMEOUT = 10
+
+
+async def serve_jobs():
+    """Выполняет задания из общей очереди до сигнала остановки"""
+    from bot.main import create_bot
+    from bot.handlers.media import bulkheads, image_processor, job_runner, scheduler
+
+    bot = create_bot()
+    await bot.me()
+    job_runner.start(bot)
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+
+    logger.info(f"Download worker started ({job_runner.store.worker_id})")
+    await stop.wait()
+
+    # Незавершенные задания останутся за этим воркером до истечения аренды,
+    # после чего их заберут другие процессы
+    await job_runner.stop()
+    await scheduler.stop()
+    await bulkheads.close()
+    image_processor.shutdown(wait=True)
+    await bot.session.close()
+    logger.info("Download worker stopped")
+
+
+def run_worker(index: int):
+    """Точка входа процесса-воркера"""
+    logger.info(f"Starting download worker #{index}")
+    asyncio.run(serve_jobs())
+
+
+class WorkerProcesses:
+    """Процессы-воркеры загрузок на этом хосте с автоматическим перезапуском.
+
+    Процессы общаются с webhook-фронтендом только через очередь заданий в
+    SQLite и общий кэш на диске, поэтому каждый из них может занимать
+    отдельное ядро.
+    """
+
+    def __init__(self, count: int, target: Callable[[int], None] = run_worker):
+        self.count = count
+        self.target = target
+        self._context = multiprocessing.get_context('spawn')
+        self._processes: List[Optional[multiprocessing.Process]] = [None] * count
+        self._task: Optional[asyncio.Task] = None
+
+    def _spawn(self, index: int):
+        # Не daemon: демоническому процессу нельзя создавать дочерние, а воркеру нужен
+        # пул процессов для фото. Останавливает воркеры stop()
+        process = self._context.Process(target=self.target, args=(index,), name=f'download-worker-{index}')
+        process.start()
+        self._processes[index] = process
+
+    def start(self):
+        for index in range(self.count):
+            self._spawn(index)
+        if self.count:
+            self._task = asyncio.get_running_loop().create_task(self._supervise())
+        logger.info(f"Started {self.count} download worker processes")
+
+    async def _supervise(self):
+        while True:
+            await asyncio.sleep(SUPERVISE_INTERVAL)
+            for index, process in enumerate(self._processes):
+                if process is not None and not process.is_alive():
+                    logger.warning(f"Download worker #{index} exited with code {process.exitcode}, restarting")
+                    self._spawn(index)
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+        for process in self._processes:
+            if process is not None and process.is_alive():
+                process.terminate()
+        for process in self._processes:
+            if process is None:
+                continue
+            await asyncio.to_thread(process.join, STOP_TIMEOUT)
+            if process.is_alive():
+                process.kill()
+        self._processes = [None] * self.count
@@ -16,6 +16,110 @@ class Settings(BaseSettings):
     max_file_size_mb: int = 50
     timeout_seconds: int = 30
     
+    # Собственный сервер telegram-bot-api (например, http://localhost:8081): файлы
+    # передаются ему по пути из local_api_files_dir, лимит размера - local_api_max_file_size_mb.
+    # Загрузка целиком держится в памяти процесса, поэтому лимит ниже 2000MB сервера
+    bot_api_url: Optional[str] = None
+    local_api_files_dir: str = "data/outbox"
+    local_api_max_file_size_mb: int = 200
+    
+    # HTTP-сессия Bot API: таймаут обычных вызовов, минимальная ожидаемая скорость
+    # отправки файлов (таймаут загрузки растет с размером), предельный таймаут и keep-alive
+    bot_api_timeout: int = 15
+    bot_api_min_upload_kbps: int = 256
+    bot_api_max_timeout: int = 600
+    bot_api_keepalive_seconds: int = 60
+    
+    # Очередь обновлений webhook
+    webhook_workers: int = 8
+    webhook_queue_size: int = 100
+    # Сколько ждать первый запрос обработчика, чтобы вернуть его в ответе webhook
+    webhook_reply_timeout: float = 2.0
+    
+    # Окно недавних update_id для отсева повторных доставок (путь - для сохранения на диск)
+    update_dedup_size: int = 10000
+    update_dedup_path: Optional[str] = None
+    
+    # Очередь загрузок
+    download_workers: int = 4
+    max_queued_per_user: int = 3
+    user_state_ttl_seconds: int = 600
+    
+    # Классы приоритета: id администраторов и поддержавших проект (через запятую),
+    # файл с id поддержавших, доля воркеров для остальных и предельное ожидание в очереди
+    admin_ids: str = ""
+    supporter_ids: str = ""
+    supporters_file: Optional[str] = None
+    free_worker_share: float = 0.75
+    max_queue_wait_seconds: int = 120
+    
+    # Ограничение частоты ссылок: запросов в секунду и размер пачки
+    rate_limit_user_rate: float = 0.1
+    rate_limit_user_burst: int = 3
+    rate_limit_chat_rate: float = 0.5
+    rate_limit_chat_burst: int = 10
+    rate_limit_global_rate: float = 10.0
+    rate_limit_global_burst: int = 50
+    
+    # Как часто показывать пользователю сообщение про донат
+    promo_interval_hours: int = 24
+    
+    # Лимиты исходящих запросов к Telegram: сообщений в секунду на бота и на чат
+    outbound_global_rate: float = 30.0
+    outbound_chat_rate: float = 1.0
+    outbound_chat_burst: int = 3
+    outbound_max_retries: int = 3
+    
+    # Пороги перегрузки, после которых новые ссылки получают отказ
+    max_in_flight_jobs: int = 50
+    max_in_flight_mb: int = 500
+    max_loop_lag_ms: int = 500
+    
+    # Изоляция платформ: одновременные загрузки, соединения и потоки yt-dlp на платформу,
+    # отдельные лимиты загрузок вида "tiktok=2,instagram=3"
+    platform_concurrency: int = 4
+    platform_connections: int = 20
+    platform_executor_workers: int = 2
+    platform_limits: str = ""
+    
+    # Постоянная очередь заданий в SQLite
+    job_db_path: str = "data/jobs.sqlite3"
+    job_lease_seconds: int = 30
+    job_max_attempts: int = 3
+    job_poll_interval: float = 1.0
+    
+    # Отдельные процессы-воркеры для загрузок (0 - загрузки в процессе webhook)
+    worker_processes: int = 0
+    
+    # Общий для всех процессов кэш на диске
+    cache_dir: str = "data/cache"
+    
+    # Несколько ссылок в одном сообщении: сколько обработать и сколько качать одновременно
+    max_links_per_message: int = 10
+    links_per_message_concurrency: int = 3
+    links_per_user_concurrency: int = 4
+    # Новая ссылка отменяет незавершенные загрузки пользователя в том же чате
+    supersede_previous_links: bool = True
+    
+    # Ход загрузки: не чаще одной правки сообщения за интервал, не больше max_edits правок на задание
+    progress_interval_seconds: float = 3.0
+    progress_max_edits: int = 20
+    progress_global_rate: float = 5.0
+    
+    # Inline-режим: индекс file_id и чат, куда загружается медиа для inline-ответов
+    file_id_db_path: str = "data/file_ids.sqlite3"
+    inline_cache_chat_id: Optional[int] = None
+    inline_cache_time: int = 300
+    
+    # Количество процессов для пережатия фото
+    image_workers: int = 2
+    
+    # Постобработка видео через ffmpeg
+    max_download_size_mb: int = 200
+    ffmpeg_workers: int = 2
+    ffmpeg_threads: int = 2
+    ffmpeg_timeout_seconds: int = 300
+    
     # Настройки прокси (если необходимо)
     proxy_url: Optional[str] = None
     
@@ -40,6 +144,65 @@ except Exception as e:
         webhook_url = os.getenv('WEBHOOK_URL')
         max_file_size_mb = int(os.getenv('MAX_FILE_SIZE_MB', '50'))
         timeout_seconds = int(os.getenv('TIMEOUT_SECONDS', '30'))
+        bot_api_url = os.getenv('BOT_API_URL')
+        local_api_files_dir = os.getenv('LOCAL_API_FILES_DIR', 'data/outbox')
+        local_api_max_file_size_mb = int(os.getenv('LOCAL_API_MAX_FILE_SIZE_MB', '200'))
+        bot_api_timeout = int(os.getenv('BOT_API_TIMEOUT', '15'))
+        bot_api_min_upload_kbps = int(os.getenv('BOT_API_MIN_UPLOAD_KBPS', '256'))
+        bot_api_max_timeout = int(os.getenv('BOT_API_MAX_TIMEOUT', '600'))
+        bot_api_keepalive_seconds = int(os.getenv('BOT_API_KEEPALIVE_SECONDS', '60'))
+        webhook_workers = int(os.getenv('WEBHOOK_WORKERS', '8'))
+        webhook_queue_size = int(os.getenv('WEBHOOK_QUEUE_SIZE', '100'))
+        webhook_reply_timeout = float(os.getenv('WEBHOOK_REPLY_TIMEOUT', '2.0'))
+        update_dedup_size = int(os.getenv('UPDATE_DEDUP_SIZE', '10000'))
+        update_dedup_path = os.getenv('UPDATE_DEDUP_PATH')
+        download_workers = int(os.getenv('DOWNLOAD_WORKERS', '4'))
+        max_queued_per_user = int(os.getenv('MAX_QUEUED_PER_USER', '3'))
+        user_state_ttl_seconds = int(os.getenv('USER_STATE_TTL_SECONDS', '600'))
+        admin_ids = os.getenv('ADMIN_IDS', '')
+        supporter_ids = os.getenv('SUPPORTER_IDS', '')
+        supporters_file = os.getenv('SUPPORTERS_FILE')
+        free_worker_share = float(os.getenv('FREE_WORKER_SHARE', '0.75'))
+        max_queue_wait_seconds = int(os.getenv('MAX_QUEUE_WAIT_SECONDS', '120'))
+        promo_interval_hours = int(os.getenv('PROMO_INTERVAL_HOURS', '24'))
+        outbound_global_rate = float(os.getenv('OUTBOUND_GLOBAL_RATE', '30'))
+        outbound_chat_rate = float(os.getenv('OUTBOUND_CHAT_RATE', '1'))
+        outbound_chat_burst = int(os.getenv('OUTBOUND_CHAT_BURST', '3'))
+        outbound_max_retries = int(os.getenv('OUTBOUND_MAX_RETRIES', '3'))
+        max_in_flight_jobs = int(os.getenv('MAX_IN_FLIGHT_JOBS', '50'))
+        max_in_flight_mb = int(os.getenv('MAX_IN_FLIGHT_MB', '500'))
+        max_loop_lag_ms = int(os.getenv('MAX_LOOP_LAG_MS', '500'))
+        platform_concurrency = int(os.getenv('PLATFORM_CONCURRENCY', '4'))
+        platform_connections = int(os.getenv('PLATFORM_CONNECTIONS', '20'))
+        platform_executor_workers = int(os.getenv('PLATFORM_EXECUTOR_WORKERS', '2'))
+        platform_limits = os.getenv('PLATFORM_LIMITS', '')
+        job_db_path = os.getenv('JOB_DB_PATH', 'data/jobs.sqlite3')
+        job_lease_seconds = int(os.getenv('JOB_LEASE_SECONDS', '30'))
+        job_max_attempts = int(os.getenv('JOB_MAX_ATTEMPTS', '3'))
+        job_poll_interval = float(os.getenv('JOB_POLL_INTERVAL', '1.0'))
+        worker_processes = int(os.getenv('WORKER_PROCESSES', '0'))
+        cache_dir = os.getenv('CACHE_DIR', 'data/cache')
+        max_links_per_message = int(os.getenv('MAX_LINKS_PER_MESSAGE', '10'))
+        links_per_message_concurrency = int(os.getenv('LINKS_PER_MESSAGE_CONCURRENCY', '3'))
+        links_per_user_concurrency = int(os.getenv('LINKS_PER_USER_CONCURRENCY', '4'))
+        supersede_previous_links = os.getenv('SUPERSEDE_PREVIOUS_LINKS', 'true').lower() in ('1', 'true', 'yes')
+        progress_interval_seconds = float(os.getenv('PROGRESS_INTERVAL_SECONDS', '3.0'))
+        progress_max_edits = int(os.getenv('PROGRESS_MAX_EDITS', '20'))
+        progress_global_rate = float(os.getenv('PROGRESS_GLOBAL_RATE', '5.0'))
+        file_id_db_path = os.getenv('FILE_ID_DB_PATH', 'data/file_ids.sqlite3')
+        inline_cache_chat_id = int(os.getenv('INLINE_CACHE_CHAT_ID')) if os.getenv('INLINE_CACHE_CHAT_ID') else None
+        inline_cache_time = int(os.getenv('INLINE_CACHE_TIME', '300'))
+        rate_limit_user_rate = float(os.getenv('RATE_LIMIT_USER_RATE', '0.1'))
+        rate_limit_user_burst = int(os.getenv('RATE_LIMIT_USER_BURST', '3'))
+        rate_limit_chat_rate = float(os.getenv('RATE_LIMIT_CHAT_RATE', '0.5'))
+        rate_limit_chat_burst = int(os.getenv('RATE_LIMIT_CHAT_BURST', '10'))
+        rate_limit_global_rate = float(os.getenv('RATE_LIMIT_GLOBAL_RATE', '10'))
+        rate_limit_global_burst = int(os.getenv('RATE_LIMIT_GLOBAL_BURST', '50'))
+        image_workers = int(os.getenv('IMAGE_WORKERS', '2'))
+        max_download_size_mb = int(os.getenv('MAX_DOWNLOAD_SIZE_MB', '200'))
+        ffmpeg_workers = int(os.getenv('FFMPEG_WORKERS', '2'))
+        ffmpeg_threads = int(os.getenv('FFMPEG_THREADS', '2'))
+        ffmpeg_timeout_seconds = int(os.getenv('FFMPEG_TIMEOUT_SECONDS', '300'))
         proxy_url = os.getenv('PROXY_URL')
     
     settings = FallbackSettings()
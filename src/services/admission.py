@@ -0,0 +1,102 @@
+import asyncio
+from typing import Callable, Dict, Optional
+
+from loguru import logger
+
+# Причины отказа в приеме новой работы
+IN_FLIGHT = 'in_flight'
+MEMORY = 'memory'
+LOOP_LAG = 'loop_lag'
+
+
+class LoopLagMonitor:
+    """Измеряет задержку цикла событий: насколько позже запланированного просыпается sleep"""
+
+    def __init__(self, interval: float = 0.5):
+        self.interval = interval
+        self.lag = 0.0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def ensure_started(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._task is not None and not self._task.done():
+            return
+        self._loop = loop
+        self.lag = 0.0
+        self._task = loop.create_task(self._run())
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - started - self.interval)
+            # Рост учитываем сразу, спад - плавно, чтобы не пускать нагрузку рывками
+            self.lag = lag if lag > self.lag else self.lag * 0.7 + lag * 0.3
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+class AdmissionController:
+    """Решает, принимать ли новую загрузку, по текущей нагрузке процесса.
+
+    Учитывает число незавершенных заданий, объем скачанных, но еще не
+    отправленных медиа в памяти и задержку цикла событий. Если хотя бы один
+    порог превышен, новые ссылки сразу получают короткий ответ «занято», а
+    уже принятая работа продолжает выполняться без конкуренции за ресурсы.
+    """
+
+    def __init__(
+        self,
+        in_flight: Callable[[], int],
+        max_in_flight: int = 50,
+        max_bytes: int = 500 * 1024 * 1024,
+        max_loop_lag: float = 0.5,
+        lag_monitor: Optional[LoopLagMonitor] = None,
+    ):
+        self.in_flight = in_flight
+        self.max_in_flight = max_in_flight
+        self.max_bytes = max_bytes
+        self.max_loop_lag = max_loop_lag
+        self.lag_monitor = lag_monitor or LoopLagMonitor()
+        self.held_bytes = 0
+
+    def hold_bytes(self, size: int):
+        self.held_bytes += size
+
+    def release_bytes(self, size: int):
+        self.held_bytes = max(0, self.held_bytes - size)
+
+    def _overload_reason(self) -> Optional[str]:
+        if self.in_flight() >= self.max_in_flight:
+            return IN_FLIGHT
+        if self.held_bytes >= self.max_bytes:
+            return MEMORY
+        if self.lag_monitor.lag >= self.max_loop_lag:
+            return LOOP_LAG
+        return None
+
+    def check(self) -> Optional[str]:
+        """None, если новую работу можно принять, иначе причина отказа"""
+        self.lag_monitor.ensure_started()
+        reason = self._overload_reason()
+        if reason:
+            logger.warning(f"Shedding new work: {reason} ({self.stats()})")
+        return reason
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            'in_flight': self.in_flight(),
+            'held_mb': round(self.held_bytes / (1024 * 1024), 1),
+            'loop_lag_ms': round(self.lag_monitor.lag * 1000, 1),
+        }
+
+    @property
+    def ready(self) -> bool:
+        """Готов ли процесс принимать новую работу (для проверки readiness)"""
+        return self._overload_reason() is None
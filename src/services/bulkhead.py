@@ -0,0 +1,149 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Dict, Hashable, List, Optional
+
+import aiohttp
+from loguru import logger
+
+
+class Bulkhead:
+    """Изолированные ресурсы одной платформы.
+
+    Ограничивает число одновременных загрузок, держит свой пул соединений и
+    свои потоки для извлечения через yt-dlp. Если платформа недоступна и
+    загрузки висят на таймаутах, они занимают только ее ресурсы.
+    """
+
+    def __init__(self, name: str, max_concurrent: int = 4, max_connections: int = 20, executor_workers: int = 2):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_connections = max_connections
+        self.executor = ThreadPoolExecutor(max_workers=executor_workers, thread_name_prefix=f'{name}-extract')
+        self.active = 0
+        self.waiting = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._connector: Optional[aiohttp.TCPConnector] = None
+
+    def _ensure_loop(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        # Семафор и соединения привязаны к циклу событий (serverless создает новый на запрос)
+        self._loop = loop
+        self._semaphore = asyncio.Semaphore(self.max_concurrent)
+        self._connector = None
+        self.active = self.waiting = 0
+
+    @asynccontextmanager
+    async def slot(self):
+        """Место для одной загрузки с этой платформы"""
+        self._ensure_loop()
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.active += 1
+        try:
+            yield self
+        finally:
+            self.active -= 1
+            self._semaphore.release()
+
+    def connector(self) -> aiohttp.TCPConnector:
+        """Общий пул соединений платформы; сессии используют его с connector_owner=False"""
+        self._ensure_loop()
+        if self._connector is None or self._connector.closed:
+            self._connector = aiohttp.TCPConnector(limit=self.max_connections)
+        return self._connector
+
+    def stats(self) -> Dict[str, int]:
+        return {'active': self.active, 'waiting': self.waiting}
+
+    async def close(self):
+        if self._connector is not None and self._loop is asyncio.get_running_loop():
+            await self._connector.close()
+        self._connector = None
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def parse_limits(value: Optional[str]) -> Dict[str, int]:
+    """Разбирает лимиты вида tiktok=2,instagram=3"""
+    limits = {}
+    for part in (value or '').split(','):
+        name, _, limit = part.partition('=')
+        if not name.strip():
+            continue
+        try:
+            limits[name.strip().lower()] = int(limit)
+        except ValueError:
+            logger.warning(f"Skipping invalid bulkhead limit: {part!r}")
+    return limits
+
+
+class Bulkheads:
+    """Реестр изолированных ресурсов по платформам (создаются при первом обращении).
+
+    limits переопределяет число одновременных загрузок для отдельных платформ.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = 4,
+        max_connections: int = 20,
+        executor_workers: int = 2,
+        limits: Optional[Dict[str, int]] = None,
+    ):
+        self.max_concurrent = max_concurrent
+        self.limits = limits or {}
+        self.max_connections = max_connections
+        self.executor_workers = executor_workers
+        self._bulkheads: Dict[str, Bulkhead] = {}
+
+    def get(self, platform: str) -> Bulkhead:
+        bulkhead = self._bulkheads.get(platform)
+        if bulkhead is None:
+            bulkhead = self._bulkheads[platform] = Bulkhead(
+                platform, self.limits.get(platform, self.max_concurrent), self.max_connections, self.executor_workers
+            )
+        return bulkhead
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {name: bulkhead.stats() for name, bulkhead in self._bulkheads.items()}
+
+    async def close(self):
+        for bulkhead in self._bulkheads.values():
+            await bulkhead.close()
+        self._bulkheads.clear()
+        logger.debug("Platform bulkheads closed")
+
+
+class KeyedSemaphore:
+    """Не больше limit одновременных операций на ключ (например, загрузок одного пользователя).
+
+    Семафор ключа живет, только пока его кто-то занимает или ждет, поэтому
+    память не растет с числом пользователей.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._entries: Dict[Hashable, List] = {}
+
+    @asynccontextmanager
+    async def slot(self, key: Hashable):
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = [asyncio.Semaphore(self.limit), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._entries[key]
+
+    def __len__(self) -> int:
+        return len(self._entries)
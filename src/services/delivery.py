@@ -0,0 +1,61 @@
+import html
+from dataclasses import dataclass
+from typing import Optional
+
+# Ограничения Telegram на длину подписи к медиа и текста сообщения
+CAPTION_LIMIT = 1024
+MESSAGE_LIMIT = 4096
+
+POST_TEXT_HEADER = "📝 <b>Текст поста:</b>\n\n"
+
+# Подпись к части нарезанного видео начинается с номера части
+PART_PREFIX = "Часть {number}/{total}\n"
+
+
+def text_length(text: str) -> int:
+    """Длина текста так, как ее считает Telegram: в кодовых единицах UTF-16"""
+    return len(text.encode('utf-16-le')) // 2
+
+
+def truncate(text: str, limit: int) -> str:
+    """Обрезает текст до limit кодовых единиц UTF-16, не разрывая суррогатные пары"""
+    return text.encode('utf-16-le')[:limit * 2].decode('utf-16-le', errors='ignore')
+
+
+# Место под номер части в подписи: план составляется до того, как известно, будет ли видео нарезано
+PART_PREFIX_RESERVE = text_length(PART_PREFIX.format(number=99, total=99))
+
+
+@dataclass
+class DeliveryPlan:
+    """Как отправить результат загрузки за минимальное число запросов к Bot API.
+
+    first_caption - подпись к первому медиа (текст поста, если он в нее
+    помещается); status_text - текст, в который превращается сообщение о
+    загрузке, если текст поста в подпись не поместился. Если status_text
+    пустой, сообщение о загрузке удаляется.
+    """
+
+    first_caption: str
+    caption: str
+    status_text: Optional[str] = None
+
+
+def plan_delivery(post_text: Optional[str], signature: str) -> DeliveryPlan:
+    """Размещает текст поста в подписи к первому медиа или в сообщении о загрузке"""
+    post_text = (post_text or '').strip()
+    if not post_text:
+        return DeliveryPlan(first_caption=signature, caption=signature)
+
+    # Лимит считается по видимому тексту, HTML-разметка в него не входит
+    if PART_PREFIX_RESERVE + text_length(post_text) + 2 + text_length(signature) <= CAPTION_LIMIT:
+        return DeliveryPlan(first_caption=f"{html.escape(post_text)}\n\n{signature}", caption=signature)
+
+    visible_header = text_length("📝 Текст поста:\n\n")
+    if text_length(post_text) + visible_header > MESSAGE_LIMIT:
+        post_text = truncate(post_text, MESSAGE_LIMIT - visible_header - 1) + "…"
+    return DeliveryPlan(
+        first_caption=signature,
+        caption=signature,
+        status_text=f"{POST_TEXT_HEADER}{html.escape(post_text)}",
+    )
@@ -0,0 +1,393 @@
+import asyncio
+import itertools
+import math
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterable, List, Optional, Set, Tuple
+
+from loguru import logger
+
+# Классы приоритета
+ADMIN = 'admin'
+SUPPORTER = 'supporter'
+FREE = 'free'
+
+
+class QueueFullError(Exception):
+    """У пользователя уже слишком много заданий в очереди"""
+
+    def __init__(self, user_id: int, limit: int):
+        super().__init__(f"User {user_id} already has {limit} jobs queued")
+        self.user_id = user_id
+        self.limit = limit
+
+
+@dataclass
+class Job:
+    """Задание на обработку одной ссылки"""
+
+    user_id: int
+    chat_id: int
+    run: Callable[[], Awaitable[Any]]
+    priority: str = FREE
+    # Ожидаемая стоимость (размер медиа в МБ): дешевые задания идут раньше
+    cost: float = 1.0
+    job_id: int = 0
+    created_at: float = field(default_factory=time.monotonic)
+    started_at: Optional[float] = None
+    future: Optional[asyncio.Future] = None
+    task: Optional[asyncio.Task] = None
+
+
+@dataclass
+class LaneConfig:
+    """Класс приоритета: вес в разделении воркеров и доля воркеров, которую он может занять"""
+
+    name: str
+    weight: float
+    share: float = 1.0
+
+
+DEFAULT_LANES = (
+    LaneConfig(ADMIN, weight=8),
+    LaneConfig(SUPPORTER, weight=4),
+    LaneConfig(FREE, weight=1, share=0.75),
+)
+
+
+@dataclass
+class _UserState:
+    queue: Deque[Job] = field(default_factory=deque)
+    running: int = 0
+    last_active: float = field(default_factory=time.monotonic)
+
+    @property
+    def outstanding(self) -> int:
+        return len(self.queue) + self.running
+
+
+@dataclass
+class _Lane:
+    config: LaneConfig
+    max_running: int
+    # Порядок ключей - кольцо обхода: обслуженный пользователь уходит в конец
+    users: "OrderedDict[int, _UserState]" = field(default_factory=OrderedDict)
+    running: int = 0
+    # Виртуальное время взвешенного разделения: растет на 1/weight за каждое задание
+    virtual_time: float = 0.0
+
+    @property
+    def queued(self) -> int:
+        return sum(len(state.queue) for state in self.users.values())
+
+
+def _consume_exception(future: asyncio.Future):
+    # Ошибка уже записана в лог планировщиком; ждать результат задания не обязательно
+    if not future.cancelled():
+        future.exception()
+
+
+class DownloadScheduler:
+    """Очередь заданий с глобальным пулом воркеров и справедливым обслуживанием.
+
+    Одновременно выполняется не больше workers заданий. Задания делятся на
+    классы приоритета (администраторы, поддержавшие проект, остальные):
+    свободный воркер достается классу с наименьшим виртуальным временем, так
+    что классы получают воркеры пропорционально весам, а доля share
+    ограничивает, сколько воркеров класс может занять одновременно. Задание,
+    ждущее дольше max_wait секунд, обслуживается вне очереди - так низкий
+    приоритет не голодает.
+
+    Внутри класса сначала обслуживаются пользователи, у которых сейчас меньше
+    выполняющихся заданий, среди них - задание с наименьшей ожидаемой
+    стоимостью (shortest expected job first). Стоимость уменьшается на
+    единицу за каждые aging_interval секунд ожидания, так что большие задания
+    не застревают за потоком мелких; при равной стоимости пользователи
+    обслуживаются по кругу. Задания одного чата выполняются строго по очереди
+    и в порядке поступления. Состояние пользователя без заданий удаляется
+    через idle_ttl секунд.
+    """
+
+    def __init__(
+        self,
+        workers: int = 4,
+        max_queued_per_user: int = 3,
+        idle_ttl: float = 600,
+        cleanup_interval: float = 60,
+        lanes: Iterable[LaneConfig] = DEFAULT_LANES,
+        max_wait: float = 120,
+        aging_interval: float = 2,
+    ):
+        self.workers = workers
+        self.max_queued_per_user = max_queued_per_user
+        self.idle_ttl = idle_ttl
+        self.cleanup_interval = cleanup_interval
+        self.max_wait = max_wait
+        self.aging_interval = aging_interval
+
+        self._lanes: Dict[str, _Lane] = {
+            config.name: _Lane(config, max_running=max(1, math.ceil(config.share * workers)))
+            for config in lanes
+        }
+        self._default_lane = list(self._lanes)[-1]
+        self._virtual_time = 0.0
+        # Задания каждого чата в порядке поступления (ожидающие и выполняемое)
+        self._chats: Dict[int, Deque[Job]] = {}
+        self._running_chats: Set[int] = set()
+        self._counter = itertools.count(1)
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def queued(self) -> int:
+        return sum(lane.queued for lane in self._lanes.values())
+
+    @property
+    def running(self) -> int:
+        return sum(lane.running for lane in self._lanes.values())
+
+    def lane_stats(self) -> Dict[str, Dict[str, int]]:
+        return {
+            name: {'queued': lane.queued, 'running': lane.running, 'max_running': lane.max_running}
+            for name, lane in self._lanes.items()
+        }
+
+    def outstanding_for(self, user_id: int) -> int:
+        """Сколько заданий пользователя ждут или выполняются"""
+        return sum(
+            lane.users[user_id].outstanding
+            for lane in self._lanes.values() if user_id in lane.users
+        )
+
+    def submit(
+        self,
+        user_id: int,
+        chat_id: int,
+        run: Callable[[], Awaitable[Any]],
+        enforce_limit: bool = True,
+        priority: Optional[str] = None,
+        cost: Optional[float] = None,
+    ) -> Job:
+        """Ставит задание в очередь и сразу возвращает его; результат - в job.future"""
+        self._ensure_started()
+
+        if enforce_limit and self.outstanding_for(user_id) >= self.max_queued_per_user:
+            raise QueueFullError(user_id, self.max_queued_per_user)
+
+        if priority not in self._lanes:
+            priority = self._default_lane
+        lane = self._lanes[priority]
+        if not lane.queued:
+            # Простаивавший класс не копит «кредит» за время простоя
+            lane.virtual_time = max(lane.virtual_time, self._virtual_time)
+
+        state = lane.users.get(user_id)
+        if state is None:
+            state = lane.users[user_id] = _UserState()
+
+        job = Job(
+            user_id=user_id, chat_id=chat_id, run=run, priority=priority,
+            cost=1.0 if cost is None else cost, job_id=next(self._counter),
+        )
+        job.future = self._loop.create_future()
+        job.future.add_done_callback(_consume_exception)
+
+        state.queue.append(job)
+        state.last_active = time.monotonic()
+        self._chats.setdefault(chat_id, deque()).append(job)
+        self._wakeup.set()
+
+        logger.debug(
+            f"Job {job.job_id} ({priority}, cost {job.cost:.1f}) queued for user {user_id} "
+            f"({self.queued} queued, {self.running} running)"
+        )
+        return job
+
+    def cancel(self, job: Job) -> bool:
+        """Отменяет задание; False, если оно уже завершено.
+
+        Ожидающее задание убирается из очереди, у выполняющегося отменяется
+        задача - отмена доходит до всех его загрузок и подпроцессов, а воркер
+        освобождается, как только задача завершится.
+        """
+        if job.future is None or job.future.done():
+            return False
+        if job.task is not None:
+            job.task.cancel()
+            return True
+
+        state = self._lanes[job.priority].users.get(job.user_id)
+        if state is not None and job in state.queue:
+            state.queue.remove(job)
+        chat_jobs = self._chats.get(job.chat_id)
+        if chat_jobs is not None and job in chat_jobs:
+            chat_jobs.remove(job)
+            if not chat_jobs:
+                del self._chats[job.chat_id]
+        job.future.cancel()
+        logger.debug(f"Job {job.job_id} cancelled while queued")
+        # Следующее задание чата могло стать первым в очереди
+        self._wakeup.set()
+        return True
+
+    def _ensure_started(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._tasks:
+            return
+
+        if self._loop is not None and self._loop is not loop:
+            # Serverless-окружения создают новый цикл событий на каждый запрос:
+            # задания старого цикла выполнить уже невозможно
+            logger.warning("Event loop changed, dropping scheduler state")
+            for lane in self._lanes.values():
+                lane.users.clear()
+                lane.running = 0
+            self._chats.clear()
+            self._running_chats.clear()
+
+        self._loop = loop
+        self._wakeup = asyncio.Event()
+        self._tasks = [loop.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(loop.create_task(self._janitor()))
+
+    def _effective_cost(self, job: Job, now: float) -> float:
+        # Старение ступенями: задания одной стоимости сохраняют круговой порядок
+        return job.cost - (now - job.created_at) // self.aging_interval
+
+    def _lane_head(self, lane: _Lane, now: float) -> Optional[Tuple[int, _UserState, Job]]:
+        """Самое дешевое готовое к запуску задание класса"""
+        best, best_key = None, None
+        for user_id, state in lane.users.items():
+            for job in state.queue:
+                if job.chat_id in self._running_chats or self._chats[job.chat_id][0] is not job:
+                    continue
+                key = (state.running, self._effective_cost(job, now))
+                if best_key is None or key < best_key:
+                    best, best_key = (user_id, state, job), key
+        return best
+
+    def _pick(self) -> Optional[Job]:
+        """Следующее задание: голодающее, иначе из класса с наименьшим виртуальным временем"""
+        now = time.monotonic()
+        candidates = []
+        for lane in self._lanes.values():
+            if lane.running >= lane.max_running:
+                continue
+            head = self._lane_head(lane, now)
+            if head is not None:
+                candidates.append((lane, head))
+        if not candidates:
+            return None
+
+        starving = [item for item in candidates if now - item[1][2].created_at >= self.max_wait]
+        if starving:
+            lane, (user_id, state, job) = min(starving, key=lambda item: item[1][2].created_at)
+        else:
+            lane, (user_id, state, job) = min(
+                candidates, key=lambda item: (item[0].virtual_time, -item[0].config.weight)
+            )
+
+        state.queue.remove(job)
+        state.running += 1
+        lane.users.move_to_end(user_id)
+        lane.running += 1
+        self._virtual_time = max(self._virtual_time, lane.virtual_time)
+        lane.virtual_time += 1 / lane.config.weight
+        self._running_chats.add(job.chat_id)
+        return job
+
+    async def _worker(self):
+        while True:
+            job = self._pick()
+            if job is None:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            await self._execute(job)
+
+    async def _execute(self, job: Job):
+        job.started_at = time.monotonic()
+        job.task = asyncio.create_task(job.run())
+        try:
+            # wait не пробрасывает отмену самого задания в воркер
+            await asyncio.wait({job.task})
+        finally:
+            if not job.task.done():
+                job.task.cancel()
+            self._finish(job)
+
+    def _finish(self, job: Job):
+        lane = self._lanes[job.priority]
+        lane.running = max(0, lane.running - 1)
+        state = lane.users.get(job.user_id)
+        if state is not None:
+            state.running -= 1
+            state.last_active = time.monotonic()
+
+        self._running_chats.discard(job.chat_id)
+        chat_jobs = self._chats.get(job.chat_id)
+        if chat_jobs is not None:
+            chat_jobs.remove(job)
+            if not chat_jobs:
+                del self._chats[job.chat_id]
+
+        if not job.future.done():
+            if job.task.done() and not job.task.cancelled():
+                error = job.task.exception()
+                if error is not None:
+                    logger.opt(exception=error).error(f"Job {job.job_id} failed: {error}")
+                    job.future.set_exception(error)
+                else:
+                    job.future.set_result(job.task.result())
+            else:
+                job.future.cancel()
+
+        logger.debug(
+            f"Job {job.job_id} ({job.priority}) finished in {time.monotonic() - job.started_at:.1f}s, "
+            f"waited {job.started_at - job.created_at:.1f}s"
+        )
+        # Освободился чат и воркер - возможно, их ждет следующее задание
+        self._wakeup.set()
+
+    async def _janitor(self):
+        while True:
+            await asyncio.sleep(self.cleanup_interval)
+            self.cleanup()
+
+    def cleanup(self, now: Optional[float] = None) -> int:
+        """Удаляет состояние пользователей без заданий, простаивающих дольше idle_ttl"""
+        now = time.monotonic() if now is None else now
+        dropped = 0
+        for lane in self._lanes.values():
+            idle = [
+                user_id for user_id, state in lane.users.items()
+                if not state.outstanding and now - state.last_active > self.idle_ttl
+            ]
+            for user_id in idle:
+                del lane.users[user_id]
+            dropped += len(idle)
+        if dropped:
+            logger.debug(f"Dropped idle state of {dropped} users")
+        return dropped
+
+    async def join(self):
+        """Ждет завершения всех поставленных заданий, включая добавленные во время ожидания"""
+        while self._chats and self._loop is asyncio.get_running_loop():
+            futures = [job.future for jobs in self._chats.values() for job in jobs]
+            await asyncio.wait(futures)
+
+    async def stop(self):
+        """Останавливает воркеры; выполняющиеся и ожидающие задания отменяются"""
+        for lane in self._lanes.values():
+            for state in lane.users.values():
+                for job in state.queue:
+                    job.future.cancel()
+                state.queue.clear()
+        self._chats.clear()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
@@ -1,4 +1,5 @@
 import asyncio
+import os
 import aiohttp
 import yt_dlp
 import re
@@ -8,10 +9,32 @@ from bs4 import BeautifulSoup
 import json
 from .instagram_api import InstagramAPIDownloader
 from .video_downloader import VideoDownloader
+from .page_scanner import scan_page, LD_JSON, MP4_HREF, MP4_URL, OG_DESCRIPTION, OG_IMAGE, OG_VIDEO
+from .fetch_context import FetchContext, current_fetch_context, scan_shared
+from .format_selector import COBALT_QUALITY_LADDER, FileTooLargeError, estimate_format_size, rank_formats
+from .bulkhead import Bulkheads
+from .progress import report
+
+# Сколько форматов yt-dlp пробуем скачать, прежде чем сдаться
+MAX_FORMAT_ATTEMPTS = 3
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
 
 class EnhancedMediaDownloader:
-    def __init__(self):
+    def __init__(
+        self,
+        max_file_size_mb: Optional[int] = None,
+        max_download_size_mb: Optional[int] = None,
+        cache_dir: Optional[str] = None,
+        bulkheads: Optional[Bulkheads] = None,
+    ):
         self.session = None
+        # Изоляция платформ: свои лимит загрузок, пул соединений и потоки yt-dlp
+        self.bulkheads = bulkheads
+        self._executor = None
+        # Лимит размера файла для отправки; None - без ограничения
+        self.max_bytes = max_file_size_mb * 1024 * 1024 if max_file_size_mb else None
+        # Жесткий лимит скачивания: больше лимита отправки, если видео можно пережать после загрузки
+        self.hard_max_bytes = max_download_size_mb * 1024 * 1024 if max_download_size_mb else self.max_bytes
         self.ydl_opts = {
             'quiet': True,
             'no_warnings': True,
@@ -24,14 +47,26 @@ class EnhancedMediaDownloader:
             'no_check_certificate': True,
             'source_address': '0.0.0.0'
         }
+        # Общий кэш yt-dlp (расшифровка подписей и т.п.) для всех процессов-воркеров
+        if cache_dir:
+            self.ydl_opts['cachedir'] = os.path.join(cache_dir, 'yt-dlp')
         
-    async def __aenter__(self):
-        self.session = aiohttp.ClientSession(
+    def _create_session(self, connector: Optional[aiohttp.TCPConnector] = None) -> aiohttp.ClientSession:
+        return aiohttp.ClientSession(
             timeout=aiohttp.ClientTimeout(total=30),
             headers={
                 'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-            }
+            },
+            connector=connector,
+            connector_owner=connector is None,
         )
+    
+    def _connector(self) -> Optional[aiohttp.TCPConnector]:
+        """Пул соединений текущей сессии (в загрузке - пул платформы) для вспомогательных загрузчиков"""
+        return self.session.connector if self.session is not None else None
+    
+    async def __aenter__(self):
+        self.session = self._create_session()
         return self
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
@@ -65,16 +100,19 @@ class EnhancedMediaDownloader:
             return result
 
         # Метод 2: yt-dlp
+        report(strategy='yt-dlp')
         result = await self._pinterest_ytdlp(url)
         if result:
             return result
         
         # Метод 2: Pinterest API
+        report(strategy='Pinterest API')
         result = await self._pinterest_api(url)
         if result:
             return result
         
         # Метод 3: Web scraping
+        report(strategy='страница пина')
         result = await self._pinterest_scrape(url)
         if result:
             return result
@@ -97,27 +135,27 @@ class EnhancedMediaDownloader:
             def download():
                 try:
                     with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                        info = ydl.extract_info(url, download=False)
-                        if info:
-                            # Пробуем разные источники
-                            if info.get('url'):
-                                return info.get('url')
-                            elif info.get('formats'):
-                                for fmt in info.get('formats', []):
-                                    if fmt.get('url') and fmt.get('ext') in ['mp4', 'jpg', 'png']:
-                                        return fmt.get('url')
-                            elif info.get('thumbnail'):
-                                return info.get('thumbnail')
+                        return ydl.extract_info(url, download=False)
                 except Exception as e:
                     logger.debug(f"yt-dlp Pinterest error: {e}")
                 return None
             
             loop = asyncio.get_event_loop()
-            media_url = await loop.run_in_executor(None, download)
-            
-            if media_url and self.session:
-                return await self._download_from_url(media_url)
-            
+            info = await loop.run_in_executor(self._executor, download)
+            
+            if info and self.session:
+                # Пробуем разные источники: форматы в рамках лимита, затем картинку
+                media_urls = self._ranked_ytdlp_urls(info)
+                if not media_urls and info.get('thumbnail'):
+                    media_urls = [info.get('thumbnail')]
+                
+                for media_url in media_urls:
+                    result = await self._download_from_url(media_url)
+                    if result:
+                        return result
+            
+        except FileTooLargeError:
+            raise
         except Exception as e:
             logger.debug(f"Pinterest yt-dlp method failed: {e}")
         return None
@@ -169,43 +207,42 @@ class EnhancedMediaDownloader:
         try:
             logger.info(f"Pinterest scraping: {url}")
             
-            async with self.session.get(url) as response:
-                if response.status == 200:
-                    html = await response.text()
-                    soup = BeautifulSoup(html, 'html.parser')
-                    
-                    # Ищем JSON данные в скриптах
-                    scripts = soup.find_all('script', type='application/ld+json')
-                    for script in scripts:
-                        try:
-                            data = json.loads(script.string)
-                            if isinstance(data, list):
-                                data = data[0]
-                            
-                            # Ищем изображения
-                            if data.get('image'):
-                                image_url = data['image']
-                                if isinstance(image_url, list):
-                                    image_url = image_url[0]
-                                return await self._download_from_url(image_url)
-                            
-                            # Ищем видео
-                            if data.get('video'):
-                                video_url = data['video']
-                                if isinstance(video_url, dict):
-                                    video_url = video_url.get('contentUrl')
-                                return await self._download_from_url(video_url)
-                        except:
-                            continue
+            # Читаем страницу до первого найденного тега, а не целиком
+            page = await scan_shared(self.session, url, {
+                'ld_json': LD_JSON,
+                'og_image': OG_IMAGE,
+                'og_video': OG_VIDEO,
+            })
+            
+            # Ищем JSON данные в скриптах
+            if page.get('ld_json'):
+                try:
+                    data = json.loads(page.get('ld_json'))
+                    if isinstance(data, list):
+                        data = data[0]
                     
-                    # Ищем в тегах meta
-                    meta_image = soup.find('meta', property='og:image')
-                    if meta_image and meta_image.get('content'):
-                        return await self._download_from_url(meta_image.get('content'))
+                    # Ищем изображения
+                    if data.get('image'):
+                        image_url = data['image']
+                        if isinstance(image_url, list):
+                            image_url = image_url[0]
+                        return await self._download_from_url(image_url)
                     
-                    meta_video = soup.find('meta', property='og:video')
-                    if meta_video and meta_video.get('content'):
-                        return await self._download_from_url(meta_video.get('content'))
+                    # Ищем видео
+                    if data.get('video'):
+                        video_url = data['video']
+                        if isinstance(video_url, dict):
+                            video_url = video_url.get('contentUrl')
+                        return await self._download_from_url(video_url)
+                except:
+                    pass
+            
+            # Ищем в тегах meta
+            if page.get('og_image'):
+                return await self._download_from_url(page.get('og_image'))
+            
+            if page.get('og_video'):
+                return await self._download_from_url(page.get('og_video'))
         
         except Exception as e:
             logger.debug(f"Pinterest scraping method failed: {e}")
@@ -216,7 +253,8 @@ class EnhancedMediaDownloader:
         
         # Сначала пробуем видео-специфичные методы
         try:
-            async with VideoDownloader() as video_downloader:
+            report(strategy='видео-загрузчик')
+            async with VideoDownloader(max_bytes=self.hard_max_bytes, connector=self._connector()) as video_downloader:
                 # Метод 1: Специализированный видео-даунлоадер
                 result = await video_downloader.download_tiktok_video(url)
                 if result:
@@ -230,16 +268,19 @@ class EnhancedMediaDownloader:
             return result
 
         # Метод 3: yt-dlp с улучшенными опциями
+        report(strategy='yt-dlp')
         result = await self._tiktok_ytdlp_improved(url)
         if result:
             return result
         
         # Метод 4: TikTok API эмуляция с fallback
+        report(strategy='TikTok API')
         result = await self._tiktok_api_improved(url)
         if result:
             return result
         
         # Метод 5: Альтернативные сервисы
+        report(strategy='альтернативные сервисы')
         result = await self._tiktok_alternative_improved(url)
         if result:
             return result
@@ -254,7 +295,7 @@ class EnhancedMediaDownloader:
             
             ydl_opts = self.ydl_opts.copy()
             ydl_opts.update({
-                'format': 'best[height<=720]',  # Ограничиваем качество
+                'format': 'best',  # Качество выбирается по размеру в _ranked_ytdlp_urls
                 'extract_flat': False,
                 'ignoreerrors': True,
                 'no_check_certificate': True,
@@ -271,35 +312,29 @@ class EnhancedMediaDownloader:
             def download():
                 try:
                     with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                        info = ydl.extract_info(url, download=False)
-                        if info:
-                            if info.get('url'):
-                                return info.get('url')
-                            elif info.get('formats'):
-                                # Ищем формат без аудио или с лучшим качеством
-                                for fmt in info.get('formats', []):
-                                    if fmt.get('url') and fmt.get('vcodec') != 'none':
-                                        return fmt.get('url')
-                                # Fallback на любой доступный
-                                for fmt in info.get('formats', []):
-                                    if fmt.get('url'):
-                                        return fmt.get('url')
+                        return ydl.extract_info(url, download=False)
                 except Exception as e:
                     logger.debug(f"yt-dlp TikTok improved error: {e}")
                 return None
             
             loop = asyncio.get_event_loop()
-            media_url = await loop.run_in_executor(None, download)
+            info = await loop.run_in_executor(self._executor, download)
             
-            if media_url and self.session:
+            if info and self.session:
                 # Добавляем заголовки для обхода блокировок
                 headers = {
                     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
                     'Referer': 'https://www.tiktok.com/',
                     'Accept': '*/*'
                 }
-                return await self._download_from_url_with_headers(media_url, headers)
-        
+                # Лучший формат, который поместится в лимит; при неудаче - следующий
+                for media_url in self._ranked_ytdlp_urls(info):
+                    result = await self._download_from_url_with_headers(media_url, headers)
+                    if result:
+                        return result
+        
+        except FileTooLargeError:
+            raise
         except Exception as e:
             logger.debug(f"TikTok yt-dlp improved method failed: {e}")
         return None
@@ -363,33 +398,32 @@ class EnhancedMediaDownloader:
                 {
                     'name': 'TikMate',
                     'url': f'https://tikmate.online/download?url={url}',
-                    'parser': self._parse_tikmate
+                    'pattern': MP4_URL
                 },
                 {
                     'name': 'SnapTik',
                     'url': f'https://snaptik.app/abc?url={url}',
-                    'parser': self._parse_snaptik
+                    'pattern': MP4_HREF
                 },
                 {
                     'name': 'MusicalDown',
                     'url': f'https://musicaldown.com/download?url={url}',
-                    'parser': self._parse_musicaldown
+                    'pattern': MP4_URL
                 },
                 {
                     'name': 'TikSave',
                     'url': f'https://tiksaver.io/download?url={url}',
-                    'parser': self._parse_tiksaver
+                    'pattern': MP4_URL
                 }
             ]
             
             for service in alternatives:
                 try:
-                    async with self.session.get(service['url'], timeout=20) as response:
-                        if response.status == 200:
-                            html = await response.text()
-                            video_url = await service['parser'](html)
-                            if video_url:
-                                return await self._download_from_url(video_url)
+                    # Скачивание страницы прерывается, как только найдена ссылка на видео
+                    page = await scan_page(self.session, service['url'], {'video': service['pattern']})
+                    video_url = page.get('video')
+                    if video_url:
+                        return await self._download_from_url(video_url)
                 except Exception as e:
                     logger.debug(f"{service['name']} failed: {e}")
                     continue
@@ -398,62 +432,18 @@ class EnhancedMediaDownloader:
             logger.debug(f"TikTok alternative improved method failed: {e}")
         return None
     
-    async def _parse_tikmate(self, html: str) -> Optional[str]:
-        """Парсер для TikMate"""
-        try:
-            # Ищем видео URL в ответе
-            video_match = re.search(r'(https://[^"\s]+\.mp4[^"\s]*)', html)
-            if video_match:
-                return video_match.group(1)
-        except:
-            pass
-        return None
-    
-    async def _parse_snaptik(self, html: str) -> Optional[str]:
-        """Парсер для SnapTik"""
-        try:
-            # Ищем видео URL в ответе
-            video_match = re.search(r'href="(https://[^"\s]+\.mp4[^"\s]*)"', html)
-            if video_match:
-                return video_match.group(1)
-        except:
-            pass
-        return None
-    
-    async def _parse_musicaldown(self, html: str) -> Optional[str]:
-        """Парсер для MusicalDown"""
-        try:
-            # Ищем видео URL в ответе
-            video_match = re.search(r'(https://[^"\s]+\.mp4[^"\s]*)', html)
-            if video_match:
-                return video_match.group(1)
-        except:
-            pass
-        return None
-    
-    async def _parse_tiksaver(self, html: str) -> Optional[str]:
-        """Парсер для TikSave"""
-        try:
-            # Ищем видео URL в ответе
-            video_match = re.search(r'(https://[^"\s]+\.mp4[^"\s]*)', html)
-            if video_match:
-                return video_match.group(1)
-        except:
-            pass
-        return None
-    
     async def _download_from_url_with_headers(self, url: str, headers: dict) -> Optional[bytes]:
         """Скачать медиа из URL с кастомными заголовками"""
         try:
             if not self.session or not url:
                 return None
             
-            async with self.session.get(url, headers=headers, timeout=30) as response:
-                if response.status == 200:
-                    content = await response.read()
-                    if len(content) > 1024:  # Проверяем что файл не пустой
-                        return content
+            content = await self._download_limited(url, headers=headers)
+            if content and len(content) > 1024:  # Проверяем что файл не пустой
+                return content
         
+        except FileTooLargeError as e:
+            logger.warning(f"Skipping {url}: {e}")
         except Exception as e:
             logger.debug(f"Download from URL with headers failed: {e}")
         return None
@@ -484,7 +474,7 @@ class EnhancedMediaDownloader:
                 return None
             
             loop = asyncio.get_event_loop()
-            media_url = await loop.run_in_executor(None, download)
+            media_url = await loop.run_in_executor(self._executor, download)
             
             if media_url and self.session:
                 return await self._download_from_url(media_url)
@@ -588,7 +578,7 @@ class EnhancedMediaDownloader:
                 return None
             
             loop = asyncio.get_event_loop()
-            media_url = await loop.run_in_executor(None, download)
+            media_url = await loop.run_in_executor(self._executor, download)
             
             if media_url and self.session:
                 return await self._download_from_url(media_url)
@@ -753,7 +743,7 @@ class EnhancedMediaDownloader:
         try:
             logger.info(f"Instagram new API: {url}")
             
-            async with InstagramAPIDownloader() as api:
+            async with InstagramAPIDownloader(connector=self._connector()) as api:
                 return await api.download_instagram_media(url)
         
         except Exception as e:
@@ -762,8 +752,17 @@ class EnhancedMediaDownloader:
     
     async def _cobalt_api(self, url: str) -> List[dict]:
         """Универсальный метод через Cobalt API. Возвращает список media-словарей."""
+        context = current_fetch_context.get()
+        if context is not None:
+            # В рамках одного запроса Cobalt опрашивается один раз
+            return await context.once(f"cobalt:{url}", lambda: self._cobalt_request(url))
+        return await self._cobalt_request(url)
+
+    async def _cobalt_request(self, url: str) -> List[dict]:
+        """Запрос к инстансам Cobalt"""
         try:
             logger.info(f"Cobalt API: {url}")
+            report(strategy='Cobalt')
             
             instances = [
                 "https://api.cobalt.tools",
@@ -778,43 +777,52 @@ class EnhancedMediaDownloader:
                 "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
             }
             
-            payload = {
-                "url": url,
-                "videoQuality": "max",
-                "filenamePattern": "basic",
-                "isAudioOnly": False,
-                "disableMetadata": False # Нам нужны метаданные для текста
-            }
-            
             for base_url in instances:
                 try:
-                    result_items = []
                     api_url = f"{base_url}/api/json"
-                    async with self.session.post(api_url, json=payload, headers=headers, timeout=10) as response:
-                        if response.status == 200:
+                    
+                    # Спускаемся по лестнице качества, пока результат не влезет в лимит
+                    for quality in COBALT_QUALITY_LADDER:
+                        payload = {
+                            "url": url,
+                            "videoQuality": quality,
+                            "filenamePattern": "basic",
+                            "isAudioOnly": False,
+                            "disableMetadata": False # Нам нужны метаданные для текста
+                        }
+                        
+                        async with self.session.post(api_url, json=payload, headers=headers, timeout=10) as response:
+                            if response.status != 200:
+                                break
                             data = await response.json()
-                            
-                            if data.get('status') == 'error':
-                                logger.debug(f"Cobalt error on {base_url}: {data.get('text')}")
-                                continue
-                                
-                            # Если это стрим/пикер (карусель)
-                            if data.get('picker'):
-                                for item in data['picker']:
-                                    if item.get('url'):
-                                        content = await self._download_from_url(item['url'])
-                                        if content:
-                                            result_items.append({'data': content, 'url': item['url']})
-                            
-                            # Одиночное медиа
-                            elif data.get('url'):
-                                content = await self._download_from_url(data['url'])
-                                if content:
-                                    result_items.append({'data': content, 'url': data['url']})
-                            
-                            if result_items:
-                                logger.info(f"Got {len(result_items)} items from Cobalt ({base_url})")
-                                return result_items
+                        
+                        if data.get('status') == 'error':
+                            logger.debug(f"Cobalt error on {base_url}: {data.get('text')}")
+                            break
+                        
+                        try:
+                            result_items = await self._download_cobalt_items(data)
+                        except FileTooLargeError as e:
+                            logger.info(f"Cobalt {quality} result is too large ({e.size} bytes), trying lower quality")
+                            continue
+                        
+                        if result_items:
+                            logger.info(f"Got {len(result_items)} items from Cobalt ({base_url}, quality {quality})")
+                            return result_items
+                        break
+                    else:
+                        # Инстанс ответил, но ни одно качество не влезает - другие инстансы не помогут.
+                        # Если допускается скачивание сверх лимита, берем минимальное качество на пережатие
+                        if self.hard_max_bytes and self.hard_max_bytes != self.max_bytes:
+                            try:
+                                result_items = await self._download_cobalt_items(data, limit=self.hard_max_bytes)
+                                if result_items:
+                                    logger.info(f"Got oversized Cobalt result for post-processing ({base_url})")
+                                    return result_items
+                            except FileTooLargeError:
+                                pass
+                        logger.warning(f"No Cobalt quality fits the size limit for {url}")
+                        return []
                                 
                 except Exception as e:
                     logger.debug(f"Failed Cobalt instance {base_url}: {e}")
@@ -824,22 +832,85 @@ class EnhancedMediaDownloader:
             logger.debug(f"Cobalt API method failed: {e}")
         return []
 
+    async def _download_cobalt_items(self, data: dict, limit: Optional[int] = None) -> List[dict]:
+        """Скачивает медиа из ответа Cobalt. Одиночный файл сверх лимита поднимает FileTooLargeError."""
+        result_items = []
+        
+        # Если это стрим/пикер (карусель)
+        if data.get('picker'):
+            for item in data['picker']:
+                if item.get('url'):
+                    content = await self._download_from_url(item['url'])
+                    if content:
+                        result_items.append({'data': content, 'url': item['url']})
+        
+        # Одиночное медиа
+        elif data.get('url'):
+            content = await self._download_limited(data['url'], limit=limit or self.max_bytes)
+            if content and len(content) > 1024:
+                result_items.append({'data': content, 'url': data['url']})
+        
+        return result_items
+
+    def _ranked_ytdlp_urls(self, info: dict) -> List[str]:
+        """URL форматов yt-dlp в порядке попыток с учетом лимита размера"""
+        formats = info.get('formats') or []
+        ranked = rank_formats(formats, self.max_bytes, info.get('duration'), self.hard_max_bytes)
+        if ranked:
+            return [fmt['url'] for fmt in ranked[:MAX_FORMAT_ATTEMPTS]]
+        # Видео есть, но ни один формат не влезает: превью вместо него не отдаем
+        sizes = [
+            estimate_format_size(fmt, info.get('duration')) for fmt in formats
+            if fmt.get('url') and fmt.get('vcodec') != 'none'
+        ]
+        if sizes:
+            raise FileTooLargeError(min(sizes), self.hard_max_bytes or self.max_bytes)
+        if not formats and info.get('url'):
+            return [info['url']]
+        return []
+
+    async def _download_limited(
+        self,
+        url: str,
+        headers: Optional[dict] = None,
+        timeout: int = 30,
+        limit: Optional[int] = None,
+    ) -> Optional[bytes]:
+        """Скачивает файл, прерываясь, как только становится ясно, что он больше лимита"""
+        limit = limit or self.hard_max_bytes
+        async with self.session.get(url, headers=headers, timeout=timeout) as response:
+            if response.status != 200:
+                logger.warning(f"HTTP {response.status} for {url}")
+                return None
+            
+            # Размер известен заранее - не качаем то, что все равно придется выбросить
+            if limit and response.content_length and response.content_length > limit:
+                raise FileTooLargeError(response.content_length, limit)
+            
+            content = bytearray()
+            report(received=0, total=response.content_length)
+            async for chunk in response.content.iter_chunked(DOWNLOAD_CHUNK_SIZE):
+                content += chunk
+                report(received=len(content))
+                if limit and len(content) > limit:
+                    raise FileTooLargeError(len(content), limit)
+            return bytes(content)
+
     async def _download_from_url(self, url: str) -> Optional[bytes]:
         """Скачивает медиа из URL"""
         try:
             if not self.session or not url:
                 return None
             
-            async with self.session.get(url, timeout=30) as response:
-                if response.status == 200:
-                    content = await response.read()
-                    if len(content) > 1024:  # Проверяем что файл не пустой
-                        return content
-                    else:
-                        logger.warning(f"Media file is too small: {len(content)} bytes")
+            content = await self._download_limited(url)
+            if content is not None:
+                if len(content) > 1024:  # Проверяем что файл не пустой
+                    return content
                 else:
-                    logger.warning(f"HTTP {response.status} for {url}")
+                    logger.warning(f"Media file is too small: {len(content)} bytes")
         
+        except FileTooLargeError as e:
+            logger.warning(f"Skipping {url}: {e}")
         except asyncio.TimeoutError:
             logger.error(f"Timeout downloading from {url}")
         except Exception as e:
@@ -850,44 +921,70 @@ class EnhancedMediaDownloader:
     async def download_media(self, url: str) -> dict:
         """Основной метод скачивания медиа. Возвращает словарь с items и text."""
         platform = self.detect_platform(url)
+        if self.bulkheads is None:
+            return await self._download_media(url, platform)
+        
+        # Загрузка ждет места только в пределах своей платформы
+        async with self.bulkheads.get(platform).slot() as bulkhead:
+            shared_session = self.session
+            self.session = self._create_session(bulkhead.connector())
+            self._executor = bulkhead.executor
+            try:
+                return await self._download_media(url, platform)
+            finally:
+                await self.session.close()
+                self.session = shared_session
+                self._executor = None
+    
+    async def _download_media(self, url: str, platform: str) -> dict:
         results = []
-        post_text = None
-        
-        # Сначала пробуем Cobalt (он лучший для каруселей и видео)
-        cobalt_items = await self._cobalt_api(url)
-        if cobalt_items:
-            for item in cobalt_items:
-                data, ftype = self._identify_media_type(item['data'])
-                results.append({'data': data, 'type': ftype})
-        
-        # Если Cobalt не сработал или пустой, пробуем специфические методы (одиночные)
-        if not results:
-            data = None
-            if platform == 'pinterest':
-                data = await self.download_pinterest_media(url)
-            elif platform == 'tiktok':
-                data = await self.download_tiktok_media(url)
-            elif platform == 'instagram':
-                data = await self.download_instagram_media(url)
-            
-            if data:
-                data, ftype = self._identify_media_type(data)
-                results.append({'data': data, 'type': ftype})
-
-        # Попытка извлечь текст (упрощенный скрапинг)
+        
+        # Все методы в рамках этой ссылки делят одну загрузку каждой страницы
+        context = FetchContext(self.session)
+        token = current_fetch_context.set(context)
+        
+        # Текст поста извлекаем параллельно со скачиванием медиа
+        text_task = asyncio.create_task(self._extract_post_text(url))
+        
         try:
-            async with self.session.get(url) as response:
-                if response.status == 200:
-                    html = await response.text()
-                    soup = BeautifulSoup(html, 'html.parser')
-                    meta_desc = soup.find('meta', property='og:description')
-                    if meta_desc:
-                        post_text = meta_desc.get('content')
-        except:
-            pass
+            # Сначала пробуем Cobalt (он лучший для каруселей и видео)
+            cobalt_items = await self._cobalt_api(url)
+            if cobalt_items:
+                for item in cobalt_items:
+                    data, ftype = self._identify_media_type(item['data'])
+                    results.append({'data': data, 'type': ftype})
+            
+            # Если Cobalt не сработал или пустой, пробуем специфические методы (одиночные)
+            if not results:
+                data = None
+                if platform == 'pinterest':
+                    data = await self.download_pinterest_media(url)
+                elif platform == 'tiktok':
+                    data = await self.download_tiktok_media(url)
+                elif platform == 'instagram':
+                    data = await self.download_instagram_media(url)
+                
+                if data:
+                    data, ftype = self._identify_media_type(data)
+                    results.append({'data': data, 'type': ftype})
+            
+            post_text = await text_task
+        finally:
+            text_task.cancel()
+            current_fetch_context.reset(token)
+            context.close()
             
         return {'items': results, 'text': post_text}
 
+    async def _extract_post_text(self, url: str) -> Optional[str]:
+        """Попытка извлечь текст поста (упрощенный скрапинг)"""
+        try:
+            page = await scan_shared(self.session, url, {'description': OG_DESCRIPTION})
+            return page.get('description')
+        except Exception as e:
+            logger.debug(f"Post text extraction failed: {e}")
+        return None
+
     def _identify_media_type(self, data: bytes) -> tuple[bytes, str]:
         """Определяет тип файла по заголовку"""
         if len(data) > 8 and data[4:8] == b'ftyp':
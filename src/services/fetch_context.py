@@ -0,0 +1,149 @@
+import asyncio
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Optional, Pattern
+
+import aiohttp
+from loguru import logger
+
+from .page_scanner import (
+    DEFAULT_CHUNK_SIZE, DEFAULT_MAX_BYTES, DEFAULT_OVERLAP, ScanResult, scan_page, search_buffer
+)
+
+
+class SharedPage:
+    """Страница, которую несколько методов читают через одно соединение.
+
+    Тело накапливается в буфере ровно настолько, насколько это нужно самому
+    «жадному» из потребителей: каждый scan() сначала ищет в уже прочитанном,
+    и только потом дочитывает следующие чанки.
+    """
+
+    def __init__(
+        self,
+        session: aiohttp.ClientSession,
+        url: str,
+        headers: Optional[dict] = None,
+        timeout: int = 20,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ):
+        self.session = session
+        self.url = url
+        self.headers = headers
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.status: Optional[int] = None
+        self.buffer = bytearray()
+        self.complete = False
+        self._response: Optional[aiohttp.ClientResponse] = None
+        self._lock = asyncio.Lock()
+
+    async def _open(self):
+        self._response = await self.session.get(self.url, headers=self.headers, timeout=self.timeout)
+        self.status = self._response.status
+        if self.status != 200:
+            logger.debug(f"HTTP {self.status} while fetching {self.url}")
+            self._finish()
+
+    def _finish(self):
+        self.complete = True
+        if self._response is not None:
+            self._response.close()
+            self._response = None
+
+    async def scan(self, patterns: Dict[str, Pattern[bytes]], stop_on_match: bool = True) -> ScanResult:
+        """Ищет шаблоны в странице, дочитывая ее только при необходимости"""
+        async with self._lock:
+            if self.status is None:
+                await self._open()
+            if self.status != 200:
+                return ScanResult()
+
+            # Совпадение на конце недочитанного буфера может продолжиться в следующем чанке
+            result = search_buffer(self.buffer, patterns, ScanResult(), final=self.complete)
+            scanned = len(self.buffer)
+
+            while not self.complete:
+                if len(result.matches) == len(patterns) or (stop_on_match and result.matches):
+                    break
+
+                chunk = await self._response.content.read(DEFAULT_CHUNK_SIZE)
+                if chunk:
+                    self.buffer += chunk[:self.max_bytes - len(self.buffer)]
+                    if len(self.buffer) >= self.max_bytes:
+                        logger.debug(f"Page fetch hit {self.max_bytes} byte cap: {self.url}")
+                        self._finish()
+                else:
+                    self._finish()
+
+                search_buffer(
+                    self.buffer, patterns, result, start=max(0, scanned - DEFAULT_OVERLAP), final=self.complete
+                )
+                scanned = len(self.buffer)
+
+            result.complete = self.complete
+            return result
+
+    def close(self):
+        self._finish()
+
+
+class FetchContext:
+    """Кэш страниц в рамках обработки одной ссылки: каждая страница качается не более одного раза"""
+
+    def __init__(self, session: aiohttp.ClientSession, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.session = session
+        self.max_bytes = max_bytes
+        self.pages: Dict[str, SharedPage] = {}
+        self.results: Dict[str, asyncio.Future] = {}
+
+    def page(self, url: str, headers: Optional[dict] = None, timeout: int = 20) -> SharedPage:
+        if url not in self.pages:
+            self.pages[url] = SharedPage(self.session, url, headers, timeout, self.max_bytes)
+        else:
+            logger.debug(f"Reusing fetched page: {url}")
+        return self.pages[url]
+
+    async def scan(
+        self,
+        url: str,
+        patterns: Dict[str, Pattern[bytes]],
+        headers: Optional[dict] = None,
+        timeout: int = 20,
+        stop_on_match: bool = True,
+    ) -> ScanResult:
+        return await self.page(url, headers, timeout).scan(patterns, stop_on_match=stop_on_match)
+
+    async def once(self, key: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """Выполняет factory один раз на ключ; повторные вызовы получают тот же результат"""
+        if key not in self.results:
+            self.results[key] = asyncio.ensure_future(factory())
+        else:
+            logger.debug(f"Reusing request result: {key}")
+        return await asyncio.shield(self.results[key])
+
+    def close(self):
+        for page in self.pages.values():
+            page.close()
+        self.pages.clear()
+        for future in self.results.values():
+            future.cancel()
+        self.results.clear()
+
+
+# Контекст текущего запроса; наследуется задачами, созданными внутри download_media
+current_fetch_context: ContextVar[Optional[FetchContext]] = ContextVar('current_fetch_context', default=None)
+
+
+async def scan_shared(
+    session: aiohttp.ClientSession,
+    url: str,
+    patterns: Dict[str, Pattern[bytes]],
+    headers: Optional[dict] = None,
+    timeout: int = 20,
+    stop_on_match: bool = True,
+) -> ScanResult:
+    """Сканирует страницу через контекст запроса, если он есть, иначе отдельной загрузкой"""
+    context = current_fetch_context.get()
+    if context is not None:
+        return await context.scan(url, patterns, headers, timeout, stop_on_match)
+    return await scan_page(session, url, patterns, headers=headers, timeout=timeout, stop_on_match=stop_on_match)
@@ -0,0 +1,116 @@
+import os
+import re
+import sqlite3
+import time
+from dataclasses import dataclass
+from typing import List, Optional
+from urllib.parse import urlparse
+
+VIDEO = 'video'
+PHOTO = 'photo'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS media (
+    key TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    file_id TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (key, position)
+);
+"""
+
+# Ссылки на одно и то же медиа различаются доменом, слагом и параметрами - ключ строится по id
+MEDIA_KEYS = (
+    (re.compile(r'tiktok\.com/@[^/]+/(video|photo)/(\d+)'), lambda m: f"tiktok:{m.group(1)}:{m.group(2)}"),
+    (re.compile(r'instagr(?:am\.com|\.am)/stories/[^/]+/(\d+)'), lambda m: f"instagram:story:{m.group(1)}"),
+    # /p/, /reel/ и /tv/ с одним кодом - одна и та же публикация
+    (re.compile(r'instagr(?:am\.com|\.am)/(?:[^/]+/)?(?:p|reels?|tv)/([\w-]+)'), lambda m: f"instagram:{m.group(1)}"),
+    (re.compile(r'pinterest\.[a-z.]+/pin/(?:[^/]*--)?(\d+)'), lambda m: f"pinterest:pin:{m.group(1)}"),
+)
+
+
+def media_key(url: str) -> str:
+    """Канонический ключ медиа по ссылке.
+
+    Для коротких ссылок (pin.it, vm.tiktok.com) id без перехода по ссылке
+    не узнать - для них ключом служит сама ссылка без параметров.
+    """
+    url = url.strip()
+    for pattern, build in MEDIA_KEYS:
+        match = pattern.search(url)
+        if match:
+            return build(match)
+
+    parsed = urlparse(url)
+    host = (parsed.hostname or '').lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    return f"url:{host}{parsed.path.rstrip('/')}"
+
+
+@dataclass
+class CachedMedia:
+    """Медиа, уже загруженное в Telegram"""
+
+    kind: str
+    file_id: str
+
+
+class FileIdIndex:
+    """Индекс file_id Telegram по каноническому ключу медиа, в SQLite.
+
+    Медиа, один раз отправленное ботом, можно отправить повторно по file_id
+    без скачивания и загрузки. Индекс общий для всех процессов (webhook-
+    фронтенда и воркеров), поэтому запись коммитится сразу. Записи старше
+    max_age секунд не отдаются: Telegram не гарантирует вечную жизнь file_id.
+    """
+
+    def __init__(self, path: str, max_age: float = 30 * 24 * 3600):
+        self.path = path
+        self.max_age = max_age
+        self._db: Optional[sqlite3.Connection] = None
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        if self._db is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('PRAGMA synchronous=NORMAL')
+            self._db.executescript(SCHEMA)
+        return self._db
+
+    def get(self, key: str) -> List[CachedMedia]:
+        """Все медиа публикации по порядку; пустой список, если индекс о ней не знает"""
+        rows = self.db.execute(
+            'SELECT kind, file_id FROM media WHERE key = ? AND created_at >= ? ORDER BY position',
+            (key, time.time() - self.max_age),
+        ).fetchall()
+        return [CachedMedia(kind=row[0], file_id=row[1]) for row in rows]
+
+    def put(self, key: str, items: List[CachedMedia]):
+        """Запоминает медиа публикации, заменяя прежнюю запись"""
+        now = time.time()
+        with self.db:
+            self.db.execute('DELETE FROM media WHERE key = ?', (key,))
+            self.db.executemany(
+                'INSERT INTO media (key, position, kind, file_id, created_at) VALUES (?, ?, ?, ?, ?)',
+                [(key, position, item.kind, item.file_id, now) for position, item in enumerate(items)],
+            )
+
+    def purge(self) -> int:
+        """Удаляет устаревшие записи"""
+        with self.db:
+            cursor = self.db.execute('DELETE FROM media WHERE created_at < ?', (time.time() - self.max_age,))
+        return cursor.rowcount
+
+    def __len__(self) -> int:
+        return self.db.execute('SELECT COUNT(DISTINCT key) FROM media').fetchone()[0]
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
@@ -0,0 +1,81 @@
+from typing import List, Optional
+
+# Лестница качества Cobalt: от лучшего к худшему
+COBALT_QUALITY_LADDER = ["max", "1080", "720", "480", "360"]
+
+# Запас на контейнер и погрешность оценки по битрейту
+SIZE_ESTIMATE_MARGIN = 1.1
+
+
+class FileTooLargeError(Exception):
+    """Файл не помещается в лимит размера"""
+
+    def __init__(self, size: int, limit: int):
+        super().__init__(f"File size {size} bytes exceeds limit {limit} bytes")
+        self.size = size
+        self.limit = limit
+
+
+def estimate_format_size(fmt: dict, duration: Optional[float] = None) -> Optional[int]:
+    """Оценивает размер формата yt-dlp в байтах по метаданным"""
+    if fmt.get('filesize'):
+        return int(fmt['filesize'])
+    if fmt.get('filesize_approx'):
+        return int(fmt['filesize_approx'])
+
+    # tbr - суммарный битрейт в кбит/с
+    tbr = fmt.get('tbr')
+    duration = fmt.get('duration') or duration
+    if tbr and duration:
+        return int(tbr * 1000 / 8 * duration * SIZE_ESTIMATE_MARGIN)
+    return None
+
+
+def _quality_key(fmt: dict) -> tuple:
+    has_audio = fmt.get('acodec') not in (None, 'none')
+    return (
+        has_audio,
+        fmt.get('height') or 0,
+        fmt.get('tbr') or 0,
+        fmt.get('quality') or 0,
+    )
+
+
+def rank_formats(
+    formats: List[dict],
+    max_bytes: Optional[int],
+    duration: Optional[float] = None,
+    hard_max_bytes: Optional[int] = None,
+) -> List[dict]:
+    """Возвращает пригодные форматы в порядке попыток.
+
+    Сначала идут форматы, которые по метаданным гарантированно помещаются в
+    лимит (от лучшего качества к худшему), затем форматы с неизвестным
+    размером - их размер проверяется уже при скачивании. Если задан
+    hard_max_bytes, в конце добавляются форматы больше лимита, но не больше
+    hard_max_bytes (от меньшего к большему) - их можно пережать после
+    скачивания. Остальные отбрасываются.
+    """
+    candidates = [
+        fmt for fmt in formats
+        if fmt.get('url') and fmt.get('vcodec') != 'none'
+    ]
+    candidates.sort(key=_quality_key, reverse=True)
+
+    if not max_bytes:
+        return candidates
+
+    fitting = []
+    unknown = []
+    oversized = []
+    for fmt in candidates:
+        size = estimate_format_size(fmt, duration)
+        if size is None:
+            unknown.append(fmt)
+        elif size <= max_bytes:
+            fitting.append(fmt)
+        elif hard_max_bytes and size <= hard_max_bytes:
+            oversized.append((size, fmt))
+
+    oversized.sort(key=lambda item: item[0])
+    return fitting + unknown + [fmt for _, fmt in oversized]
@@ -0,0 +1,179 @@
+import asyncio
+import io
+import struct
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple
+
+from loguru import logger
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow не установлен - фото отправляются как есть
+    Image = None
+
+# Ограничения Telegram для sendPhoto и разумные цели для пережатия
+PHOTO_MAX_SIDE = 2560
+PHOTO_MAX_BYTES = 5 * 1024 * 1024
+TELEGRAM_MAX_RATIO = 20
+JPEG_QUALITY_LADDER = (90, 85, 75, 65, 55)
+
+
+def sniff_image_size(data: bytes) -> Optional[Tuple[str, int, int]]:
+    """Определяет формат и размеры изображения только по заголовку файла.
+
+    Возвращает (формат, ширина, высота) или None, если формат не распознан.
+    """
+    try:
+        if data.startswith(b'\x89PNG\r\n\x1a\n') and data[12:16] == b'IHDR':
+            width, height = struct.unpack('>II', data[16:24])
+            return 'png', width, height
+
+        if data[:6] in (b'GIF87a', b'GIF89a'):
+            width, height = struct.unpack('<HH', data[6:10])
+            return 'gif', width, height
+
+        if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+            chunk = data[12:16]
+            if chunk == b'VP8 ':
+                width, height = struct.unpack('<HH', data[26:30])
+                return 'webp', width & 0x3FFF, height & 0x3FFF
+            if chunk == b'VP8L':
+                bits = int.from_bytes(data[21:25], 'little')
+                return 'webp', (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+            if chunk == b'VP8X':
+                width = int.from_bytes(data[24:27], 'little') + 1
+                height = int.from_bytes(data[27:30], 'little') + 1
+                return 'webp', width, height
+            return None
+
+        if data.startswith(b'\xff\xd8'):
+            return _sniff_jpeg(data)
+    except (struct.error, IndexError):
+        pass
+    return None
+
+
+def _sniff_jpeg(data: bytes) -> Optional[Tuple[str, int, int]]:
+    """Ищет маркер SOF, проходя по сегментам JPEG без декодирования"""
+    pos = 2
+    while pos + 9 < len(data):
+        if data[pos] != 0xFF:
+            return None
+        marker = data[pos + 1]
+        # Заполняющие байты и маркеры без длины
+        if marker == 0xFF:
+            pos += 1
+            continue
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+            pos += 2
+            continue
+
+        length = struct.unpack('>H', data[pos + 2:pos + 4])[0]
+        # SOF0-SOF15, кроме DHT (C4), JPG (C8) и DAC (CC)
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            height, width = struct.unpack('>HH', data[pos + 5:pos + 9])
+            return 'jpeg', width, height
+        pos += 2 + length
+    return None
+
+
+def image_extension(data: bytes, default: str = 'jpg') -> str:
+    """Расширение файла по формату изображения"""
+    info = sniff_image_size(data)
+    if info is None:
+        return default
+    return 'jpg' if info[0] == 'jpeg' else info[0]
+
+
+def needs_photo_transcode(data: bytes, max_side: int = PHOTO_MAX_SIDE, max_bytes: int = PHOTO_MAX_BYTES) -> bool:
+    """Нужно ли пережимать изображение перед отправкой как фото"""
+    info = sniff_image_size(data)
+    if info is None:
+        return True
+
+    image_format, width, height = info
+    if image_format not in ('jpeg', 'png'):
+        return True
+    if len(data) > max_bytes:
+        return True
+    if max(width, height) > max_side:
+        return True
+    return False
+
+
+def _transcode_photo(data: bytes, max_side: int, max_bytes: int) -> bytes:
+    """Пережимает изображение в JPEG в рамках ограничений (выполняется в отдельном процессе)"""
+    with Image.open(io.BytesIO(data)) as image:
+        image.draft('RGB', (max_side, max_side))
+
+        if image.mode in ('RGBA', 'LA', 'P'):
+            image = image.convert('RGBA')
+            background = Image.new('RGB', image.size, (255, 255, 255))
+            background.paste(image, mask=image.split()[-1])
+            image = background
+        elif image.mode != 'RGB':
+            image = image.convert('RGB')
+
+        width, height = image.size
+        # Слишком вытянутые изображения Telegram не принимает как фото - обрезаем по центру
+        if max(width, height) > TELEGRAM_MAX_RATIO * min(width, height):
+            if width > height:
+                new_width = height * TELEGRAM_MAX_RATIO
+                left = (width - new_width) // 2
+                image = image.crop((left, 0, left + new_width, height))
+            else:
+                new_height = width * TELEGRAM_MAX_RATIO
+                top = (height - new_height) // 2
+                image = image.crop((0, top, width, top + new_height))
+
+        image.thumbnail((max_side, max_side), Image.LANCZOS)
+
+        output = b''
+        for quality in JPEG_QUALITY_LADDER:
+            buffer = io.BytesIO()
+            image.save(buffer, 'JPEG', quality=quality, optimize=True, progressive=True)
+            output = buffer.getvalue()
+            if len(output) <= max_bytes:
+                break
+        return output
+
+
+class ImageProcessor:
+    """Пул процессов для подготовки фото к отправке в Telegram"""
+
+    def __init__(self, max_workers: int = 2, max_side: int = PHOTO_MAX_SIDE, max_bytes: int = PHOTO_MAX_BYTES):
+        self.max_workers = max_workers
+        self.max_side = max_side
+        self.max_bytes = max_bytes
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._pool
+
+    async def prepare_photo(self, data: bytes) -> bytes:
+        """Возвращает байты для sendPhoto: исходные, если они уже подходят, иначе JPEG"""
+        if not needs_photo_transcode(data, self.max_side, self.max_bytes):
+            return data
+
+        if Image is None:
+            logger.debug("Pillow is not installed, sending original image")
+            return data
+
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(
+                self._get_pool(), _transcode_photo, data, self.max_side, self.max_bytes
+            )
+            logger.info(f"Photo transcoded: {len(data)} -> {len(result)} bytes")
+            return result
+        except Exception as e:
+            logger.warning(f"Photo transcoding failed, sending original: {e}")
+            return data
+
+    def shutdown(self, wait: bool = False):
+        # При выходе из процесса нужно wait=True: иначе он ждет процессы пула, не получившие сигнал остановки
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait, cancel_futures=True)
+            self._pool = None
@@ -5,11 +5,15 @@ from typing import Optional
 from loguru import logger
 
 class InstagramAPIDownloader:
-    def __init__(self):
+    def __init__(self, connector: Optional[aiohttp.TCPConnector] = None):
         self.session = None
+        # Пул соединений платформы (bulkhead); без него сессия создает собственный
+        self.connector = connector
     
     async def __aenter__(self):
         self.session = aiohttp.ClientSession(
+            connector=self.connector,
+            connector_owner=self.connector is None,
             timeout=aiohttp.ClientTimeout(total=30),
             headers={
                 'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
@@ -0,0 +1,69 @@
+import re
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+# Ожидаемый размер медиа в МБ по платформе и виду ссылки, пока нет истории
+DEFAULT_COSTS: Dict[Tuple[str, str], float] = {
+    ('Pinterest', 'pin'): 1.0,
+    ('TikTok', 'photo'): 2.0,
+    ('TikTok', 'video'): 15.0,
+    ('Instagram', 'post'): 3.0,
+    ('Instagram', 'reel'): 15.0,
+    ('Instagram', 'stories'): 5.0,
+}
+UNKNOWN_COST = 10.0
+
+URL_KINDS = (
+    (re.compile(r'tiktok\.com/.+/photo/'), 'photo'),
+    (re.compile(r'tiktok\.com/'), 'video'),
+    (re.compile(r'instagr(?:am\.com|\.am)/(?:[^/]+/)?(?:reels?|tv)/'), 'reel'),
+    (re.compile(r'instagr(?:am\.com|\.am)/stories/'), 'stories'),
+    (re.compile(r'instagr(?:am\.com|\.am)/'), 'post'),
+    (re.compile(r'(?:pinterest\.com|pin\.it)/'), 'pin'),
+)
+
+
+def url_kind(url: str) -> str:
+    """Вид ссылки внутри платформы: пост, видео, reel и т.п."""
+    for pattern, kind in URL_KINDS:
+        if pattern.search(url):
+            return kind
+    return 'other'
+
+
+class CostEstimator:
+    """Оценка стоимости задания (ожидаемый размер медиа в МБ) для планировщика.
+
+    Точный размер известен для уже скачанных ссылок (LRU на max_urls адресов),
+    известный заранее Content-Length заменяет оценку. Иначе берется
+    экспоненциальное среднее фактических размеров для платформы и вида ссылки,
+    а до первой загрузки - значение из DEFAULT_COSTS.
+    """
+
+    def __init__(self, max_urls: int = 10_000, smoothing: float = 0.2):
+        self.max_urls = max_urls
+        self.smoothing = smoothing
+        self._urls: "OrderedDict[str, float]" = OrderedDict()
+        self._kinds: Dict[Tuple[str, str], float] = {}
+
+    def estimate(self, url: str, platform: str, content_length: Optional[int] = None) -> float:
+        if content_length:
+            return content_length / (1024 * 1024)
+        size = self._urls.get(url)
+        if size is not None:
+            self._urls.move_to_end(url)
+            return size
+        key = (platform, url_kind(url))
+        return self._kinds.get(key, DEFAULT_COSTS.get(key, UNKNOWN_COST))
+
+    def record(self, url: str, platform: str, size_bytes: int):
+        """Запоминает фактический размер скачанного медиа"""
+        size = size_bytes / (1024 * 1024)
+        self._urls[url] = size
+        self._urls.move_to_end(url)
+        if len(self._urls) > self.max_urls:
+            self._urls.popitem(last=False)
+
+        key = (platform, url_kind(url))
+        previous = self._kinds.get(key)
+        self._kinds[key] = size if previous is None else previous + self.smoothing * (size - previous)
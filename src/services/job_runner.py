@@ -0,0 +1,169 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+from loguru import logger
+
+from .download_scheduler import DownloadScheduler, Job
+from .job_store import JobStore, StoredJob
+
+# Хранить завершенные задания сутки: этого хватает, чтобы отсеять повторные доставки
+DONE_RETENTION_SECONDS = 24 * 3600
+PURGE_INTERVAL = 3600
+
+
+class JobRunner:
+    """Связывает постоянную очередь заданий с планировщиком загрузок.
+
+    Новые задания сохраняются в базу и сразу отдаются планировщику этого
+    процесса. Фоновый цикл продлевает аренду своих заданий и забирает
+    из базы брошенные задания - например, оставшиеся от процесса, убитого
+    при деплое, - так что после перезапуска загрузки продолжаются.
+
+    Если процесс запущен с execute_jobs=False (webhook-фронтенд при отдельных
+    процессах-воркерах), задания только сохраняются, а выполняют их воркеры,
+    забирающие задания из той же базы.
+
+    Отмена помечает задания в базе; выполняющий их процесс (этот - сразу,
+    другой - при следующем опросе) снимает их с планировщика.
+    """
+
+    def __init__(
+        self,
+        store: JobStore,
+        scheduler: DownloadScheduler,
+        execute: Callable[[Any, StoredJob], Awaitable[Any]],
+        poll_interval: float = 2,
+    ):
+        self.store = store
+        self.scheduler = scheduler
+        self.execute = execute
+        self.poll_interval = poll_interval
+        self.context: Any = None
+        self.execute_jobs = True
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        # Задания этого процесса в планировщике по id в базе
+        self._jobs: Dict[int, Job] = {}
+
+    def start(self, context: Any, execute_jobs: bool = True):
+        """Запускает фоновый цикл; context (обычно Bot) передается в execute"""
+        self.context = context
+        self.execute_jobs = execute_jobs
+        self._ensure_started()
+
+    def outstanding_for(self, user_id: int) -> int:
+        """Сколько заданий пользователя еще не завершено"""
+        if self.execute_jobs:
+            return self.scheduler.outstanding_for(user_id)
+        return self.store.outstanding_for(user_id)
+
+    def in_flight(self) -> int:
+        """Сколько заданий ждет или выполняется (во всех процессах, если этот их не выполняет)"""
+        if self.execute_jobs:
+            return self.scheduler.queued + self.scheduler.running
+        return self.store.unfinished()
+
+    def _ensure_started(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._task is not None and not self._task.done():
+            return
+        self._loop = loop
+        self._task = loop.create_task(self._poll())
+
+    def enqueue(self, key: str, user_id: int, chat_id: int, payload: Dict[str, Any]) -> Optional[int]:
+        """Сохраняет задание и ставит его в очередь; None, если ключ уже встречался"""
+        if self.context is None:
+            raise RuntimeError("JobRunner is not started")
+        self._ensure_started()
+
+        job_id = self.store.add(key, user_id, chat_id, payload, reserve=self.execute_jobs)
+        if job_id is None:
+            logger.info(f"Duplicate job {key} ignored")
+            return None
+        if not self.execute_jobs:
+            # Задание заберет один из процессов-воркеров
+            self.store.flush()
+            return job_id
+
+        self._submit(StoredJob(
+            id=job_id, key=key, user_id=user_id, chat_id=chat_id, payload=payload, state='queued', attempts=0
+        ))
+        return job_id
+
+    def cancel_for(self, user_id: int, chat_id: int) -> List[StoredJob]:
+        """Отменяет незавершенные задания пользователя в чате и возвращает их"""
+        jobs = self.store.cancel_for(user_id, chat_id)
+        self._cancel_local(job.id for job in jobs)
+        if jobs:
+            logger.info(f"Cancelled {len(jobs)} jobs of user {user_id} in chat {chat_id}")
+        return jobs
+
+    def _cancel_local(self, job_ids: Iterable[int]):
+        for job_id in job_ids:
+            scheduled = self._jobs.pop(job_id, None)
+            if scheduled is not None:
+                self.scheduler.cancel(scheduled)
+
+    def _submit(self, job: StoredJob):
+        # Лимит на пользователя проверяется при приеме ссылки; принятые задания не теряем
+        scheduled = self.scheduler.submit(
+            job.user_id, job.chat_id, lambda: self._run(job),
+            enforce_limit=False, priority=job.payload.get('priority'), cost=job.payload.get('cost'),
+        )
+        self._jobs[job.id] = scheduled
+        scheduled.future.add_done_callback(lambda _: self._jobs.pop(job.id, None))
+
+    async def _run(self, job: StoredJob):
+        if not self.store.start(job.id):
+            logger.info(f"Job {job.key} was cancelled or taken over by another worker")
+            return
+
+        try:
+            await self.execute(self.context, job)
+        except asyncio.CancelledError:
+            # Задание отменено (в базе оно уже cancelled) или процесс останавливается:
+            # тогда аренда истечет, и задание продолжит другой воркер
+            raise
+        except Exception as e:
+            self.store.fail(job.id, str(e))
+            raise
+        else:
+            self.store.complete(job.id)
+
+    def _capacity(self) -> int:
+        """Сколько заданий имеет смысл забрать, чтобы не копить их в памяти"""
+        return self.scheduler.workers * 2 - self.scheduler.queued - self.scheduler.running
+
+    async def _poll(self):
+        renew_interval = max(self.poll_interval, self.store.lease_seconds / 3)
+        last_renew = last_purge = 0.0
+        while True:
+            try:
+                now = time.monotonic()
+                if now - last_purge >= PURGE_INTERVAL:
+                    self.store.purge(DONE_RETENTION_SECONDS)
+                    last_purge = now
+
+                if self.execute_jobs:
+                    if now - last_renew >= renew_interval:
+                        self.store.renew()
+                        last_renew = now
+
+                    # Задания, отмененные другим процессом (например, webhook-фронтендом)
+                    self._cancel_local(self.store.cancelled(list(self._jobs)))
+
+                    for job in self.store.claim(self._capacity()):
+                        logger.info(f"Claimed job {job.key} (attempt {job.attempts + 1})")
+                        self._submit(job)
+            except Exception as e:
+                logger.error(f"Job queue poll failed: {e}")
+
+            await asyncio.sleep(self.poll_interval)
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self.store.flush()
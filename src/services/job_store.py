@@ -0,0 +1,283 @@
+import asyncio
+import json
+import os
+import socket
+import sqlite3
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional
+
+from loguru import logger
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    key TEXT NOT NULL UNIQUE,
+    user_id INTEGER NOT NULL,
+    chat_id INTEGER NOT NULL,
+    payload TEXT NOT NULL,
+    state TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    lease_until REAL NOT NULL DEFAULT 0,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_state_lease ON jobs (state, lease_until);
+"""
+
+
+def make_worker_id() -> str:
+    """Уникальный идентификатор процесса-воркера"""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+@dataclass
+class StoredJob:
+    """Задание, сохраненное в базе"""
+
+    id: int
+    key: str
+    user_id: int
+    chat_id: int
+    payload: Dict[str, Any]
+    state: str
+    attempts: int
+
+
+JOB_COLUMNS = 'id, key, user_id, chat_id, payload, state, attempts'
+
+
+def _stored_job(row) -> StoredJob:
+    return StoredJob(id=row[0], key=row[1], user_id=row[2], chat_id=row[3],
+                     payload=json.loads(row[4]), state=row[5], attempts=row[6])
+
+
+class JobStore:
+    """Очередь заданий на загрузку в SQLite, переживающая перезапуски.
+
+    Задание принадлежит воркеру, пока не истекла его аренда (lease): воркер
+    продлевает аренду всех своих заданий, а задания умершего процесса через
+    lease_seconds снова становятся доступны для claim. Повторные попытки
+    ограничены max_attempts. Ключ задания (например, update_id) делает
+    постановку идемпотентной. Отмененное задание (cancelled) больше не
+    выполняется и не возвращается в очередь.
+
+    Записи на горячем пути не коммитятся сразу, а собираются в одну транзакцию
+    на commit_interval секунд; claim коммитится немедленно, так как захват
+    заданий должен быть атомарным между процессами.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        worker_id: Optional[str] = None,
+        lease_seconds: float = 30,
+        max_attempts: int = 3,
+        commit_interval: float = 0.2,
+    ):
+        self.path = path
+        self.worker_id = worker_id or make_worker_id()
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.commit_interval = commit_interval
+        self._db: Optional[sqlite3.Connection] = None
+        self._commit_handle: Optional[asyncio.TimerHandle] = None
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        if self._db is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(self.path, timeout=10, isolation_level='DEFERRED', check_same_thread=False)
+            self._db.execute('PRAGMA journal_mode=WAL')
+            # В WAL-режиме NORMAL не теряет целостность, лишь последние коммиты при сбое питания
+            self._db.execute('PRAGMA synchronous=NORMAL')
+            self._db.executescript(SCHEMA)
+        return self._db
+
+    def _schedule_commit(self):
+        """Откладывает коммит, чтобы объединить несколько записей в одну транзакцию"""
+        if self._commit_handle is not None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.flush()
+            return
+        self._commit_handle = loop.call_later(self.commit_interval, self.flush)
+
+    def flush(self):
+        if self._commit_handle is not None:
+            self._commit_handle.cancel()
+            self._commit_handle = None
+        if self._db is not None and self._db.in_transaction:
+            self._db.commit()
+
+    def exists(self, key: str) -> bool:
+        return self.db.execute('SELECT 1 FROM jobs WHERE key = ?', (key,)).fetchone() is not None
+
+    def add(self, key: str, user_id: int, chat_id: int, payload: Dict[str, Any], reserve: bool = True) -> Optional[int]:
+        """Сохраняет задание; с reserve=True оно сразу закреплено за этим воркером,
+        иначе его заберет первый свободный воркер через claim.
+
+        Возвращает id задания или None, если задание с таким ключом уже есть.
+        """
+        now = time.time()
+        worker, lease_until = (self.worker_id, now + self.lease_seconds) if reserve else (None, 0)
+        cursor = self.db.execute(
+            'INSERT OR IGNORE INTO jobs (key, user_id, chat_id, payload, state, worker, lease_until, created_at, updated_at) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (key, user_id, chat_id, json.dumps(payload), QUEUED, worker, lease_until, now, now),
+        )
+        self._schedule_commit()
+        return cursor.lastrowid if cursor.rowcount else None
+
+    def outstanding_for(self, user_id: int) -> int:
+        """Сколько заданий пользователя ждут или выполняются во всех процессах"""
+        return self.db.execute(
+            'SELECT COUNT(*) FROM jobs WHERE user_id = ? AND state IN (?, ?)', (user_id, QUEUED, RUNNING)
+        ).fetchone()[0]
+
+    def unfinished(self) -> int:
+        """Сколько заданий ждут или выполняются во всех процессах"""
+        return self.db.execute(
+            'SELECT COUNT(*) FROM jobs WHERE state IN (?, ?)', (QUEUED, RUNNING)
+        ).fetchone()[0]
+
+    def start(self, job_id: int) -> bool:
+        """Переводит задание этого воркера в running и считает попытку"""
+        now = time.time()
+        cursor = self.db.execute(
+            'UPDATE jobs SET state = ?, attempts = attempts + 1, lease_until = ?, updated_at = ? '
+            'WHERE id = ? AND worker = ? AND state IN (?, ?)',
+            (RUNNING, now + self.lease_seconds, now, job_id, self.worker_id, QUEUED, RUNNING),
+        )
+        self._schedule_commit()
+        return cursor.rowcount == 1
+
+    def complete(self, job_id: int):
+        # Отмененное задание так и остается отмененным
+        self.db.execute(
+            'UPDATE jobs SET state = ?, lease_until = 0, updated_at = ? WHERE id = ? AND worker = ? AND state = ?',
+            (DONE, time.time(), job_id, self.worker_id, RUNNING),
+        )
+        self._schedule_commit()
+
+    def fail(self, job_id: int, error: str):
+        """Возвращает задание в очередь или, если попытки исчерпаны, помечает failed"""
+        self.db.execute(
+            'UPDATE jobs SET state = CASE WHEN attempts < ? THEN ? ELSE ? END, '
+            'worker = NULL, lease_until = 0, error = ?, updated_at = ? WHERE id = ? AND worker = ? AND state = ?',
+            (self.max_attempts, QUEUED, FAILED, error[:1000], time.time(), job_id, self.worker_id, RUNNING),
+        )
+        self._schedule_commit()
+
+    def cancel_for(self, user_id: int, chat_id: int) -> List[StoredJob]:
+        """Отменяет незавершенные задания пользователя в чате, где бы они ни выполнялись.
+
+        Коммитится сразу: процессы-воркеры увидят отмену при следующем опросе.
+        """
+        now = time.time()
+        db = self.db
+        self.flush()
+        try:
+            db.execute('BEGIN IMMEDIATE')
+            rows = db.execute(
+                f'SELECT {JOB_COLUMNS} FROM jobs WHERE user_id = ? AND chat_id = ? AND state IN (?, ?) ORDER BY id',
+                (user_id, chat_id, QUEUED, RUNNING),
+            ).fetchall()
+            if rows:
+                db.executemany(
+                    'UPDATE jobs SET state = ?, lease_until = 0, updated_at = ? WHERE id = ?',
+                    [(CANCELLED, now, row[0]) for row in rows],
+                )
+            db.commit()
+        except BaseException:
+            db.rollback()
+            raise
+        return [_stored_job(row) for row in rows]
+
+    def cancelled(self, job_ids: Iterable[int]) -> List[int]:
+        """Какие из заданий отменены (в том числе другим процессом)"""
+        job_ids = list(job_ids)
+        if not job_ids:
+            return []
+        placeholders = ', '.join('?' * len(job_ids))
+        rows = self.db.execute(
+            f'SELECT id FROM jobs WHERE state = ? AND id IN ({placeholders})', (CANCELLED, *job_ids)
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def renew(self) -> int:
+        """Продлевает аренду всех незавершенных заданий этого воркера"""
+        now = time.time()
+        cursor = self.db.execute(
+            'UPDATE jobs SET lease_until = ? WHERE worker = ? AND state IN (?, ?)',
+            (now + self.lease_seconds, self.worker_id, QUEUED, RUNNING),
+        )
+        self._schedule_commit()
+        return cursor.rowcount
+
+    def claim(self, limit: int = 1) -> List[StoredJob]:
+        """Забирает свободные задания и задания с истекшей арендой (например, после перезапуска)"""
+        if limit <= 0:
+            return []
+
+        now = time.time()
+        db = self.db
+        self.flush()
+        try:
+            db.execute('BEGIN IMMEDIATE')
+            # Задания, на которых процесс падал слишком много раз, больше не повторяем
+            db.execute(
+                'UPDATE jobs SET state = ?, error = ?, updated_at = ? '
+                'WHERE state = ? AND lease_until < ? AND attempts >= ?',
+                (FAILED, 'Too many attempts', now, RUNNING, now, self.max_attempts),
+            )
+            rows = db.execute(
+                f'SELECT {JOB_COLUMNS} FROM jobs '
+                'WHERE state IN (?, ?) AND lease_until < ? ORDER BY id LIMIT ?',
+                (QUEUED, RUNNING, now, limit),
+            ).fetchall()
+            if rows:
+                db.executemany(
+                    'UPDATE jobs SET worker = ?, lease_until = ?, updated_at = ? WHERE id = ?',
+                    [(self.worker_id, now + self.lease_seconds, now, row[0]) for row in rows],
+                )
+            db.commit()
+        except BaseException:
+            db.rollback()
+            raise
+
+        jobs = [_stored_job(row) for row in rows]
+        if jobs:
+            logger.info(f"Claimed {len(jobs)} unfinished jobs")
+        return jobs
+
+    def purge(self, older_than: float) -> int:
+        """Удаляет завершенные задания старше older_than секунд"""
+        cursor = self.db.execute(
+            'DELETE FROM jobs WHERE state IN (?, ?, ?) AND updated_at < ?',
+            (DONE, FAILED, CANCELLED, time.time() - older_than),
+        )
+        self._schedule_commit()
+        return cursor.rowcount
+
+    def counts(self) -> Dict[str, int]:
+        return dict(self.db.execute('SELECT state, COUNT(*) FROM jobs GROUP BY state').fetchall())
+
+    def close(self):
+        self.flush()
+        if self._db is not None:
+            self._db.close()
+            self._db = None
@@ -0,0 +1,61 @@
+import re
+from typing import Any, Iterable, List, Optional, Tuple
+
+# Ссылка в тексте без разметки; завершающая пунктуация к ссылке не относится
+URL_PATTERN = re.compile(r'https?://[^\s<>"\']+')
+TRAILING_PUNCTUATION = '.,;:!?)]}»'
+# Домены поддерживаемых платформ для быстрой проверки до регулярных выражений
+SUPPORTED_HOSTS = ('pinterest.com', 'pin.it', 'tiktok.com', 'instagram.com', 'instagr.am')
+
+
+def _utf16_index(text: str, offset: int) -> int:
+    """Индекс в строке Python по смещению в UTF-16 (так считает Telegram)"""
+    return len(text.encode('utf-16-le')[:offset * 2].decode('utf-16-le', errors='ignore'))
+
+
+def _entity_text(text: str, offset: int, length: int) -> str:
+    data = text.encode('utf-16-le')[offset * 2:(offset + length) * 2]
+    return data.decode('utf-16-le', errors='ignore')
+
+
+def might_contain_link(text: Optional[str], entities: Optional[Iterable[Any]] = None) -> bool:
+    """Есть ли в сообщении домен поддерживаемой платформы.
+
+    Поиск подстроки по нескольким коротким доменам выполняется на C и почти
+    ничего не стоит, поэтому сообщения без ссылок отсекаются, не доходя до
+    регулярных выражений.
+    """
+    if text:
+        lowered = text.lower()
+        if any(host in lowered for host in SUPPORTED_HOSTS):
+            return True
+    # У text_link адрес спрятан за текстом
+    return any(
+        entity.type == 'text_link' and entity.url and might_contain_link(entity.url)
+        for entity in entities or ()
+    )
+
+
+def extract_urls(text: Optional[str], entities: Optional[Iterable[Any]] = None) -> List[str]:
+    """Все ссылки сообщения в порядке появления, без повторов.
+
+    Ссылки берутся из сущностей Telegram (url и text_link - у последней адрес
+    скрыт за текстом) и из самого текста, если сущностей нет, например у
+    сообщения, восстановленного из очереди заданий.
+    """
+    text = text or ''
+    found: List[Tuple[int, str]] = []
+    for entity in entities or ():
+        if entity.type == 'url':
+            found.append((_utf16_index(text, entity.offset), _entity_text(text, entity.offset, entity.length)))
+        elif entity.type == 'text_link' and entity.url:
+            found.append((_utf16_index(text, entity.offset), entity.url))
+    for match in URL_PATTERN.finditer(text):
+        found.append((match.start(), match.group()))
+
+    urls: List[str] = []
+    for _, url in sorted(found, key=lambda item: item[0]):
+        url = url.strip().rstrip(TRAILING_PUNCTUATION)
+        if url and url not in urls:
+            urls.append(url)
+    return urls
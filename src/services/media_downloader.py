@@ -8,12 +8,17 @@ import yt_dlp
 import instaloader
 from bs4 import BeautifulSoup
 
+from .bulkhead import Bulkheads
+
 
 class MediaDownloader:
     """Сервис для скачивания медиа с различных платформ"""
     
-    def __init__(self):
+    def __init__(self, bulkheads: Optional[Bulkheads] = None):
         self.session = None
+        # Изоляция платформ: свои лимит загрузок, пул соединений и потоки yt-dlp
+        self.bulkheads = bulkheads
+        self._executor = None
         self.ydl_opts = {
             'format': 'best',
             'outtmpl': '%(title)s.%(ext)s',
@@ -22,11 +27,16 @@ class MediaDownloader:
             'no_warnings': True,
         }
     
-    async def __aenter__(self):
-        self.session = aiohttp.ClientSession(
+    def _create_session(self, connector: Optional[aiohttp.TCPConnector] = None) -> aiohttp.ClientSession:
+        return aiohttp.ClientSession(
             timeout=aiohttp.ClientTimeout(total=30),
-            headers={'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
+            headers={'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'},
+            connector=connector,
+            connector_owner=connector is None,
         )
+    
+    async def __aenter__(self):
+        self.session = self._create_session()
         return self
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
@@ -74,7 +84,7 @@ class MediaDownloader:
             
             # Выполняем в отдельном потоке чтобы не блокировать event loop
             loop = asyncio.get_event_loop()
-            media_url = await loop.run_in_executor(None, download)
+            media_url = await loop.run_in_executor(self._executor, download)
             
             if media_url and self.session:
                 try:
@@ -118,7 +128,7 @@ class MediaDownloader:
                 return None
             
             loop = asyncio.get_event_loop()
-            media_url = await loop.run_in_executor(None, download)
+            media_url = await loop.run_in_executor(self._executor, download)
             
             if media_url and self.session:
                 try:
@@ -158,7 +168,7 @@ class MediaDownloader:
                 return None
             
             loop = asyncio.get_event_loop()
-            media_url = await loop.run_in_executor(None, download)
+            media_url = await loop.run_in_executor(self._executor, download)
             
             if media_url and self.session:
                 try:
@@ -181,7 +191,24 @@ class MediaDownloader:
     async def download_media(self, url: str) -> Tuple[Optional[bytes], str]:
         """Основной метод для скачивания медиа"""
         platform = self.detect_platform(url)
+        if platform == 'unknown':
+            return None, 'unknown'
+        if self.bulkheads is None:
+            return await self._download_media(url, platform)
         
+        # Загрузка ждет места только в пределах своей платформы
+        async with self.bulkheads.get(platform).slot() as bulkhead:
+            shared_session = self.session
+            self.session = self._create_session(bulkhead.connector())
+            self._executor = bulkhead.executor
+            try:
+                return await self._download_media(url, platform)
+            finally:
+                await self.session.close()
+                self.session = shared_session
+                self._executor = None
+    
+    async def _download_media(self, url: str, platform: str) -> Tuple[Optional[bytes], str]:
         if platform == 'pinterest':
             media_data = await self.download_pinterest_media(url)
             file_type = 'photo' if media_data and len(media_data) < 10 * 1024 * 1024 else 'video'
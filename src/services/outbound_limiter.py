@@ -0,0 +1,159 @@
+import asyncio
+import itertools
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Hashable, List, Optional, Tuple
+
+from loguru import logger
+
+from .rate_limiter import KeyedBuckets, TokenBucket
+
+# Приоритеты исходящих запросов: меньше - раньше
+HIGH = 0
+NORMAL = 1
+LOW = 2
+
+# Приоритет, заданный вызывающим кодом для запросов внутри блока send_priority
+outbound_priority: ContextVar[Optional[int]] = ContextVar('outbound_priority', default=None)
+
+
+@contextmanager
+def send_priority(priority: int):
+    """Задает приоритет исходящих запросов внутри блока"""
+    token = outbound_priority.set(priority)
+    try:
+        yield
+    finally:
+        outbound_priority.reset(token)
+
+
+class OutboundLimiter:
+    """Очередь исходящих запросов к Telegram с общим лимитом и лимитом на чат.
+
+    Запрос получает разрешение, когда есть токены в общем ведре и в ведре
+    его чата. Ожидающие запросы обслуживаются по приоритету, а внутри
+    приоритета и чата - в порядке поступления; запрос, чей чат исчерпал лимит,
+    не задерживает запросы в другие чаты. После ответа 429 pause() закрывает
+    чат (или весь бот) на retry_after секунд.
+    """
+
+    def __init__(self, global_rate: float = 30, global_burst: float = 30, chat_rate: float = 1, chat_burst: float = 3):
+        self.bucket = TokenBucket(global_rate, global_burst)
+        self.chats = KeyedBuckets(chat_rate, chat_burst)
+        self._paused_until = 0.0
+        self._chat_paused_until: Dict[Hashable, float] = {}
+        self._pending: List[Tuple[int, int, Optional[Hashable], asyncio.Future]] = []
+        self._counter = itertools.count()
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def _ensure_started(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._task is not None and not self._task.done():
+            return
+        # Ожидающие запросы старого цикла событий уже никто не ждет
+        self._pending.clear()
+        self._loop = loop
+        self._wakeup = asyncio.Event()
+        self._task = loop.create_task(self._run())
+
+    async def acquire(self, chat_id: Optional[Hashable] = None, priority: int = NORMAL):
+        """Ждет разрешения на отправку запроса в чат"""
+        self._ensure_started()
+        future = self._loop.create_future()
+        entry = (priority, next(self._counter), chat_id, future)
+        self._pending.append(entry)
+        self._wakeup.set()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if entry in self._pending:
+                self._pending.remove(entry)
+            raise
+
+    def pause(self, retry_after: float, chat_id: Optional[Hashable] = None):
+        """Запрещает отправку в чат (или любую отправку) на retry_after секунд"""
+        until = time.monotonic() + retry_after
+        if chat_id is None:
+            self._paused_until = max(self._paused_until, until)
+        else:
+            self._chat_paused_until[chat_id] = max(self._chat_paused_until.get(chat_id, 0.0), until)
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _chat_delay(self, chat_id: Optional[Hashable], now: float) -> float:
+        if chat_id is None:
+            return 0.0
+        paused_until = self._chat_paused_until.get(chat_id)
+        if paused_until is not None:
+            if paused_until > now:
+                return paused_until - now
+            del self._chat_paused_until[chat_id]
+        bucket = self.chats.get(chat_id, now)
+        return 0.0 if bucket.can_take(now=now) else bucket.retry_after()
+
+    def _grant(self, now: float) -> Optional[float]:
+        """Выдает все возможные разрешения; возвращает, через сколько пробовать снова"""
+        waiting = []
+        retry = None
+        blocked_chats = set()
+        self._pending.sort(key=lambda entry: entry[:2])
+
+        for index, entry in enumerate(self._pending):
+            chat_id, future = entry[2], entry[3]
+            if future.done():
+                # Запрос отменен, пока ждал в очереди
+                continue
+
+            global_delay = max(self._paused_until - now, 0.0)
+            if not global_delay and not self.bucket.can_take(now=now):
+                global_delay = self.bucket.retry_after()
+            if global_delay:
+                waiting.extend(e for e in self._pending[index:] if not e[3].done())
+                retry = global_delay if retry is None else min(retry, global_delay)
+                break
+
+            delay = 0.0 if chat_id in blocked_chats else self._chat_delay(chat_id, now)
+            if chat_id in blocked_chats or delay:
+                blocked_chats.add(chat_id)
+                waiting.append(entry)
+                if delay:
+                    retry = delay if retry is None else min(retry, delay)
+                continue
+
+            self.bucket.take()
+            if chat_id is not None:
+                self.chats.get(chat_id, now).take()
+            future.set_result(None)
+
+        self._pending = waiting
+        return retry
+
+    async def _run(self):
+        while True:
+            retry = self._grant(time.monotonic())
+            self._wakeup.clear()
+            if retry is None:
+                await self._wakeup.wait()
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=max(retry, 0.001))
+            except asyncio.TimeoutError:
+                pass
+
+    async def stop(self):
+        for entry in self._pending:
+            entry[3].cancel()
+        self._pending.clear()
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        logger.debug("Outbound limiter stopped")
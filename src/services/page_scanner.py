@@ -0,0 +1,179 @@
+import html
+import re
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Pattern, Tuple
+
+import aiohttp
+from loguru import logger
+
+# Ограничения потокового чтения страницы
+DEFAULT_MAX_BYTES = 1024 * 1024
+DEFAULT_CHUNK_SIZE = 16 * 1024
+# Сколько байт предыдущего окна пересканировать, чтобы не потерять совпадение на стыке чанков.
+# Незакрытый <script> (например, большой ld+json) пересканируется целиком, с открывающего тега
+DEFAULT_OVERLAP = 64 * 1024
+
+
+def meta_pattern(prop: str) -> Pattern[bytes]:
+    """Строит шаблон для <meta property=... content=...> в любом порядке атрибутов"""
+    name = re.escape(prop.encode())
+    return re.compile(
+        rb'<meta[^>]+(?:property|name)=["\']' + name + rb'["\'][^>]*?content=["\']([^"\']*)["\']'
+        rb'|<meta[^>]+content=["\']([^"\']*)["\'][^>]*?(?:property|name)=["\']' + name + rb'["\']',
+        re.IGNORECASE,
+    )
+
+
+# Шаблоны, которые ищутся прямо в байтах страницы
+MP4_URL = re.compile(rb'(https://[^"\s]+\.mp4[^"\s]*)')
+MP4_HREF = re.compile(rb'href="(https://[^"\s]+\.mp4[^"\s]*)"')
+VIDEO_SRC = re.compile(rb'<video[^>]+src=["\']([^"\']*mp4[^"\']*)', re.IGNORECASE)
+LD_JSON = re.compile(rb'<script[^>]+application/ld\+json[^>]*>(.*?)</script>', re.IGNORECASE | re.DOTALL)
+OG_IMAGE = meta_pattern('og:image')
+OG_VIDEO = meta_pattern('og:video')
+OG_DESCRIPTION = meta_pattern('og:description')
+
+# Открывающие и закрывающие теги script: по ним видно, где начался еще не закрытый блок
+SCRIPT_TAG = re.compile(rb'<(/?)script', re.IGNORECASE)
+SCRIPT_TAG_MAX_LEN = len(b'</script')
+
+
+@dataclass
+class ScanResult:
+    """Результат потокового сканирования страницы"""
+    matches: Dict[str, str] = field(default_factory=dict)
+    bytes_read: int = 0
+    complete: bool = False
+
+    def get(self, name: str) -> Optional[str]:
+        return self.matches.get(name)
+
+    def __bool__(self) -> bool:
+        return bool(self.matches)
+
+
+def _decode_match(pattern: Pattern[bytes], match: re.Match) -> Optional[str]:
+    """Достает первую непустую группу совпадения в виде строки"""
+    raw = next((group for group in match.groups() if group is not None), match.group(0))
+    value = raw.decode('utf-8', errors='replace')
+    # JSON внутри ld+json не экранирован HTML-сущностями
+    if pattern is not LD_JSON:
+        value = html.unescape(value)
+    return value
+
+
+def search_buffer(
+    buffer: bytes,
+    patterns: Dict[str, Pattern[bytes]],
+    result: ScanResult,
+    start: int = 0,
+    final: bool = True,
+) -> ScanResult:
+    """Дополняет result совпадениями, найденными в buffer начиная с позиции start.
+
+    Пока тело дочитывается (final=False), совпадение, упирающееся в конец
+    буфера, не принимается: следующий чанк может его продолжить, например
+    дописать хвост ссылки.
+    """
+    for name, pattern in patterns.items():
+        if name in result.matches:
+            continue
+        match = pattern.search(buffer, start)
+        if match and (final or match.end() < len(buffer)):
+            result.matches[name] = _decode_match(pattern, match)
+    result.bytes_read = len(buffer)
+    return result
+
+
+def _track_open_script(buffer: bytes, start: int, open_at: Optional[int]) -> Tuple[Optional[int], int]:
+    """Находит начало незакрытого <script> в буфере, просматривая его с позиции start.
+
+    Возвращает позицию открывающего тега (None, если все script закрыты) и
+    позицию, с которой продолжать просмотр после следующего чанка: тег,
+    разрезанный границей чанка, будет найден целиком.
+    """
+    resume = start
+    for match in SCRIPT_TAG.finditer(buffer, start):
+        if match.group(1):
+            open_at = None
+        elif open_at is None:
+            open_at = match.start()
+        resume = match.end()
+    return open_at, max(resume, len(buffer) - SCRIPT_TAG_MAX_LEN + 1)
+
+
+async def scan_response(
+    response: aiohttp.ClientResponse,
+    patterns: Dict[str, Pattern[bytes]],
+    max_bytes: int = DEFAULT_MAX_BYTES,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    overlap: int = DEFAULT_OVERLAP,
+    stop_on_match: bool = True,
+) -> ScanResult:
+    """Ищет шаблоны в теле ответа по мере поступления чанков.
+
+    Чтение прекращается на первом чанке, в котором нашлось хотя бы одно совпадение
+    (если stop_on_match), либо по достижении max_bytes. Кодировка страницы не
+    определяется: шаблоны работают по сырым байтам.
+    """
+    result = ScanResult()
+    buffer = bytearray()
+    scanned = 0
+    open_script: Optional[int] = None
+    tags_from = 0
+
+    def rescan_start() -> int:
+        start = max(0, scanned - overlap)
+        return start if open_script is None else min(start, open_script)
+
+    async for chunk in response.content.iter_chunked(chunk_size):
+        buffer += chunk[:max_bytes - len(buffer)]
+        capped = len(buffer) >= max_bytes
+        search_buffer(buffer, patterns, result, start=rescan_start(), final=capped)
+        open_script, tags_from = _track_open_script(buffer, tags_from, open_script)
+        scanned = len(buffer)
+        if len(result.matches) == len(patterns):
+            break
+        if stop_on_match and result.matches:
+            break
+        if capped:
+            logger.debug(f"Page scan hit {max_bytes} byte cap: {response.url}")
+            break
+    else:
+        result.complete = True
+        # Совпадение в самом конце страницы ждало следующего чанка, которого уже не будет
+        search_buffer(buffer, patterns, result, start=rescan_start())
+
+    result.bytes_read = len(buffer)
+    if not result.complete:
+        # Остаток тела не нужен: закрываем соединение, не дочитывая его
+        response.close()
+    return result
+
+
+async def scan_page(
+    session: aiohttp.ClientSession,
+    url: str,
+    patterns: Dict[str, Pattern[bytes]],
+    max_bytes: int = DEFAULT_MAX_BYTES,
+    headers: Optional[dict] = None,
+    timeout: int = 20,
+    stop_on_match: bool = True,
+) -> ScanResult:
+    """Загружает страницу потоково и возвращает найденные значения шаблонов"""
+    async with session.get(url, headers=headers, timeout=timeout) as response:
+        if response.status != 200:
+            logger.debug(f"HTTP {response.status} while scanning {url}")
+            return ScanResult()
+
+        result = await scan_response(
+            response,
+            patterns,
+            max_bytes=max_bytes,
+            stop_on_match=stop_on_match,
+        )
+        logger.debug(
+            f"Scanned {result.bytes_read} bytes of {url} "
+            f"({'full page' if result.complete else 'stopped early'}), found: {list(result.matches)}"
+        )
+        return result
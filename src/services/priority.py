@@ -0,0 +1,71 @@
+import os
+import time
+from typing import FrozenSet, Iterable, Optional
+
+from loguru import logger
+
+from .download_scheduler import ADMIN, FREE, SUPPORTER
+
+
+def parse_ids(value: Optional[str]) -> FrozenSet[int]:
+    """Разбирает список id через запятую или пробел, пропуская мусор"""
+    ids = set()
+    for part in (value or '').replace(',', ' ').split():
+        try:
+            ids.add(int(part))
+        except ValueError:
+            logger.warning(f"Skipping invalid user id: {part!r}")
+    return frozenset(ids)
+
+
+class MembershipCache:
+    """Принадлежность пользователей к классам приоритета.
+
+    Администраторы и поддержавшие проект задаются списками id, дополнительно
+    поддержавших можно перечислить в файле (по одному id в строке). Файл
+    перечитывается только при изменении mtime и проверяется не чаще раза в
+    ttl секунд, так что поиск класса - это проверка по множеству в памяти.
+    """
+
+    def __init__(
+        self,
+        admins: Iterable[int] = (),
+        supporters: Iterable[int] = (),
+        path: Optional[str] = None,
+        ttl: float = 60,
+    ):
+        self.admins = frozenset(admins)
+        self.supporters = frozenset(supporters)
+        self.path = path
+        self.ttl = ttl
+        self._file_supporters: FrozenSet[int] = frozenset()
+        self._mtime: Optional[float] = None
+        self._checked_at: Optional[float] = None
+
+    def _refresh(self, now: float):
+        if not self.path or (self._checked_at is not None and now - self._checked_at < self.ttl):
+            return
+        self._checked_at = now
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            self._file_supporters, self._mtime = frozenset(), None
+            return
+        if mtime == self._mtime:
+            return
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                self._file_supporters = parse_ids(f.read())
+            self._mtime = mtime
+            logger.info(f"Loaded {len(self._file_supporters)} supporters from {self.path}")
+        except OSError as e:
+            logger.warning(f"Could not read supporters file: {e}")
+
+    def class_for(self, user_id: int, now: Optional[float] = None) -> str:
+        """Класс приоритета пользователя"""
+        if user_id in self.admins:
+            return ADMIN
+        self._refresh(time.monotonic() if now is None else now)
+        if user_id in self.supporters or user_id in self._file_supporters:
+            return SUPPORTER
+        return FREE
@@ -0,0 +1,146 @@
+import asyncio
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field, replace
+from typing import Awaitable, Callable, Hashable, Optional
+
+from loguru import logger
+
+from .rate_limiter import KeyedBuckets, TokenBucket
+
+# Стадии задания
+DOWNLOAD = 'download'
+PROCESSING = 'processing'
+UPLOAD = 'upload'
+
+
+@dataclass
+class ProgressState:
+    """Последнее известное состояние задания; промежуточные события не хранятся"""
+
+    stage: str = DOWNLOAD
+    strategy: Optional[str] = None
+    received: int = 0
+    total: Optional[int] = None
+    item: int = 0
+    items: int = 0
+    action: str = 'upload_document'
+    started_at: float = field(default_factory=time.monotonic)
+
+
+# Репортер текущего задания: загрузчик сообщает о ходе работы, не зная, кто его слушает
+current_progress: ContextVar[Optional["ProgressReporter"]] = ContextVar('current_progress', default=None)
+
+
+def report(**changes):
+    """Обновляет состояние текущего задания (если его кто-то слушает)"""
+    reporter = current_progress.get()
+    if reporter is not None:
+        reporter.update(**changes)
+
+
+class EditBudget:
+    """Бюджет правок сообщений о ходе загрузки: на чат и на весь бот.
+
+    Правка, на которую нет бюджета, не ждет, а пропускается - ее заменит
+    следующая, поэтому прогресс никогда не создает очередь к Telegram.
+    """
+
+    def __init__(self, chat_interval: float = 3.0, global_rate: float = 5.0):
+        self.chats = KeyedBuckets(1 / chat_interval, 1)
+        self.bucket = TokenBucket(global_rate, global_rate)
+
+    def allow(self, chat_id: Hashable, now: Optional[float] = None) -> bool:
+        now = time.monotonic() if now is None else now
+        chat = self.chats.get(chat_id, now)
+        if not chat.can_take(now=now) or not self.bucket.can_take(now=now):
+            return False
+        chat.take()
+        self.bucket.take()
+        return True
+
+
+class ProgressReporter:
+    """Сводит события загрузки в редкие правки сообщения о загрузке.
+
+    События (смена метода, полученные байты, начало отправки) только
+    обновляют состояние. Фоновая задача не чаще раза в interval секунд
+    показывает последнее состояние через edit - если оно изменилось, в
+    бюджете есть место и не исчерпаны max_edits правок. Каждые
+    action_interval секунд отправляется chat action, чтобы пользователь
+    видел, что бот работает, даже когда текст не меняется.
+    """
+
+    def __init__(
+        self,
+        chat_id: Hashable,
+        edit: Callable[[str], Awaitable],
+        chat_action: Callable[[str], Awaitable],
+        render: Callable[[ProgressState], str],
+        budget: EditBudget,
+        interval: float = 3.0,
+        action_interval: float = 5.0,
+        max_edits: int = 20,
+    ):
+        self.chat_id = chat_id
+        self.edit = edit
+        self.chat_action = chat_action
+        self.render = render
+        self.budget = budget
+        self.interval = interval
+        self.action_interval = action_interval
+        self.max_edits = max_edits
+        self.state = ProgressState()
+        self.edits = 0
+        self._version = 0
+        self._shown_version = 0
+        self._last_text: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+        self._token = None
+
+    def update(self, **changes):
+        self.state = replace(self.state, **changes)
+        self._version += 1
+
+    async def __aenter__(self) -> "ProgressReporter":
+        self._token = current_progress.set(self)
+        self._task = asyncio.create_task(self._run())
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        current_progress.reset(self._token)
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+
+    async def _call(self, request: Awaitable):
+        # Сбой отображения прогресса не должен ронять загрузку
+        try:
+            await request
+        except Exception as e:
+            logger.debug(f"Progress update failed in chat {self.chat_id}: {e}")
+
+    async def _run(self):
+        last_edit = time.monotonic()
+        last_action = None
+        tick = min(self.interval, self.action_interval) / 2
+        while True:
+            now = time.monotonic()
+            if last_action is None or now - last_action >= self.action_interval:
+                last_action = now
+                await self._call(self.chat_action(self.state.action))
+
+            if (
+                self._version != self._shown_version
+                and now - last_edit >= self.interval
+                and self.edits < self.max_edits
+                and self.budget.allow(self.chat_id, now)
+            ):
+                last_edit = now
+                self._shown_version = self._version
+                text = self.render(self.state)
+                if text != self._last_text:
+                    self._last_text = text
+                    self.edits += 1
+                    await self._call(self.edit(text))
+
+            await asyncio.sleep(tick)
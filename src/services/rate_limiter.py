@@ -0,0 +1,131 @@
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional
+
+
+class TokenBucket:
+    """Ведро токенов: burst запросов подряд, затем rate запросов в секунду"""
+
+    def __init__(self, rate: float, burst: float, now: Optional[float] = None):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated_at = time.monotonic() if now is None else now
+
+    def refill(self, now: Optional[float] = None):
+        now = time.monotonic() if now is None else now
+        elapsed = max(0.0, now - self.updated_at)
+        self.tokens = min(self.burst, self.tokens + elapsed * self.rate)
+        self.updated_at = now
+
+    def can_take(self, amount: float = 1.0, now: Optional[float] = None) -> bool:
+        self.refill(now)
+        return self.tokens >= amount
+
+    def take(self, amount: float = 1.0):
+        self.tokens -= amount
+
+    def retry_after(self, amount: float = 1.0) -> float:
+        """Через сколько секунд в ведре появится amount токенов"""
+        if self.tokens >= amount or self.rate <= 0:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+
+class KeyedBuckets:
+    """Набор ведер по ключу (пользователь, чат) с ограничением числа ключей.
+
+    При переполнении вытесняются самые давно использованные ключи: их ведра
+    почти наверняка успели наполниться и ничем не отличаются от новых.
+    """
+
+    def __init__(self, rate: float, burst: float, max_keys: int = 100_000):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[Hashable, TokenBucket]" = OrderedDict()
+
+    def get(self, key: Hashable, now: Optional[float] = None) -> TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(self.rate, self.burst, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        return bucket
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class RateLimiter:
+    """Лимиты запросов на пользователя, на чат и на весь бот.
+
+    Запрос проходит, только если токены есть во всех трех ведрах; списание
+    происходит одновременно, так что отклоненный запрос ничего не тратит.
+    """
+
+    USER = 'user'
+    CHAT = 'chat'
+    GLOBAL = 'global'
+
+    def __init__(
+        self,
+        user_rate: float,
+        user_burst: float,
+        chat_rate: float,
+        chat_burst: float,
+        global_rate: float,
+        global_burst: float,
+    ):
+        self.users = KeyedBuckets(user_rate, user_burst)
+        self.chats = KeyedBuckets(chat_rate, chat_burst)
+        self.bucket = TokenBucket(global_rate, global_burst)
+
+    def acquire(self, user_id: int, chat_id: int, now: Optional[float] = None) -> Optional[str]:
+        """Списывает по токену из каждого ведра.
+
+        Возвращает None, если запрос разрешен, иначе название исчерпанного лимита.
+        """
+        now = time.monotonic() if now is None else now
+        buckets: Dict[str, TokenBucket] = {
+            self.USER: self.users.get(user_id, now),
+            self.CHAT: self.chats.get(chat_id, now),
+            self.GLOBAL: self.bucket,
+        }
+        for scope, bucket in buckets.items():
+            if not bucket.can_take(now=now):
+                return scope
+
+        for bucket in buckets.values():
+            bucket.take()
+        return None
+
+
+class FrequencyCap:
+    """Не чаще одного события на ключ за interval секунд (например, промо-сообщение пользователю).
+
+    Хранится только время последнего события в целых секундах; при
+    переполнении вытесняются самые давние ключи.
+    """
+
+    def __init__(self, interval: float, max_keys: int = 100_000):
+        self.interval = interval
+        self.max_keys = max_keys
+        self._last: "OrderedDict[Hashable, int]" = OrderedDict()
+
+    def allow(self, key: Hashable, now: Optional[float] = None) -> bool:
+        """True, если событие можно показать сейчас; тогда оно сразу учитывается"""
+        now = int(time.monotonic() if now is None else now)
+        last = self._last.get(key)
+        if last is not None and now - last < self.interval:
+            return False
+        self._last[key] = now
+        self._last.move_to_end(key)
+        if len(self._last) > self.max_keys:
+            self._last.popitem(last=False)
+        return True
+
+    def __len__(self) -> int:
+        return len(self._last)
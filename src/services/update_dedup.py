@@ -0,0 +1,74 @@
+import os
+from array import array
+from collections import deque
+from typing import Deque, Optional, Set
+
+from loguru import logger
+
+
+class RecentUpdates:
+    """Окно последних обработанных update_id: кольцо фиксированного размера плюс множество.
+
+    Проверка и добавление - O(1), память ограничена capacity. Если задан path,
+    окно сохраняется на диск компактным массивом int64 раз в save_every
+    добавлений и при flush(), так что повторные доставки отсеиваются и после
+    перезапуска.
+    """
+
+    def __init__(self, capacity: int = 10_000, path: Optional[str] = None, save_every: int = 50):
+        self.capacity = capacity
+        self.path = path
+        self.save_every = save_every
+        self._ring: Deque[int] = deque()
+        self._ids: Set[int] = set()
+        self._unsaved = 0
+        if path:
+            self._load()
+
+    def __contains__(self, update_id: int) -> bool:
+        return update_id in self._ids
+
+    def __len__(self) -> int:
+        return len(self._ring)
+
+    def add(self, update_id: int):
+        if update_id in self._ids:
+            return
+        self._ring.append(update_id)
+        self._ids.add(update_id)
+        if len(self._ring) > self.capacity:
+            self._ids.discard(self._ring.popleft())
+
+        self._unsaved += 1
+        if self.path and self._unsaved >= self.save_every:
+            self.flush()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        ids = array('q')
+        try:
+            with open(self.path, 'rb') as f:
+                ids.frombytes(f.read())
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not load seen update ids: {e}")
+            return
+        for update_id in ids[-self.capacity:]:
+            self._ring.append(update_id)
+            self._ids.add(update_id)
+
+    def flush(self):
+        """Сохраняет окно на диск (атомарно, через временный файл)"""
+        if not self.path or not self._unsaved:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = f"{self.path}.tmp"
+        try:
+            with open(temp_path, 'wb') as f:
+                f.write(array('q', self._ring).tobytes())
+            os.replace(temp_path, self.path)
+            self._unsaved = 0
+        except OSError as e:
+            logger.warning(f"Could not save seen update ids: {e}")
@@ -0,0 +1,69 @@
+import asyncio
+from typing import Any, Awaitable, Callable, List, Optional
+
+from loguru import logger
+
+
+class UpdateQueue:
+    """Ограниченная очередь входящих обновлений с фиксированным набором воркеров.
+
+    Webhook только кладет обновление в очередь и сразу отвечает Telegram, а
+    обработка идет в фоне не более чем в workers задачах. Если очередь
+    заполнена, submit возвращает False - вызывающий должен вернуть ошибку,
+    чтобы Telegram повторил доставку позже.
+    """
+
+    def __init__(self, handler: Callable[[Any], Awaitable[Any]], workers: int = 8, max_size: int = 100):
+        self.handler = handler
+        self.workers = workers
+        self.max_size = max_size
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def size(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def submit(self, item: Any) -> bool:
+        """Ставит обновление в очередь; False, если очередь переполнена"""
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(item)
+        except asyncio.QueueFull:
+            logger.warning(f"Update queue is full ({self.max_size}), rejecting update")
+            return False
+        return True
+
+    def _ensure_started(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._tasks:
+            return
+
+        if self._loop is not None and self._loop is not loop:
+            logger.warning("Event loop changed, recreating update queue")
+
+        self._loop = loop
+        self._queue = asyncio.Queue(maxsize=self.max_size)
+        self._tasks = [loop.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def _worker(self):
+        while True:
+            item = await self._queue.get()
+            try:
+                await self.handler(item)
+            except Exception as e:
+                logger.exception(f"Error while processing update: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def join(self):
+        """Ждет обработки всех принятых обновлений"""
+        if self._queue is not None and self._loop is asyncio.get_running_loop():
+            await self._queue.join()
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
@@ -5,13 +5,21 @@ import json
 from typing import Optional, Dict, Any
 from loguru import logger
 from bs4 import BeautifulSoup
+from .page_scanner import scan_page, MP4_URL, VIDEO_SRC
+from .fetch_context import scan_shared
 
 class VideoDownloader:
-    def __init__(self):
+    def __init__(self, max_bytes: Optional[int] = None, connector: Optional[aiohttp.TCPConnector] = None):
         self.session = None
+        # Лимит размера видео; None - без ограничения
+        self.max_bytes = max_bytes
+        # Пул соединений платформы (bulkhead); без него сессия создает собственный
+        self.connector = connector
     
     async def __aenter__(self):
         self.session = aiohttp.ClientSession(
+            connector=self.connector,
+            connector_owner=self.connector is None,
             timeout=aiohttp.ClientTimeout(total=45),
             headers={
                 'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
@@ -274,20 +282,10 @@ class VideoDownloader:
         try:
             mobile_url = url.replace('tiktok.com', 'vm.tiktok.com')
             
-            async with self.session.get(mobile_url, timeout=15) as response:
-                if response.status == 200:
-                    # Следуем за редиректом
-                    final_url = str(response.url)
-                    
-                    # Ищем видео в странице
-                    html = await response.text()
-                    soup = BeautifulSoup(html, 'html.parser')
-                    
-                    video_tags = soup.find_all('video')
-                    for video in video_tags:
-                        src = video.get('src')
-                        if src and 'mp4' in src:
-                            return await self._download_video_from_url(src)
+            # Ищем видео в странице, не дочитывая ее после первого <video>
+            page = await scan_shared(self.session, mobile_url, {'video': VIDEO_SRC}, timeout=15)
+            if page.get('video'):
+                return await self._download_video_from_url(page.get('video'))
         
         except Exception as e:
             logger.debug(f"TikTok mobile failed: {e}")
@@ -304,14 +302,10 @@ class VideoDownloader:
             
             for service_url in services:
                 try:
-                    async with self.session.get(service_url, timeout=15) as response:
-                        if response.status == 200:
-                            html = await response.text()
-                            
-                            # Ищем видео URL
-                            video_match = re.search(r'(https://[^"\s]+\.mp4[^"\s]*)', html)
-                            if video_match:
-                                return await self._download_video_from_url(video_match.group(1))
+                    # Ищем видео URL
+                    page = await scan_page(self.session, service_url, {'video': MP4_URL}, timeout=15)
+                    if page.get('video'):
+                        return await self._download_video_from_url(page.get('video'))
                 except:
                     continue
         
@@ -332,6 +326,10 @@ class VideoDownloader:
             
             async with self.session.get(video_url, headers=headers, timeout=30) as response:
                 if response.status == 200:
+                    # Не качаем видео, которое заведомо не пройдет по размеру
+                    if self.max_bytes and response.content_length and response.content_length > self.max_bytes:
+                        logger.warning(f"Skipping video over size limit: {response.content_length} bytes")
+                        return None
                     video_data = await response.read()
                     if len(video_data) > 1024:  # Проверяем что файл не пустой
                         return video_data
@@ -0,0 +1,232 @@
+import asyncio
+import math
+import os
+import shutil
+import struct
+import tempfile
+from typing import List, Optional
+
+from loguru import logger
+
+# Доля лимита, которую целимся занять при пережатии и нарезке (запас на контейнер)
+SIZE_TARGET_RATIO = 0.92
+AUDIO_BITRATE = 96_000
+MIN_VIDEO_BITRATE = 150_000
+MAX_SPLIT_ATTEMPTS = 3
+
+
+class VideoProcessingError(Exception):
+    """Ошибка при обработке видео через ffmpeg"""
+
+
+def needs_faststart(data: bytes) -> bool:
+    """Проверяет, стоит ли атом moov после mdat (тогда клиент не может начать воспроизведение до загрузки)"""
+    pos = 0
+    while pos + 8 <= len(data):
+        size, box_type = struct.unpack('>I4s', data[pos:pos + 8])
+        if box_type == b'moov':
+            return False
+        if box_type == b'mdat':
+            return True
+        if size == 1:
+            if pos + 16 > len(data):
+                break
+            size = struct.unpack('>Q', data[pos + 8:pos + 16])[0]
+        elif size == 0:
+            break
+        if size < 8:
+            break
+        pos += size
+    return False
+
+
+class VideoProcessor:
+    """Ограниченный пул процессов ffmpeg для постобработки видео.
+
+    Одновременно запускается не больше max_workers процессов, каждый с
+    ограничением потоков и пониженным приоритетом. Отмена задачи, ожидающей
+    результат, убивает соответствующий процесс ffmpeg.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 2,
+        threads: int = 2,
+        timeout: int = 300,
+        nice: int = 10,
+        temp_dir: Optional[str] = None,
+    ):
+        self.threads = threads
+        self.timeout = timeout
+        self.nice = nice
+        self.temp_dir = temp_dir
+        self._semaphore = asyncio.Semaphore(max_workers)
+
+    @property
+    def available(self) -> bool:
+        return shutil.which('ffmpeg') is not None and shutil.which('ffprobe') is not None
+
+    async def _run(self, *args: str) -> bytes:
+        """Запускает ffmpeg/ffprobe в пределах пула и возвращает stdout"""
+        command = list(args)
+        if self.nice and shutil.which('nice'):
+            command = ['nice', '-n', str(self.nice)] + command
+
+        async with self._semaphore:
+            process = await asyncio.create_subprocess_exec(
+                *command,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+            )
+            try:
+                stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=self.timeout)
+            except (asyncio.CancelledError, asyncio.TimeoutError):
+                # Пользователь ушел или ffmpeg завис - освобождаем CPU сразу
+                if process.returncode is None:
+                    process.kill()
+                    await process.wait()
+                raise
+
+        if process.returncode != 0:
+            message = stderr.decode('utf-8', errors='replace').strip().splitlines()
+            raise VideoProcessingError(message[-1] if message else f"{args[0]} exited with {process.returncode}")
+        return stdout
+
+    async def _probe_duration(self, path: str) -> Optional[float]:
+        output = await self._run(
+            'ffprobe', '-v', 'error', '-show_entries', 'format=duration', '-of', 'csv=p=0', path
+        )
+        try:
+            return float(output.decode().strip())
+        except ValueError:
+            return None
+
+    def _workdir(self) -> tempfile.TemporaryDirectory:
+        return tempfile.TemporaryDirectory(prefix='video_', dir=self.temp_dir)
+
+    @staticmethod
+    async def _write(path: str, data: bytes):
+        def write():
+            with open(path, 'wb') as f:
+                f.write(data)
+        await asyncio.to_thread(write)
+
+    @staticmethod
+    async def _read(path: str) -> bytes:
+        def read():
+            with open(path, 'rb') as f:
+                return f.read()
+        return await asyncio.to_thread(read)
+
+    async def faststart(self, data: bytes) -> bytes:
+        """Переносит moov в начало файла без перекодирования"""
+        with self._workdir() as workdir:
+            source = os.path.join(workdir, 'source.mp4')
+            target = os.path.join(workdir, 'faststart.mp4')
+            await self._write(source, data)
+
+            await self._run(
+                'ffmpeg', '-v', 'error', '-y', '-i', source,
+                '-map', '0', '-c', 'copy', '-movflags', '+faststart', target
+            )
+            return await self._read(target)
+
+    async def compress_to_fit(self, data: bytes, max_bytes: int) -> Optional[bytes]:
+        """Перекодирует видео с битрейтом, рассчитанным под лимит размера"""
+        with self._workdir() as workdir:
+            source = os.path.join(workdir, 'source.mp4')
+            target = os.path.join(workdir, 'compressed.mp4')
+            await self._write(source, data)
+
+            duration = await self._probe_duration(source)
+            if not duration:
+                return None
+
+            total_bitrate = max_bytes * 8 * SIZE_TARGET_RATIO / duration
+            video_bitrate = int(total_bitrate - AUDIO_BITRATE)
+            if video_bitrate < MIN_VIDEO_BITRATE:
+                logger.info(f"Video is too long to compress into {max_bytes} bytes ({duration:.0f}s)")
+                return None
+
+            await self._run(
+                'ffmpeg', '-v', 'error', '-y', '-i', source,
+                '-c:v', 'libx264', '-preset', 'veryfast',
+                '-b:v', str(video_bitrate), '-maxrate', str(video_bitrate), '-bufsize', str(video_bitrate * 2),
+                '-vf', "scale='min(1280,iw)':-2",
+                '-c:a', 'aac', '-b:a', str(AUDIO_BITRATE),
+                '-threads', str(self.threads),
+                '-movflags', '+faststart', target
+            )
+
+            result = await self._read(target)
+            if len(result) > max_bytes:
+                logger.info(f"Compressed video is still too large: {len(result)} bytes")
+                return None
+            return result
+
+    async def split(self, data: bytes, max_bytes: int) -> List[bytes]:
+        """Режет видео на части без перекодирования так, чтобы каждая влезала в лимит"""
+        with self._workdir() as workdir:
+            source = os.path.join(workdir, 'source.mp4')
+            await self._write(source, data)
+
+            duration = await self._probe_duration(source)
+            if not duration:
+                return []
+
+            parts_count = math.ceil(len(data) / (max_bytes * SIZE_TARGET_RATIO))
+            for attempt in range(MAX_SPLIT_ATTEMPTS):
+                pattern = os.path.join(workdir, f'part{attempt}_%03d.mp4')
+                await self._run(
+                    'ffmpeg', '-v', 'error', '-y', '-i', source,
+                    '-map', '0', '-c', 'copy', '-f', 'segment',
+                    '-segment_time', f'{duration / parts_count:.3f}',
+                    '-reset_timestamps', '1', '-segment_format_options', 'movflags=+faststart',
+                    pattern
+                )
+
+                names = sorted(name for name in os.listdir(workdir) if name.startswith(f'part{attempt}_'))
+                sizes = [os.path.getsize(os.path.join(workdir, name)) for name in names]
+                if names and max(sizes) <= max_bytes:
+                    return [await self._read(os.path.join(workdir, name)) for name in names]
+
+                # Ключевые кадры легли неудачно - режем мельче
+                parts_count = max(
+                    parts_count + 1,
+                    math.ceil(parts_count * max(sizes, default=max_bytes) / (max_bytes * SIZE_TARGET_RATIO)),
+                )
+
+            return []
+
+    async def fit_video(self, data: bytes, max_bytes: int) -> List[bytes]:
+        """Готовит видео к отправке: faststart, при превышении лимита - пережатие или нарезка.
+
+        Возвращает список частей для отправки; пустой список, если уложиться в лимит не удалось.
+        """
+        if not self.available:
+            return [data] if len(data) <= max_bytes else []
+
+        try:
+            if len(data) <= max_bytes:
+                if needs_faststart(data):
+                    data = await self.faststart(data)
+                return [data]
+
+            compressed = await self.compress_to_fit(data, max_bytes)
+            if compressed:
+                logger.info(f"Video compressed: {len(data)} -> {len(compressed)} bytes")
+                return [compressed]
+
+            parts = await self.split(data, max_bytes)
+            if parts:
+                logger.info(f"Video split into {len(parts)} parts")
+            return parts
+
+        except VideoProcessingError as e:
+            logger.warning(f"ffmpeg failed: {e}")
+            return [data] if len(data) <= max_bytes else []
+
+        except asyncio.TimeoutError:
+            # ffmpeg уже остановлен; скачанное видео не теряем, если оно влезает как есть
+            logger.warning(f"ffmpeg timed out after {self.timeout}s on {len(data)} bytes")
+            return [data] if len(data) <= max_bytes else []
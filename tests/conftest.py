@@ -0,0 +1,14 @@
+import os
+import sys
+import tempfile
+
+# Модули бота импортируются так же, как при запуске из src
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+# Настройки бота читаются из окружения при импорте; базы и кэш тестов - во временном каталоге
+_data_dir = tempfile.mkdtemp(prefix='bot-tests-')
+os.environ.setdefault('TELEGRAM_BOT_TOKEN', '1:test')
+os.environ.setdefault('JOB_DB_PATH', os.path.join(_data_dir, 'jobs.sqlite3'))
+os.environ.setdefault('FILE_ID_DB_PATH', os.path.join(_data_dir, 'file_ids.sqlite3'))
+os.environ.setdefault('CACHE_DIR', os.path.join(_data_dir, 'cache'))
+os.environ.setdefault('LOCAL_API_FILES_DIR', os.path.join(_data_dir, 'outbox'))
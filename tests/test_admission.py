@@ -0,0 +1,49 @@
+import asyncio
+import time
+
+import pytest
+from src.services.admission import IN_FLIGHT, LOOP_LAG, MEMORY, AdmissionController, LoopLagMonitor
+
+
+class TestAdmissionController:
+    """Тесты контроля нагрузки"""
+
+    @pytest.mark.asyncio
+    async def test_sheds_when_too_many_jobs(self):
+        """Тест отказа при большом числе заданий"""
+        jobs = [0]
+        admission = AdmissionController(lambda: jobs[0], max_in_flight=2)
+
+        assert admission.check() is None
+        jobs[0] = 2
+        assert admission.check() == IN_FLIGHT
+        assert not admission.ready
+        await admission.lag_monitor.stop()
+
+    @pytest.mark.asyncio
+    async def test_sheds_when_memory_is_held(self):
+        """Тест отказа при большом объеме медиа в памяти"""
+        admission = AdmissionController(lambda: 0, max_bytes=100)
+
+        admission.hold_bytes(150)
+        assert admission.check() == MEMORY
+        admission.release_bytes(150)
+        assert admission.check() is None
+        assert admission.stats()['held_mb'] == 0
+        await admission.lag_monitor.stop()
+
+    @pytest.mark.asyncio
+    async def test_sheds_when_loop_is_blocked(self):
+        """Тест отказа при задержке цикла событий"""
+        monitor = LoopLagMonitor(interval=0.01)
+        admission = AdmissionController(lambda: 0, max_loop_lag=0.05, lag_monitor=monitor)
+        assert admission.check() is None
+
+        await asyncio.sleep(0.02)
+        # Блокирующий вызов в цикле событий
+        time.sleep(0.15)
+        await asyncio.sleep(0.02)
+
+        assert monitor.lag >= 0.05
+        assert admission.check() == LOOP_LAG
+        await monitor.stop()
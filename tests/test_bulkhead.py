@@ -0,0 +1,121 @@
+import asyncio
+import threading
+
+import pytest
+from src.services.bulkhead import Bulkheads, KeyedSemaphore, parse_limits
+from src.services.instagram_api import InstagramAPIDownloader
+from src.services.media_downloader import MediaDownloader
+from src.services.video_downloader import VideoDownloader
+
+
+class TestBulkheads:
+    """Тесты изоляции ресурсов платформ"""
+
+    def test_parse_limits(self):
+        """Тест разбора лимитов по платформам"""
+        assert parse_limits("TikTok=2, instagram=3,,bad=x") == {'tiktok': 2, 'instagram': 3}
+        assert parse_limits(None) == {}
+
+    @pytest.mark.asyncio
+    async def test_slow_platform_does_not_block_others(self):
+        """Тест: занятая платформа не задерживает загрузки других платформ"""
+        bulkheads = Bulkheads(max_concurrent=2, limits={'tiktok': 1})
+        tiktok = bulkheads.get('tiktok')
+        gate = asyncio.Event()
+
+        async def hold():
+            async with tiktok.slot():
+                await gate.wait()
+
+        holder = asyncio.create_task(hold())
+        waiter = asyncio.create_task(hold())
+        await asyncio.sleep(0.01)
+        assert bulkheads.stats()['tiktok'] == {'active': 1, 'waiting': 1}
+
+        async with bulkheads.get('pinterest').slot() as pinterest:
+            assert pinterest.stats() == {'active': 1, 'waiting': 0}
+            assert pinterest.connector() is not tiktok.connector()
+            assert pinterest.executor is not tiktok.executor
+
+        gate.set()
+        await asyncio.gather(holder, waiter)
+        assert tiktok.stats() == {'active': 0, 'waiting': 0}
+        await bulkheads.close()
+
+    @pytest.mark.asyncio
+    async def test_executor_slots(self):
+        """Тест выполнения извлечения в потоках платформы"""
+        bulkheads = Bulkheads(executor_workers=1)
+        bulkhead = bulkheads.get('instagram')
+        loop = asyncio.get_running_loop()
+        assert await loop.run_in_executor(bulkhead.executor, lambda: 42) == 42
+        assert bulkhead.connector().limit == 20
+        await bulkheads.close()
+
+    @pytest.mark.asyncio
+    async def test_helper_downloaders_use_platform_pool(self):
+        """Тест того, что вспомогательные загрузчики работают через пул платформы"""
+        bulkheads = Bulkheads(max_connections=5)
+        connector = bulkheads.get('tiktok').connector()
+
+        async with VideoDownloader(connector=connector) as downloader:
+            assert downloader.session.connector is connector
+        async with InstagramAPIDownloader(connector=connector) as api:
+            assert api.session.connector is connector
+        # Пул принадлежит платформе и переживает сессии загрузчиков
+        assert not connector.closed
+        await bulkheads.close()
+
+    @pytest.mark.asyncio
+    async def test_media_downloader_uses_platform_executor(self, monkeypatch):
+        """Тест извлечения yt-dlp в потоках платформы, а не в общем пуле цикла событий"""
+        bulkheads = Bulkheads(executor_workers=1)
+        threads = []
+
+        class FakeYoutubeDL:
+            def __init__(self, opts):
+                pass
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                return False
+
+            def extract_info(self, url, download=False):
+                threads.append(threading.current_thread().name)
+                return None
+
+        monkeypatch.setattr('src.services.media_downloader.yt_dlp.YoutubeDL', FakeYoutubeDL)
+        async with MediaDownloader(bulkheads=bulkheads) as downloader:
+            assert await downloader.download_media("https://www.tiktok.com/@user/video/1") == (None, 'video')
+        assert threads and threads[0].startswith('tiktok-extract')
+        await bulkheads.close()
+
+
+class TestKeyedSemaphore:
+    """Тесты лимита одновременных операций на ключ"""
+
+    @pytest.mark.asyncio
+    async def test_limit_per_key(self):
+        """Тест: лимит действует на ключ, а не на все операции"""
+        semaphore = KeyedSemaphore(2)
+        gate = asyncio.Event()
+        active = {1: 0, 2: 0}
+        peak = {1: 0, 2: 0}
+
+        async def hold(key):
+            async with semaphore.slot(key):
+                active[key] += 1
+                peak[key] = max(peak[key], active[key])
+                await gate.wait()
+                active[key] -= 1
+
+        tasks = [asyncio.create_task(hold(1)) for _ in range(4)] + [asyncio.create_task(hold(2))]
+        await asyncio.sleep(0.01)
+        assert active == {1: 2, 2: 1}
+        gate.set()
+        await asyncio.gather(*tasks)
+        assert peak == {1: 2, 2: 1}
+        # Свободные ключи не копятся
+        assert len(semaphore) == 0
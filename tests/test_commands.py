@@ -0,0 +1,58 @@
+import datetime
+
+import pytest
+from aiogram import Bot, Dispatcher
+from aiogram.methods import SendMessage
+from aiogram.types import Chat, Message, Update, User
+
+from bot.handlers import commands, media
+
+
+@pytest.fixture(scope='module')
+def dispatcher():
+    # Роутеры подключаются в том же порядке, что и в боте
+    dp = Dispatcher()
+    dp.include_router(commands.router)
+    dp.include_router(media.router)
+    return dp
+
+
+def make_update(update_id, text, chat_type='private'):
+    return Update(update_id=update_id, message=Message(
+        message_id=update_id,
+        date=datetime.datetime.now(),
+        chat=Chat(id=-100 if chat_type != 'private' else 42, type=chat_type),
+        from_user=User(id=42, is_bot=False, first_name='Test'),
+        text=text,
+    ))
+
+
+class TestCommandRouting:
+    """Тесты маршрутизации команд"""
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize('chat_type', ['private', 'supergroup'])
+    async def test_cancel_reaches_handler(self, dispatcher, chat_type):
+        """Тест того, что /cancel не перехватывает обработчик ссылок"""
+        bot = Bot('1:test')
+        result = await dispatcher.feed_update(bot, make_update(1, '/cancel', chat_type))
+        assert isinstance(result, SendMessage)
+        assert result.text == "🤷 Нет загрузок, которые можно отменить."
+        await bot.session.close()
+
+    @pytest.mark.asyncio
+    async def test_cancel_cancels_jobs(self, dispatcher, monkeypatch):
+        """Тест отмены сохраненных заданий командой"""
+        edited = []
+
+        async def mark_cancelled(bot, jobs, text):
+            edited.extend(job.key for job in jobs)
+
+        monkeypatch.setattr(commands, 'mark_cancelled', mark_cancelled)
+        media.job_store.add('update:cancel-test', 42, 42, {})
+        bot = Bot('1:test')
+        result = await dispatcher.feed_update(bot, make_update(2, '/cancel'))
+        assert result.text == "⛔ Отменено загрузок: 1"
+        assert edited == ['update:cancel-test']
+        assert media.job_store.outstanding_for(42) == 0
+        await bot.session.close()
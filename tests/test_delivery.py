@@ -0,0 +1,73 @@
+from src.services.delivery import (
+    CAPTION_LIMIT, MESSAGE_LIMIT, PART_PREFIX, plan_delivery, text_length, truncate,
+)
+
+SIGNATURE = "Рад был помочь! Ваш, @bot"
+
+
+class TestDeliveryPlan:
+    """Тесты плана отправки результата"""
+
+    def test_without_post_text(self):
+        """Тест: без текста поста сообщение о загрузке удаляется"""
+        plan = plan_delivery(None, SIGNATURE)
+        assert plan.first_caption == SIGNATURE
+        assert plan.status_text is None
+
+    def test_post_text_merged_into_caption(self):
+        """Тест объединения текста поста с подписью"""
+        plan = plan_delivery("Hello <world>", SIGNATURE)
+        assert plan.first_caption == f"Hello &lt;world&gt;\n\n{SIGNATURE}"
+        assert plan.caption == SIGNATURE
+        assert plan.status_text is None
+
+    def test_long_post_text_replaces_loading_message(self):
+        """Тест: длинный текст поста заменяет сообщение о загрузке"""
+        plan = plan_delivery("x" * CAPTION_LIMIT, SIGNATURE)
+        assert plan.first_caption == SIGNATURE
+        assert plan.status_text.endswith("x")
+
+        plan = plan_delivery("x" * (MESSAGE_LIMIT * 2), SIGNATURE)
+        assert plan.status_text.endswith("…")
+        assert len(plan.status_text) < MESSAGE_LIMIT + 20
+
+    def test_emoji_counted_in_utf16_units(self):
+        """Тест: эмодзи занимают в лимите Telegram две кодовые единицы"""
+        post_text = "😀" * 500
+        assert len(post_text) + 2 + len(SIGNATURE) <= CAPTION_LIMIT
+        plan = plan_delivery(post_text, SIGNATURE)
+        assert plan.first_caption == SIGNATURE
+        assert plan.status_text.endswith(post_text)
+
+    def test_long_emoji_text_truncated_without_broken_pairs(self):
+        """Тест обрезки текста с эмодзи по лимиту сообщения"""
+        plan = plan_delivery("😀" * MESSAGE_LIMIT, SIGNATURE)
+        assert plan.status_text.endswith("😀…")
+        visible = plan.status_text.replace("<b>", "").replace("</b>", "")
+        assert text_length(visible) <= MESSAGE_LIMIT
+
+    def test_caption_fits_split_video_part(self):
+        """Тест: подпись с текстом поста помещается в подпись части видео"""
+        post_text = "x" * (CAPTION_LIMIT - 2 - len(SIGNATURE) - 12)
+        plan = plan_delivery(post_text, SIGNATURE)
+        assert plan.status_text is None
+        part_caption = PART_PREFIX.format(number=10, total=12) + plan.first_caption
+        assert text_length(part_caption) <= CAPTION_LIMIT
+
+        plan = plan_delivery(post_text + "x", SIGNATURE)
+        assert plan.status_text is not None
+
+
+class TestTextLength:
+    """Тесты подсчета длины в кодовых единицах UTF-16"""
+
+    def test_text_length(self):
+        """Тест длины кириллицы и эмодзи"""
+        assert text_length("abc") == 3
+        assert text_length("Привет") == 6
+        assert text_length("😀") == 2
+
+    def test_truncate_keeps_surrogate_pairs(self):
+        """Тест обрезки без разрыва суррогатной пары"""
+        assert truncate("a😀b", 2) == "a"
+        assert truncate("a😀b", 3) == "a😀"
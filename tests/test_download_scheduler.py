@@ -0,0 +1,208 @@
+import asyncio
+
+import pytest
+from src.services.download_scheduler import ADMIN, FREE, SUPPORTER, DownloadScheduler, QueueFullError
+
+
+def make_job(log, name, gate=None):
+    async def run():
+        log.append(('start', name))
+        if gate is not None:
+            await gate.wait()
+        else:
+            await asyncio.sleep(0)
+        log.append(('end', name))
+        return name
+    return run
+
+
+class TestDownloadScheduler:
+    """Тесты очереди загрузок"""
+
+    @pytest.mark.asyncio
+    async def test_users_served_round_robin(self):
+        """Тест справедливого чередования пользователей"""
+        scheduler = DownloadScheduler(workers=1, max_queued_per_user=5)
+        log = []
+        gate = asyncio.Event()
+
+        # Первое задание держит единственный воркер, пока все не встанут в очередь
+        jobs = [scheduler.submit(1, 100, make_job(log, 'a0', gate))]
+        jobs += [scheduler.submit(1, 100, make_job(log, f'a{i}')) for i in range(1, 4)]
+        jobs += [scheduler.submit(2, 200, make_job(log, f'b{i}')) for i in range(2)]
+        gate.set()
+
+        await asyncio.gather(*(job.future for job in jobs))
+        order = [name for event, name in log if event == 'start']
+        assert order == ['a0', 'b0', 'a1', 'b1', 'a2', 'a3']
+        await scheduler.stop()
+
+    @pytest.mark.asyncio
+    async def test_chat_jobs_never_overlap(self):
+        """Тест порядка заданий в одном чате при свободных воркерах"""
+        scheduler = DownloadScheduler(workers=4)
+        log = []
+        gate = asyncio.Event()
+
+        first = scheduler.submit(1, 100, make_job(log, 'first', gate))
+        second = scheduler.submit(2, 100, make_job(log, 'second'))
+        await asyncio.sleep(0.01)
+        assert log == [('start', 'first')]
+
+        gate.set()
+        assert await second.future == 'second'
+        assert log == [('start', 'first'), ('end', 'first'), ('start', 'second'), ('end', 'second')]
+        assert first.future.result() == 'first'
+        await scheduler.stop()
+
+    @pytest.mark.asyncio
+    async def test_global_worker_limit(self):
+        """Тест ограничения числа одновременно выполняемых заданий"""
+        scheduler = DownloadScheduler(workers=2)
+        gate = asyncio.Event()
+        log = []
+
+        jobs = [scheduler.submit(user_id, user_id, make_job(log, user_id, gate)) for user_id in range(5)]
+        await asyncio.sleep(0.01)
+        assert scheduler.running == 2
+        assert scheduler.queued == 3
+
+        gate.set()
+        await asyncio.gather(*(job.future for job in jobs))
+        assert scheduler.running == 0
+        await scheduler.stop()
+
+    @pytest.mark.asyncio
+    async def test_per_user_limit_and_failures(self):
+        """Тест лимита очереди пользователя и изоляции ошибок"""
+        scheduler = DownloadScheduler(workers=1, max_queued_per_user=2)
+
+        async def fail():
+            raise RuntimeError("boom")
+
+        failed = scheduler.submit(1, 100, fail)
+        ok = scheduler.submit(1, 100, make_job([], 'ok'))
+        with pytest.raises(QueueFullError):
+            scheduler.submit(1, 100, make_job([], 'extra'))
+
+        with pytest.raises(RuntimeError):
+            await failed.future
+        assert await ok.future == 'ok'
+        assert scheduler.outstanding_for(1) == 0
+        await scheduler.stop()
+
+    @pytest.mark.asyncio
+    async def test_idle_state_cleanup(self):
+        """Тест удаления состояния простаивающих пользователей"""
+        scheduler = DownloadScheduler(workers=1, idle_ttl=10)
+        job = scheduler.submit(1, 100, make_job([], 'job'))
+        await job.future
+
+        assert scheduler.cleanup() == 0
+        assert scheduler.cleanup(now=job.created_at + 3600) == 1
+        assert scheduler.outstanding_for(1) == 0
+        await scheduler.stop()
+
+    @pytest.mark.asyncio
+    async def test_priority_lanes_weighted(self):
+        """Тест обслуживания классов приоритета пропорционально весам"""
+        scheduler = DownloadScheduler(workers=1, max_queued_per_user=10)
+        log = []
+        gate = asyncio.Event()
+
+        jobs = [scheduler.submit(1, 100, make_job(log, 'hold', gate))]
+        await asyncio.sleep(0.01)
+        jobs += [scheduler.submit(1, 101 + i, make_job(log, f'f{i}')) for i in range(3)]
+        jobs += [scheduler.submit(2, 200 + i, make_job(log, f's{i}'), priority=SUPPORTER) for i in range(5)]
+        gate.set()
+
+        await asyncio.gather(*(job.future for job in jobs))
+        order = [name for event, name in log if event == 'start']
+        # Поддержавший получает 4 воркера на каждый воркер бесплатного класса
+        assert order == ['hold', 's0', 's1', 's2', 's3', 's4', 'f0', 'f1', 'f2']
+        await scheduler.stop()
+
+    @pytest.mark.asyncio
+    async def test_free_lane_share_keeps_slot_for_priority(self):
+        """Тест доли воркеров: бесплатный класс не занимает все воркеры"""
+        scheduler = DownloadScheduler(workers=4, max_queued_per_user=10)
+        gate = asyncio.Event()
+        log = []
+
+        jobs = [scheduler.submit(user_id, user_id, make_job(log, user_id, gate)) for user_id in range(5)]
+        await asyncio.sleep(0.01)
+        assert scheduler.running == 3
+        assert scheduler.lane_stats()[FREE]['queued'] == 2
+
+        admin_job = scheduler.submit(99, 99, make_job(log, 'admin'), priority=ADMIN)
+        assert await admin_job.future == 'admin'
+
+        gate.set()
+        await asyncio.gather(*(job.future for job in jobs))
+        await scheduler.stop()
+
+    @pytest.mark.asyncio
+    async def test_starving_job_served_first(self):
+        """Тест защиты от голодания: давно ждущее задание идет вне очереди"""
+        scheduler = DownloadScheduler(workers=1, max_queued_per_user=10, max_wait=60)
+        log = []
+        gate = asyncio.Event()
+
+        jobs = [scheduler.submit(1, 100, make_job(log, 'hold', gate))]
+        await asyncio.sleep(0.01)
+        jobs.append(scheduler.submit(1, 101, make_job(log, 'free')))
+        jobs += [scheduler.submit(2, 200 + i, make_job(log, f'a{i}'), priority=ADMIN) for i in range(3)]
+        # Бесплатное задание ждет дольше max_wait
+        jobs[1].created_at -= 120
+        gate.set()
+
+        await asyncio.gather(*(job.future for job in jobs))
+        order = [name for event, name in log if event == 'start']
+        assert order == ['hold', 'free', 'a0', 'a1', 'a2']
+        await scheduler.stop()
+
+    @pytest.mark.asyncio
+    async def test_cheap_jobs_first_with_aging(self):
+        """Тест порядка по ожидаемой стоимости и старения больших заданий"""
+        scheduler = DownloadScheduler(workers=1, max_queued_per_user=10, aging_interval=2)
+        log = []
+        gate = asyncio.Event()
+
+        jobs = [scheduler.submit(1, 100, make_job(log, 'hold', gate))]
+        await asyncio.sleep(0.01)
+        jobs.append(scheduler.submit(1, 101, make_job(log, 'video'), cost=45))
+        jobs.append(scheduler.submit(2, 200, make_job(log, 'image'), cost=1))
+        jobs.append(scheduler.submit(3, 300, make_job(log, 'old_video'), cost=45))
+        # Видео ждет уже 100 секунд и стало «дешевле» картинки
+        jobs[-1].created_at -= 100
+        gate.set()
+
+        await asyncio.gather(*(job.future for job in jobs))
+        order = [name for event, name in log if event == 'start']
+        assert order == ['hold', 'old_video', 'image', 'video']
+        await scheduler.stop()
+
+    @pytest.mark.asyncio
+    async def test_cancel_queued_and_running(self):
+        """Тест отмены ожидающего и выполняющегося заданий"""
+        scheduler = DownloadScheduler(workers=1, max_queued_per_user=5)
+        log = []
+        gate = asyncio.Event()
+
+        running = scheduler.submit(1, 100, make_job(log, 'running', gate))
+        queued = scheduler.submit(1, 100, make_job(log, 'queued'))
+        after = scheduler.submit(1, 100, make_job(log, 'after'))
+        await asyncio.sleep(0.01)
+
+        assert scheduler.cancel(queued)
+        assert queued.future.cancelled()
+        assert scheduler.outstanding_for(1) == 2
+
+        # Отмена освобождает воркер и чат, не дожидаясь gate
+        assert scheduler.cancel(running)
+        assert await after.future == 'after'
+        assert running.future.cancelled()
+        assert log == [('start', 'running'), ('start', 'after'), ('end', 'after')]
+        assert scheduler.outstanding_for(1) == 0
+        assert not scheduler.cancel(after)
+        await scheduler.stop()
@@ -0,0 +1,108 @@
+import re
+
+import pytest
+from src.services.fetch_context import FetchContext
+from src.services.page_scanner import MP4_URL, OG_DESCRIPTION, OG_IMAGE
+
+
+class FakeContent:
+    def __init__(self, chunks):
+        self.chunks = list(chunks)
+        self.reads = 0
+
+    async def read(self, size):
+        if not self.chunks:
+            return b''
+        self.reads += 1
+        return self.chunks.pop(0)
+
+
+class FakeResponse:
+    def __init__(self, chunks):
+        self.status = 200
+        self.content = FakeContent(chunks)
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class FakeSession:
+    """Сессия, считающая количество реальных запросов"""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.requests = 0
+        self.responses = []
+
+    async def get(self, url, headers=None, timeout=None):
+        self.requests += 1
+        response = FakeResponse(self.chunks)
+        self.responses.append(response)
+        return response
+
+
+class TestFetchContext:
+    """Тесты кэша страниц в рамках одного запроса"""
+
+    @pytest.mark.asyncio
+    async def test_page_fetched_once_for_several_scans(self):
+        """Тест повторного использования одной загрузки страницы"""
+        session = FakeSession([
+            b'<meta property="og:description" content="Text">',
+            b'<p>body</p>',
+            b'<meta property="og:image" content="https://i.example.com/a.jpg">',
+            b'<p>tail</p>',
+        ])
+        context = FetchContext(session)
+
+        text = await context.scan("https://example.com/p", {'description': OG_DESCRIPTION})
+        image = await context.scan("https://example.com/p", {'image': OG_IMAGE})
+        text_again = await context.scan("https://example.com/p", {'description': OG_DESCRIPTION})
+
+        assert text.get('description') == "Text"
+        assert image.get('image') == "https://i.example.com/a.jpg"
+        assert text_again.get('description') == "Text"
+        assert session.requests == 1
+        # Хвост страницы так и не понадобился
+        assert session.responses[0].content.reads == 3
+
+        context.close()
+        assert session.responses[0].closed
+
+    @pytest.mark.asyncio
+    async def test_match_ending_at_chunk_end_waits_for_next_chunk(self):
+        """Тест того, что общая страница не отдает значение, обрезанное концом чанка"""
+        session = FakeSession([
+            b'<a href="https://cdn.example.com/video.mp4?token=abc',
+            b'def">',
+            b'<meta property="og:description" content="Hello wo',
+            b'rld">',
+            b'https://cdn.example.com/last.mp4',
+        ])
+        context = FetchContext(session)
+
+        video = await context.scan("https://example.com/p", {'video': MP4_URL})
+        text = await context.scan("https://example.com/p", {'description': OG_DESCRIPTION})
+        last = await context.scan("https://example.com/p", {'last': re.compile(rb'https://[^"\s>]+last\.mp4')})
+
+        assert video.get('video') == "https://cdn.example.com/video.mp4?token=abcdef"
+        assert text.get('description') == "Hello world"
+        # Совпадение в самом конце страницы принимается, когда тело дочитано
+        assert last.get('last') == "https://cdn.example.com/last.mp4"
+        assert last.complete
+        context.close()
+
+    @pytest.mark.asyncio
+    async def test_once_runs_factory_once(self):
+        """Тест мемоизации произвольного результата"""
+        context = FetchContext(FakeSession([]))
+        calls = []
+
+        async def factory():
+            calls.append(1)
+            return ['item']
+
+        assert await context.once("cobalt:url", factory) == ['item']
+        assert await context.once("cobalt:url", factory) == ['item']
+        assert len(calls) == 1
@@ -0,0 +1,56 @@
+import pytest
+from src.services.file_id_index import PHOTO, VIDEO, CachedMedia, FileIdIndex, media_key
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = FileIdIndex(str(tmp_path / 'file_ids.sqlite3'))
+    yield index
+    index.close()
+
+
+class TestMediaKey:
+    """Тесты канонического ключа медиа"""
+
+    def test_same_media_same_key(self):
+        """Тест одинакового ключа для разных ссылок на одно медиа"""
+        assert media_key('https://www.tiktok.com/@user/video/123?lang=en') == 'tiktok:video:123'
+        assert media_key('https://tiktok.com/@other/video/123/') == 'tiktok:video:123'
+        assert media_key('https://www.instagram.com/p/AbC_1/?igsh=x') == 'instagram:AbC_1'
+        assert media_key('https://instagram.com/reel/AbC_1/') == 'instagram:AbC_1'
+        assert media_key('https://pinterest.com/pin/some-title--987/') == 'pinterest:pin:987'
+        assert media_key('https://www.pinterest.com/pin/987/') == 'pinterest:pin:987'
+
+    def test_short_link_falls_back_to_url(self):
+        """Тест ключа для коротких ссылок"""
+        assert media_key('https://pin.it/AbCd?x=1') == media_key('https://www.pin.it/AbCd/') == 'url:pin.it/AbCd'
+
+
+class TestFileIdIndex:
+    """Тесты индекса file_id"""
+
+    def test_put_and_get_in_order(self, index):
+        """Тест сохранения медиа публикации по порядку"""
+        assert index.get('k') == []
+        index.put('k', [CachedMedia(VIDEO, 'v1'), CachedMedia(PHOTO, 'p2')])
+        assert index.get('k') == [CachedMedia(VIDEO, 'v1'), CachedMedia(PHOTO, 'p2')]
+
+        index.put('k', [CachedMedia(PHOTO, 'p3')])
+        assert index.get('k') == [CachedMedia(PHOTO, 'p3')]
+        assert len(index) == 1
+
+    def test_shared_between_processes(self, tmp_path):
+        """Тест видимости записи в другом соединении сразу после put"""
+        path = str(tmp_path / 'file_ids.sqlite3')
+        writer, reader = FileIdIndex(path), FileIdIndex(path)
+        writer.put('k', [CachedMedia(VIDEO, 'v1')])
+        assert reader.get('k') == [CachedMedia(VIDEO, 'v1')]
+        writer.close()
+        reader.close()
+
+    def test_expired_entries_are_hidden(self, index):
+        """Тест устаревания записей"""
+        index.put('k', [CachedMedia(VIDEO, 'v1')])
+        index.max_age = -1
+        assert index.get('k') == []
+        assert index.purge() == 1
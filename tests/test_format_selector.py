@@ -0,0 +1,83 @@
+import pytest
+
+from src.services.enhanced_downloader import EnhancedMediaDownloader
+from src.services.format_selector import FileTooLargeError, estimate_format_size, rank_formats
+
+MB = 1024 * 1024
+
+
+class TestFormatSelector:
+    """Тесты выбора формата под лимит размера"""
+
+    def test_estimate_prefers_exact_filesize(self):
+        """Тест приоритета точного размера над оценкой"""
+        fmt = {'filesize': 10 * MB, 'filesize_approx': 20 * MB, 'tbr': 5000}
+
+        assert estimate_format_size(fmt, duration=60) == 10 * MB
+
+    def test_estimate_from_bitrate_and_duration(self):
+        """Тест оценки размера по битрейту"""
+        fmt = {'tbr': 800}
+
+        size = estimate_format_size(fmt, duration=100)
+
+        assert 10_000_000 <= size <= 11_000_000
+        assert estimate_format_size({'tbr': 800}) is None
+
+    def test_select_best_fitting_format(self):
+        """Тест выбора лучшего формата, который помещается в лимит"""
+        formats = [
+            {'url': 'u1080', 'height': 1080, 'vcodec': 'h264', 'acodec': 'aac', 'filesize': 80 * MB},
+            {'url': 'u720', 'height': 720, 'vcodec': 'h264', 'acodec': 'aac', 'filesize': 40 * MB},
+            {'url': 'u480', 'height': 480, 'vcodec': 'h264', 'acodec': 'aac', 'filesize': 20 * MB},
+            {'url': 'audio', 'vcodec': 'none', 'acodec': 'aac', 'filesize': 1 * MB},
+        ]
+
+        assert rank_formats(formats, 50 * MB)[0]['url'] == 'u720'
+        assert rank_formats(formats, 10 * MB) == []
+        assert rank_formats(formats, None)[0]['url'] == 'u1080'
+
+    def test_unknown_sizes_come_after_known_fitting(self):
+        """Тест порядка: сначала гарантированно подходящие, затем неизвестного размера"""
+        formats = [
+            {'url': 'unknown', 'height': 1080, 'vcodec': 'h264', 'acodec': 'aac'},
+            {'url': 'small', 'height': 540, 'vcodec': 'h264', 'acodec': 'aac', 'tbr': 1000},
+        ]
+
+        ranked = rank_formats(formats, 50 * MB, duration=30)
+
+        assert [fmt['url'] for fmt in ranked] == ['small', 'unknown']
+
+    def test_oversized_formats_within_hard_limit(self):
+        """Тест запасных форматов сверх лимита для последующего пережатия"""
+        formats = [
+            {'url': 'huge', 'height': 1080, 'vcodec': 'h264', 'acodec': 'aac', 'filesize': 300 * MB},
+            {'url': 'big', 'height': 720, 'vcodec': 'h264', 'acodec': 'aac', 'filesize': 120 * MB},
+            {'url': 'medium', 'height': 540, 'vcodec': 'h264', 'acodec': 'aac', 'filesize': 70 * MB},
+        ]
+
+        ranked = rank_formats(formats, 50 * MB, hard_max_bytes=200 * MB)
+
+        assert [fmt['url'] for fmt in ranked] == ['medium', 'big']
+        assert rank_formats(formats, 50 * MB) == []
+
+
+class TestRankedYtdlpUrls:
+    """Тесты выбора URL yt-dlp загрузчиком"""
+
+    def test_oversized_video_raises_instead_of_thumbnail(self):
+        """Тест: видео сверх лимита - ошибка размера, а не превью"""
+        downloader = EnhancedMediaDownloader(max_file_size_mb=50)
+        info = {
+            'thumbnail': 'thumb.jpg',
+            'formats': [{'url': 'huge', 'vcodec': 'h264', 'acodec': 'aac', 'filesize': 300 * MB}],
+        }
+
+        with pytest.raises(FileTooLargeError) as error:
+            downloader._ranked_ytdlp_urls(info)
+        assert error.value.size == 300 * MB
+
+    def test_image_pin_uses_direct_url(self):
+        """Тест: у картинки без форматов берется ее URL"""
+        downloader = EnhancedMediaDownloader(max_file_size_mb=50)
+        assert downloader._ranked_ytdlp_urls({'url': 'image.jpg'}) == ['image.jpg']
@@ -0,0 +1,31 @@
+import json
+
+import pytest
+from fastapi.responses import JSONResponse
+
+import railway
+import railway_modern
+
+
+@pytest.mark.parametrize('module, admission', [
+    (railway, railway.admission),
+    (railway_modern, railway_modern.modern_bot.admission),
+])
+class TestHealth:
+    """Тесты проверки готовности webhook-серверов"""
+
+    @pytest.mark.asyncio
+    async def test_ready(self, module, admission):
+        """Тест ответа 200, пока процесс не перегружен"""
+        content = await module.health()
+        assert content['ready'] is True
+        assert content['bot'] == 'ready'
+
+    @pytest.mark.asyncio
+    async def test_busy_when_overloaded(self, module, admission, monkeypatch):
+        """Тест ответа 503 при перегрузке"""
+        monkeypatch.setattr(admission, 'held_bytes', admission.max_bytes)
+        response = await module.health()
+        assert isinstance(response, JSONResponse)
+        assert response.status_code == 503
+        assert json.loads(response.body)['bot'] == 'busy'
@@ -0,0 +1,62 @@
+import io
+import struct
+import pytest
+from src.services.image_processor import (
+    ImageProcessor, needs_photo_transcode, sniff_image_size, _transcode_photo
+)
+
+
+def png_header(width, height):
+    return b'\x89PNG\r\n\x1a\n' + b'\x00\x00\x00\x0dIHDR' + struct.pack('>II', width, height) + b'\x08\x02\x00\x00\x00'
+
+
+def jpeg_header(width, height):
+    app0 = b'\xff\xe0' + struct.pack('>H', 16) + b'JFIF\x00' + b'\x00' * 9
+    sof0 = b'\xff\xc0' + struct.pack('>HBHH', 17, 8, height, width) + b'\x03' + b'\x00' * 9
+    return b'\xff\xd8' + app0 + sof0
+
+
+class TestImageProcessor:
+    """Тесты подготовки фото к отправке"""
+
+    def test_sniff_png(self):
+        """Тест чтения размеров PNG из заголовка"""
+        assert sniff_image_size(png_header(640, 480)) == ('png', 640, 480)
+
+    def test_sniff_jpeg(self):
+        """Тест чтения размеров JPEG из маркера SOF"""
+        assert sniff_image_size(jpeg_header(4000, 3000)) == ('jpeg', 4000, 3000)
+
+    def test_sniff_webp_vp8x(self):
+        """Тест чтения размеров WebP (VP8X)"""
+        data = b'RIFF' + b'\x00' * 4 + b'WEBPVP8X' + b'\x00' * 8 + (799).to_bytes(3, 'little') + (599).to_bytes(3, 'little')
+
+        assert sniff_image_size(data) == ('webp', 800, 600)
+
+    def test_sniff_unknown(self):
+        """Тест нераспознанных данных"""
+        assert sniff_image_size(b'not an image at all') is None
+
+    def test_needs_transcode(self):
+        """Тест решения о пережатии"""
+        assert not needs_photo_transcode(jpeg_header(1280, 720))
+        assert needs_photo_transcode(jpeg_header(6000, 4000))
+        assert needs_photo_transcode(jpeg_header(1280, 720), max_bytes=10)
+        assert needs_photo_transcode(b'RIFF' + b'\x00' * 4 + b'WEBPVP8 ' + b'\x00' * 20)
+
+    def test_transcode_bounds_size(self):
+        """Тест пережатия большого PNG в JPEG"""
+        Image = pytest.importorskip("PIL.Image")
+        buffer = io.BytesIO()
+        Image.new('RGBA', (3000, 1000), (255, 0, 0, 128)).save(buffer, 'PNG')
+
+        result = _transcode_photo(buffer.getvalue(), max_side=1280, max_bytes=1024 * 1024)
+
+        assert sniff_image_size(result) == ('jpeg', 1280, 427)
+
+    @pytest.mark.asyncio
+    async def test_prepare_photo_keeps_compliant_original(self):
+        """Тест отправки подходящего фото без изменений"""
+        data = jpeg_header(800, 600)
+
+        assert await ImageProcessor().prepare_photo(data) is data
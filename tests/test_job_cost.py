@@ -0,0 +1,34 @@
+from src.services.job_cost import UNKNOWN_COST, CostEstimator, url_kind
+
+
+class TestCostEstimator:
+    """Тесты оценки стоимости заданий"""
+
+    def test_url_kind(self):
+        """Тест определения вида ссылки"""
+        assert url_kind("https://www.tiktok.com/@user/video/123") == 'video'
+        assert url_kind("https://www.tiktok.com/@user/photo/123") == 'photo'
+        assert url_kind("https://www.instagram.com/reel/abc/") == 'reel'
+        assert url_kind("https://www.instagram.com/p/abc/") == 'post'
+        assert url_kind("https://pin.it/abc") == 'pin'
+        assert url_kind("https://example.com/") == 'other'
+
+    def test_defaults_and_content_length(self):
+        """Тест оценки без истории и по известному Content-Length"""
+        estimator = CostEstimator()
+        pin = estimator.estimate("https://pinterest.com/pin/1/", "Pinterest")
+        video = estimator.estimate("https://www.tiktok.com/@u/video/1", "TikTok")
+        assert pin < video
+        assert estimator.estimate("https://example.com/", "Other") == UNKNOWN_COST
+        assert estimator.estimate("https://pin.it/1", "Pinterest", content_length=5 * 1024 * 1024) == 5
+
+    def test_history(self):
+        """Тест учета фактических размеров"""
+        estimator = CostEstimator(max_urls=1, smoothing=0.5)
+        url = "https://www.tiktok.com/@u/video/1"
+        estimator.record(url, "TikTok", 40 * 1024 * 1024)
+        assert estimator.estimate(url, "TikTok") == 40
+
+        estimator.record("https://www.tiktok.com/@u/video/2", "TikTok", 20 * 1024 * 1024)
+        # Первый адрес вытеснен из LRU, остается среднее по виду ссылки
+        assert estimator.estimate(url, "TikTok") == 30
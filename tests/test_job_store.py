@@ -0,0 +1,217 @@
+import asyncio
+import time
+
+import pytest
+from src.services.download_scheduler import DownloadScheduler
+from src.services.job_runner import JobRunner
+from src.services.job_store import CANCELLED, DONE, FAILED, QUEUED, RUNNING, JobStore
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / 'jobs.sqlite3')
+
+
+class TestJobStore:
+    """Тесты постоянной очереди заданий"""
+
+    def test_add_is_idempotent(self, db_path):
+        """Тест идемпотентности по ключу"""
+        store = JobStore(db_path)
+        assert store.add('update:1', 1, 1, {'url': 'a'}) is not None
+        assert store.add('update:1', 1, 1, {'url': 'a'}) is None
+        assert store.exists('update:1')
+        store.close()
+
+    def test_wal_mode(self, db_path):
+        """Тест включения WAL"""
+        store = JobStore(db_path)
+        assert store.db.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+        store.close()
+
+    def test_unfinished_jobs_survive_restart(self, db_path):
+        """Тест продолжения заданий после перезапуска процесса"""
+        first = JobStore(db_path, lease_seconds=30)
+        job_id = first.add('update:1', 1, 10, {'url': 'a'})
+        assert first.start(job_id)
+        first.close()
+
+        # Пока аренда умершего процесса не истекла, задание никто не трогает
+        second = JobStore(db_path, lease_seconds=30)
+        assert second.claim(10) == []
+
+        second.db.execute('UPDATE jobs SET lease_until = ?', (time.time() - 1,))
+        jobs = second.claim(10)
+        assert [(job.key, job.payload, job.attempts) for job in jobs] == [('update:1', {'url': 'a'}, 1)]
+        assert second.start(job_id)
+        second.complete(job_id)
+        second.flush()
+        assert second.counts() == {DONE: 1}
+        second.close()
+
+    def test_only_owner_can_start(self, db_path):
+        """Тест того, что задание выполняет только арендовавший его воркер"""
+        owner = JobStore(db_path)
+        other = JobStore(db_path)
+        job_id = owner.add('update:1', 1, 1, {})
+        owner.flush()
+
+        assert not other.start(job_id)
+        assert owner.start(job_id)
+        owner.close()
+        other.close()
+
+    def test_unreserved_job_goes_to_any_worker(self, db_path):
+        """Тест передачи задания от фронтенда воркеру через общую базу"""
+        frontend = JobStore(db_path)
+        worker = JobStore(db_path)
+        job_id = frontend.add('update:1', 5, 5, {'url': 'a'}, reserve=False)
+        frontend.flush()
+        assert frontend.outstanding_for(5) == 1
+
+        assert [job.id for job in worker.claim(10)] == [job_id]
+        assert worker.start(job_id)
+        # Второй воркер то же задание уже не получит
+        assert frontend.claim(10) == []
+        frontend.close()
+        worker.close()
+
+    def test_retries_are_limited(self, db_path):
+        """Тест ограничения числа попыток"""
+        store = JobStore(db_path, max_attempts=2)
+        job_id = store.add('update:1', 1, 1, {})
+
+        store.start(job_id)
+        store.fail(job_id, 'boom')
+        assert store.counts() == {QUEUED: 1}
+
+        assert [job.id for job in store.claim(1)] == [job_id]
+        store.start(job_id)
+        store.fail(job_id, 'boom')
+        assert store.counts() == {FAILED: 1}
+        store.close()
+
+    def test_crashing_job_is_given_up(self, db_path):
+        """Тест отказа от задания, на котором процесс падает раз за разом"""
+        store = JobStore(db_path, max_attempts=1)
+        job_id = store.add('update:1', 1, 1, {})
+        store.start(job_id)
+        store.db.execute('UPDATE jobs SET lease_until = 0')
+
+        assert store.claim(1) == []
+        assert store.counts() == {FAILED: 1}
+        store.close()
+
+    def test_cancel_for_user_in_chat(self, db_path):
+        """Тест отмены заданий пользователя в чате"""
+        store = JobStore(db_path)
+        running = store.add('update:1', 1, 10, {'url': 'a'})
+        queued = store.add('update:2', 1, 10, {'url': 'b'})
+        other_chat = store.add('update:3', 1, 20, {'url': 'c'})
+        store.start(running)
+
+        jobs = store.cancel_for(1, 10)
+        assert [(job.id, job.payload) for job in jobs] == [(running, {'url': 'a'}), (queued, {'url': 'b'})]
+        assert store.cancelled([running, queued, other_chat]) == [running, queued]
+        assert store.outstanding_for(1) == 1
+
+        # Завершение или ошибка отмененного задания его не воскрешают
+        store.complete(running)
+        store.fail(running, 'boom')
+        assert store.counts() == {CANCELLED: 2, QUEUED: 1}
+        assert not store.start(queued)
+        assert [job.id for job in store.claim(10)] == []
+        store.close()
+
+
+class TestJobRunner:
+    """Тесты выполнения сохраненных заданий"""
+
+    @pytest.mark.asyncio
+    async def test_enqueue_runs_and_completes(self, db_path):
+        """Тест выполнения нового задания и отметки в базе"""
+        store = JobStore(db_path, commit_interval=0.01)
+        scheduler = DownloadScheduler(workers=1)
+        executed = []
+
+        async def execute(context, job):
+            assert store.counts() == {RUNNING: 1}
+            executed.append((context, job.payload['url']))
+
+        runner = JobRunner(store, scheduler, execute, poll_interval=0.01)
+        runner.start('bot')
+        assert runner.enqueue('update:1', 1, 1, {'url': 'a'}) is not None
+        assert runner.enqueue('update:1', 1, 1, {'url': 'a'}) is None
+
+        await scheduler.join()
+        assert executed == [('bot', 'a')]
+        assert store.counts() == {DONE: 1}
+
+        await runner.stop()
+        await scheduler.stop()
+        store.close()
+
+    @pytest.mark.asyncio
+    async def test_resumes_abandoned_jobs(self, db_path):
+        """Тест подхвата заданий, брошенных прошлым процессом"""
+        old = JobStore(db_path)
+        job_id = old.add('update:7', 1, 1, {'url': 'b'})
+        old.start(job_id)
+        old.db.execute('UPDATE jobs SET lease_until = 0')
+        old.close()
+
+        store = JobStore(db_path)
+        scheduler = DownloadScheduler(workers=1)
+        done = asyncio.Event()
+
+        async def execute(context, job):
+            done.set()
+
+        runner = JobRunner(store, scheduler, execute, poll_interval=0.01)
+        runner.start(None)
+        await asyncio.wait_for(done.wait(), timeout=1)
+        await scheduler.join()
+        assert store.counts() == {DONE: 1}
+
+        await runner.stop()
+        await scheduler.stop()
+        store.close()
+
+    @pytest.mark.asyncio
+    async def test_cancel_running_job(self, db_path):
+        """Тест отмены выполняющегося задания этим и другим процессом"""
+        store = JobStore(db_path, commit_interval=0.01)
+        scheduler = DownloadScheduler(workers=2)
+        started, cancelled = [], []
+
+        async def execute(context, job):
+            started.append(job.key)
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(job.key)
+                raise
+
+        runner = JobRunner(store, scheduler, execute, poll_interval=0.01)
+        runner.start('bot')
+        runner.enqueue('update:1', 1, 1, {})
+        runner.enqueue('update:2', 2, 2, {})
+        await asyncio.sleep(0.05)
+        assert sorted(started) == ['update:1', 'update:2']
+
+        assert [job.key for job in runner.cancel_for(1, 1)] == ['update:1']
+        await asyncio.sleep(0.01)
+        assert cancelled == ['update:1']
+
+        # Отмена из другого процесса подхватывается при опросе базы
+        frontend = JobStore(db_path)
+        frontend.cancel_for(2, 2)
+        await asyncio.sleep(0.05)
+        assert cancelled == ['update:1', 'update:2']
+        assert scheduler.running == 0
+        assert store.counts() == {CANCELLED: 2}
+
+        await runner.stop()
+        await scheduler.stop()
+        frontend.close()
+        store.close()
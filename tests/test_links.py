@@ -0,0 +1,49 @@
+from types import SimpleNamespace
+
+from src.services.links import extract_urls, might_contain_link
+
+
+def entity(type, offset, length, url=None):
+    return SimpleNamespace(type=type, offset=offset, length=length, url=url)
+
+
+class TestExtractUrls:
+    """Тесты извлечения ссылок из сообщения"""
+
+    def test_text_without_entities(self):
+        """Тест ссылок в обычном тексте с пунктуацией и повторами"""
+        text = "Смотри https://pin.it/a, и (https://www.tiktok.com/@u/video/1). Ещё раз https://pin.it/a"
+        assert extract_urls(text) == ['https://pin.it/a', 'https://www.tiktok.com/@u/video/1']
+
+    def test_entities_keep_input_order(self):
+        """Тест порядка ссылок из сущностей и скрытых text_link"""
+        text = "👍 раз https://pin.it/b два"
+        # Смещения в UTF-16: эмодзи занимает две единицы
+        entities = [
+            entity('url', 7, 16),
+            entity('text_link', 3, 3, url='https://instagram.com/p/X/'),
+            entity('bold', 24, 3),
+        ]
+        assert extract_urls(text, entities) == ['https://instagram.com/p/X/', 'https://pin.it/b']
+
+    def test_empty(self):
+        """Тест сообщения без ссылок"""
+        assert extract_urls(None) == []
+        assert extract_urls("просто текст") == []
+
+
+class TestMightContainLink:
+    """Тесты быстрой проверки на ссылки"""
+
+    def test_supported_hosts(self):
+        """Тест поиска доменов без учета регистра"""
+        assert might_contain_link("глянь https://WWW.TikTok.com/@u/video/1")
+        assert might_contain_link("pin.it/abc")
+        assert not might_contain_link("обычная переписка в группе https://example.com")
+        assert not might_contain_link(None)
+
+    def test_hidden_text_link(self):
+        """Тест ссылки, спрятанной за текстом"""
+        entities = [entity('text_link', 0, 3, url='https://instagram.com/p/X/')]
+        assert might_contain_link("тут", entities)
+        assert not might_contain_link("тут", [entity('text_link', 0, 3, url='https://example.com')])
@@ -0,0 +1,67 @@
+import asyncio
+
+import pytest
+from src.services.outbound_limiter import HIGH, LOW, NORMAL, OutboundLimiter
+
+
+class TestOutboundLimiter:
+    """Тесты лимитов исходящих запросов"""
+
+    @pytest.mark.asyncio
+    async def test_chat_limit_does_not_block_other_chats(self):
+        """Тест: исчерпанный лимит чата не задерживает другие чаты"""
+        limiter = OutboundLimiter(global_rate=100, global_burst=100, chat_rate=1, chat_burst=1)
+        await limiter.acquire(1)
+
+        blocked = asyncio.create_task(limiter.acquire(1))
+        await asyncio.wait_for(limiter.acquire(2), timeout=0.1)
+        assert not blocked.done()
+
+        await asyncio.wait_for(blocked, timeout=2)
+        await limiter.stop()
+
+    @pytest.mark.asyncio
+    async def test_priority_order(self):
+        """Тест выдачи разрешений по приоритету при исчерпанном общем лимите"""
+        limiter = OutboundLimiter(global_rate=50, global_burst=1, chat_rate=100, chat_burst=100)
+        await limiter.acquire(0)
+        order = []
+
+        async def send(name, priority):
+            await limiter.acquire(name, priority)
+            order.append(name)
+
+        tasks = [
+            asyncio.create_task(send('donate', LOW)),
+            asyncio.create_task(send('video', NORMAL)),
+            asyncio.create_task(send('reply', HIGH)),
+        ]
+        await asyncio.wait_for(asyncio.gather(*tasks), timeout=2)
+        assert order == ['reply', 'video', 'donate']
+        await limiter.stop()
+
+    @pytest.mark.asyncio
+    async def test_pause_after_retry_after(self):
+        """Тест паузы чата после ответа 429"""
+        limiter = OutboundLimiter(global_rate=100, global_burst=100, chat_rate=100, chat_burst=100)
+        limiter.pause(0.2, chat_id=1)
+
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        await asyncio.wait_for(limiter.acquire(2), timeout=0.1)
+        await asyncio.wait_for(limiter.acquire(1), timeout=1)
+        assert loop.time() - started >= 0.15
+        await limiter.stop()
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_is_skipped(self):
+        """Тест отмены ожидающего запроса"""
+        limiter = OutboundLimiter(global_rate=100, global_burst=100, chat_rate=1, chat_burst=1)
+        await limiter.acquire(1)
+        waiter = asyncio.create_task(limiter.acquire(1))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        await asyncio.sleep(0.01)
+        assert limiter.pending == 0
+        await limiter.stop()
@@ -0,0 +1,136 @@
+import pytest
+from src.services.page_scanner import (
+    scan_response, LD_JSON, MP4_URL, OG_DESCRIPTION, OG_IMAGE
+)
+
+
+class FakeContent:
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.served = 0
+
+    def iter_chunked(self, size):
+        return self
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self.served >= len(self.chunks):
+            raise StopAsyncIteration
+        self.served += 1
+        return self.chunks[self.served - 1]
+
+
+class FakeResponse:
+    """Минимальная замена aiohttp.ClientResponse для потокового чтения"""
+
+    def __init__(self, chunks):
+        self.content = FakeContent(chunks)
+        self.url = "https://example.com/page"
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class TestPageScanner:
+    """Тесты потокового сканера страниц"""
+
+    @pytest.mark.asyncio
+    async def test_stops_after_first_match(self):
+        """Тест остановки чтения на первом найденном совпадении"""
+        response = FakeResponse([
+            b'<html><head>',
+            b'<a href="https://cdn.example.com/video.mp4?x=1">',
+            b'<p>tail</p>' * 100,
+            b'<p>more</p>',
+        ])
+
+        result = await scan_response(response, {'video': MP4_URL})
+
+        assert result.get('video') == "https://cdn.example.com/video.mp4?x=1"
+        assert response.content.served == 2
+        assert response.closed
+        assert not result.complete
+
+    @pytest.mark.asyncio
+    async def test_match_across_chunk_boundary(self):
+        """Тест совпадения, разорванного между чанками"""
+        response = FakeResponse([
+            b'<meta property="og:ima',
+            b'ge" content="https://i.example.com/a.jpg?a=1&amp;b=2">',
+        ])
+
+        result = await scan_response(response, {'image': OG_IMAGE})
+
+        assert result.get('image') == "https://i.example.com/a.jpg?a=1&b=2"
+
+    @pytest.mark.asyncio
+    async def test_meta_content_before_property(self):
+        """Тест meta-тега с обратным порядком атрибутов"""
+        response = FakeResponse([b'<meta content="Post text" property="og:description"/>'])
+
+        result = await scan_response(response, {'description': OG_DESCRIPTION})
+
+        assert result.get('description') == "Post text"
+
+    @pytest.mark.asyncio
+    async def test_ld_json_is_not_unescaped(self):
+        """Тест сохранения JSON из ld+json без изменений"""
+        response = FakeResponse([
+            b'<script type="application/ld+json">{"name": "a &amp; b"}</script>',
+        ])
+
+        result = await scan_response(response, {'ld_json': LD_JSON})
+
+        assert result.get('ld_json') == '{"name": "a &amp; b"}'
+
+    @pytest.mark.asyncio
+    async def test_respects_byte_cap(self):
+        """Тест ограничения количества прочитанных байт"""
+        response = FakeResponse([b'x' * 1000] * 10 + [b'https://a.example.com/v.mp4'])
+
+        result = await scan_response(response, {'video': MP4_URL}, max_bytes=2500)
+
+        assert not result
+        assert result.bytes_read == 2500
+        assert response.closed
+
+    @pytest.mark.asyncio
+    async def test_match_ending_at_chunk_end_waits_for_next_chunk(self):
+        """Тест того, что значение, обрезанное концом чанка, не возвращается"""
+        response = FakeResponse([
+            b'<a href="https://cdn.example.com/video.mp4?token=abc',
+            b'def">',
+            b'<meta property="og:description" content="Hello wo',
+            b'rld">',
+        ])
+
+        result = await scan_response(response, {'video': MP4_URL, 'description': OG_DESCRIPTION}, stop_on_match=False)
+
+        assert result.get('video') == "https://cdn.example.com/video.mp4?token=abcdef"
+        assert result.get('description') == "Hello world"
+
+    @pytest.mark.asyncio
+    async def test_match_at_end_of_page(self):
+        """Тест совпадения в самом конце страницы"""
+        response = FakeResponse([b'<p>text</p>', b'https://cdn.example.com/v.mp4'])
+
+        result = await scan_response(response, {'video': MP4_URL})
+
+        assert result.get('video') == "https://cdn.example.com/v.mp4"
+        assert result.complete
+
+    @pytest.mark.asyncio
+    async def test_ld_json_larger_than_overlap(self):
+        """Тест ld+json блока, который больше окна пересканирования"""
+        body = b'{"items": [' + b'"x",' * 40_000 + b'"last"]}'
+        rest = b'ipt type="application/ld+json">' + body + b'</script></head>'
+        # Открывающий тег разрезан границей чанка, сам блок намного больше окна
+        chunks = [b'<html><head><scr'] + [rest[i:i + 16 * 1024] for i in range(0, len(rest), 16 * 1024)]
+        response = FakeResponse(chunks)
+
+        result = await scan_response(response, {'ld_json': LD_JSON}, overlap=1024)
+
+        assert result.get('ld_json') == body.decode()
@@ -0,0 +1,39 @@
+import os
+
+from src.services.download_scheduler import ADMIN, FREE, SUPPORTER
+from src.services.priority import MembershipCache, parse_ids
+
+
+class TestMembershipCache:
+    """Тесты классов приоритета пользователей"""
+
+    def test_parse_ids(self):
+        """Тест разбора списка id"""
+        assert parse_ids("1, 2 3,,x") == frozenset({1, 2, 3})
+        assert parse_ids(None) == frozenset()
+
+    def test_class_for(self):
+        """Тест определения класса по спискам"""
+        cache = MembershipCache(admins={1}, supporters={1, 2})
+        assert cache.class_for(1) == ADMIN
+        assert cache.class_for(2) == SUPPORTER
+        assert cache.class_for(3) == FREE
+
+    def test_supporters_file_reloaded_on_change(self, tmp_path):
+        """Тест перечитывания файла поддержавших по mtime не чаще раза в ttl"""
+        path = tmp_path / "supporters.txt"
+        path.write_text("10\n11\n")
+        cache = MembershipCache(path=str(path), ttl=60)
+        assert cache.class_for(10, now=0) == SUPPORTER
+
+        path.write_text("12\n")
+        os.utime(path, (1, 1))
+        assert cache.class_for(12, now=30) == FREE
+        assert cache.class_for(12, now=61) == SUPPORTER
+        assert cache.class_for(10, now=61) == FREE
+
+    def test_missing_file(self, tmp_path):
+        """Тест отсутствующего файла поддержавших"""
+        cache = MembershipCache(supporters={5}, path=str(tmp_path / "missing.txt"))
+        assert cache.class_for(5) == SUPPORTER
+        assert cache.class_for(6) == FREE
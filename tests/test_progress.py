@@ -0,0 +1,107 @@
+import asyncio
+
+import pytest
+from src.services.progress import UPLOAD, EditBudget, ProgressReporter, current_progress, report
+
+
+def make_reporter(edits, actions, budget=None, **kwargs):
+    async def edit(text):
+        edits.append(text)
+
+    async def chat_action(action):
+        actions.append(action)
+
+    return ProgressReporter(
+        chat_id=1,
+        edit=edit,
+        chat_action=chat_action,
+        render=lambda state: f"{state.stage}:{state.received}",
+        budget=budget or EditBudget(chat_interval=0.01, global_rate=1000),
+        **kwargs,
+    )
+
+
+class TestEditBudget:
+    """Тесты бюджета правок"""
+
+    def test_chat_and_global_limits(self):
+        """Тест лимита на чат и общего лимита"""
+        budget = EditBudget(chat_interval=3, global_rate=2)
+        assert budget.allow(1, now=0)
+        assert not budget.allow(1, now=0.1)
+        assert budget.allow(2, now=0.1)
+        # Общее ведро исчерпано: третий чат ждет
+        assert not budget.allow(3, now=0.1)
+        assert budget.allow(1, now=3.5)
+
+
+class TestProgressReporter:
+    """Тесты репортера хода загрузки"""
+
+    @pytest.mark.asyncio
+    async def test_events_are_coalesced(self):
+        """Тест объединения частых событий в редкие правки"""
+        edits, actions = [], []
+        async with make_reporter(edits, actions, interval=0.05, action_interval=10) as reporter:
+            assert current_progress.get() is reporter
+            for received in range(1, 101):
+                report(received=received)
+                await asyncio.sleep(0.001)
+            await asyncio.sleep(0.12)
+        assert current_progress.get() is None
+
+        # Показывается последнее состояние, а не каждое событие
+        assert 1 <= len(edits) <= 5
+        assert edits[-1] == 'download:100'
+        assert actions == ['upload_document']
+
+    @pytest.mark.asyncio
+    async def test_no_edit_without_changes(self):
+        """Тест отсутствия правок без новых событий"""
+        edits, actions = [], []
+        async with make_reporter(edits, actions, interval=0.01, action_interval=0.02):
+            await asyncio.sleep(0.1)
+        assert edits == []
+        # Chat action продлевается, даже когда текст не меняется
+        assert len(actions) >= 2
+
+    @pytest.mark.asyncio
+    async def test_edit_limits(self):
+        """Тест ограничения числа правок и бюджета"""
+        edits, actions = [], []
+        async with make_reporter(edits, actions, interval=0.01, action_interval=10, max_edits=2):
+            for received in range(1, 6):
+                report(received=received)
+                await asyncio.sleep(0.03)
+        assert len(edits) == 2
+
+        edits.clear()
+        budget = EditBudget(chat_interval=10, global_rate=1000)
+        budget.allow(1)
+        async with make_reporter(edits, actions, budget=budget, interval=0.01, action_interval=10):
+            report(stage=UPLOAD)
+            await asyncio.sleep(0.05)
+        assert edits == []
+
+    @pytest.mark.asyncio
+    async def test_failed_edit_does_not_stop_reporting(self):
+        """Тест устойчивости к ошибкам Telegram"""
+        calls = []
+
+        async def edit(text):
+            calls.append(text)
+            raise RuntimeError("message is not modified")
+
+        async def chat_action(action):
+            raise RuntimeError("chat not found")
+
+        reporter = ProgressReporter(
+            chat_id=1, edit=edit, chat_action=chat_action, render=lambda state: str(state.received),
+            budget=EditBudget(chat_interval=0.01, global_rate=1000), interval=0.01, action_interval=0.01,
+        )
+        async with reporter:
+            report(received=1)
+            await asyncio.sleep(0.05)
+            report(received=2)
+            await asyncio.sleep(0.05)
+        assert calls == ['1', '2']
@@ -0,0 +1,85 @@
+from src.services.rate_limiter import FrequencyCap, KeyedBuckets, RateLimiter, TokenBucket
+
+
+class TestTokenBucket:
+    """Тесты ведра токенов"""
+
+    def test_burst_then_refill(self):
+        """Тест пачки запросов и пополнения со временем"""
+        bucket = TokenBucket(rate=1, burst=2, now=0)
+
+        for _ in range(2):
+            assert bucket.can_take(now=0)
+            bucket.take()
+        assert not bucket.can_take(now=0)
+        assert bucket.retry_after() == 1
+
+        assert bucket.can_take(now=1)
+        # Ведро не наполняется выше burst
+        assert bucket.can_take(now=100)
+        assert bucket.tokens == 2
+
+    def test_keyed_buckets_evict_oldest(self):
+        """Тест вытеснения давно неиспользованных ключей"""
+        buckets = KeyedBuckets(rate=1, burst=1, max_keys=2)
+        buckets.get('a')
+        buckets.get('b')
+        buckets.get('a')
+        buckets.get('c')
+
+        assert len(buckets) == 2
+        assert 'b' not in buckets._buckets
+
+
+class TestRateLimiter:
+    """Тесты лимитов на пользователя, чат и бота"""
+
+    def make_limiter(self):
+        return RateLimiter(
+            user_rate=0.1, user_burst=2,
+            chat_rate=1, chat_burst=3,
+            global_rate=10, global_burst=100,
+        )
+
+    def test_user_limit(self):
+        """Тест лимита на пользователя"""
+        limiter = self.make_limiter()
+        assert limiter.acquire(1, 1, now=0) is None
+        assert limiter.acquire(1, 1, now=0) is None
+        assert limiter.acquire(1, 1, now=0) == RateLimiter.USER
+        # Другой пользователь не страдает
+        assert limiter.acquire(2, 2, now=0) is None
+        assert limiter.acquire(1, 1, now=10) is None
+
+    def test_chat_limit_does_not_spend_user_tokens(self):
+        """Тест лимита на чат без списания токенов отклоненного запроса"""
+        limiter = self.make_limiter()
+        for user_id in range(3):
+            assert limiter.acquire(user_id, -100, now=0) is None
+        assert limiter.acquire(3, -100, now=0) == RateLimiter.CHAT
+
+        # Отклоненный запрос не потратил токен пользователя 3
+        assert limiter.users.get(3).tokens == 2
+
+    def test_global_limit(self):
+        """Тест общего лимита бота"""
+        limiter = RateLimiter(10, 10, 10, 10, global_rate=1, global_burst=1)
+        assert limiter.acquire(1, 1, now=0) is None
+        assert limiter.acquire(2, 2, now=0) == RateLimiter.GLOBAL
+
+
+class TestFrequencyCap:
+    """Тесты ограничения частоты событий"""
+
+    def test_allow_once_per_interval(self):
+        """Тест: событие разрешено не чаще раза в interval секунд"""
+        cap = FrequencyCap(interval=100, max_keys=2)
+        assert cap.allow(1, now=0)
+        assert not cap.allow(1, now=50)
+        assert cap.allow(2, now=50)
+        assert cap.allow(1, now=100)
+
+        # Самый давний ключ вытесняется
+        assert cap.allow(3, now=100)
+        assert len(cap) == 2
+        assert cap.allow(2, now=101)
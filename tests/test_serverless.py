@@ -0,0 +1,45 @@
+import json
+
+import pytest
+
+from api import index as vercel_api
+
+
+class TestLambdaHandler:
+    """Тесты serverless-обработчика Vercel"""
+
+    def test_drains_before_loop_closes(self, monkeypatch):
+        """Тест ожидания фоновых загрузок до закрытия цикла событий"""
+        calls = []
+
+        async def handle_webhook_update(body):
+            calls.append(('update', body['update_id']))
+
+        async def drain():
+            calls.append(('drain', None))
+
+        monkeypatch.setattr(vercel_api.bot_instance, 'handle_webhook_update', handle_webhook_update)
+        monkeypatch.setattr(vercel_api.bot_instance, 'drain', drain)
+
+        result = vercel_api.lambda_handler(
+            {'httpMethod': 'POST', 'body': json.dumps({'update_id': 7})}, None
+        )
+
+        assert result['statusCode'] == 200
+        assert calls == [('update', 7), ('drain', None)]
+
+
+class TestDrain:
+    """Тесты ожидания фоновой работы перед закрытием цикла событий"""
+
+    @pytest.mark.asyncio
+    async def test_drain_commits_job_store(self):
+        """Тест коммита отложенных записей очереди заданий"""
+        from bot.handlers.media import job_store
+
+        job_store.add('drain-test', 1, 1, {'url': 'https://example.com'})
+        assert job_store.db.in_transaction
+
+        await vercel_api.bot_instance.drain()
+
+        assert not job_store.db.in_transaction
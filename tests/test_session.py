@@ -0,0 +1,118 @@
+import os
+from urllib.parse import unquote, urlparse
+
+import pytest
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.methods import SendMediaGroup, SendMessage, SendVideo
+from aiogram.types import BufferedInputFile, InputMediaPhoto, InputMediaVideo
+
+from bot import session
+from bot.session import LocalOutbox, TunedAiohttpSession, max_upload_mb, payload_size
+
+
+class TestLocalOutbox:
+    """Тесты отправки файлов через локальный сервер Bot API"""
+
+    @pytest.mark.asyncio
+    async def test_file_uri_removed_after_send(self, tmp_path):
+        """Тест записи файла для file:// и его удаления после отправки"""
+        outbox = LocalOutbox(str(tmp_path / 'outbox'))
+
+        async with outbox.file(b'video', 'video.mp4') as uri:
+            assert uri.startswith('file://')
+            path = unquote(urlparse(uri).path)
+            assert path.endswith('_video.mp4')
+            with open(path, 'rb') as f:
+                assert f.read() == b'video'
+        assert not os.path.exists(path)
+
+    @pytest.mark.asyncio
+    async def test_file_removed_on_error(self, tmp_path):
+        """Тест удаления файла, если отправка упала"""
+        outbox = LocalOutbox(str(tmp_path))
+
+        with pytest.raises(RuntimeError):
+            async with outbox.file(b'photo', 'photo.jpg') as uri:
+                path = unquote(urlparse(uri).path)
+                raise RuntimeError("sendPhoto failed")
+        assert not os.path.exists(path)
+        assert os.listdir(tmp_path) == []
+
+    @pytest.mark.asyncio
+    async def test_buffered_without_directory(self):
+        """Тест обычной загрузки файла при публичном Bot API"""
+        async with LocalOutbox().file(b'photo', 'photo.jpg') as input_file:
+            assert isinstance(input_file, BufferedInputFile)
+            assert input_file.data == b'photo'
+            assert input_file.filename == 'photo.jpg'
+
+    def test_upload_limit_for_local_api(self, monkeypatch):
+        """Тест лимита размера файла для публичного и локального сервера"""
+        monkeypatch.setattr(session.settings, 'bot_api_url', None)
+        monkeypatch.setattr(session.settings, 'max_file_size_mb', 50)
+        monkeypatch.setattr(session.settings, 'local_api_max_file_size_mb', 2000)
+        assert max_upload_mb() == 50
+
+        monkeypatch.setattr(session.settings, 'bot_api_url', 'http://localhost:8081')
+        assert max_upload_mb() == 2000
+
+
+class TestTunedSession:
+    """Тесты сессии Bot API для больших загрузок"""
+
+    def test_payload_size(self, tmp_path):
+        """Тест подсчета байт файлов в запросе"""
+        video = BufferedInputFile(b'v' * 300, 'video.mp4')
+        assert payload_size(SendVideo(chat_id=1, video=video)) == 300
+        assert payload_size(SendMessage(chat_id=1, text='hi')) == 0
+
+        album = SendMediaGroup(chat_id=1, media=[
+            InputMediaPhoto(media=BufferedInputFile(b'p' * 100, 'photo.jpg')),
+            InputMediaVideo(media=BufferedInputFile(b'v' * 200, 'video.mp4')),
+            InputMediaPhoto(media='AgACAgIAAxkBAAI'),
+        ])
+        assert payload_size(album) == 300
+
+        path = tmp_path / 'video file.mp4'
+        path.write_bytes(b'x' * 1234)
+        assert payload_size(SendVideo(chat_id=1, video=path.as_uri())) == 1234
+        # Уже удаленный файл не ломает подсчет
+        assert payload_size(SendVideo(chat_id=1, video=(tmp_path / 'gone.mp4').as_uri())) == 0
+
+    def test_upload_timeout_scales_and_clamps(self):
+        """Тест таймаута, растущего с размером файла, но не выше max_timeout"""
+        tuned = TunedAiohttpSession(base_timeout=10, min_upload_rate=1000, max_timeout=60)
+        assert tuned.upload_timeout(0) == 10
+        assert tuned.upload_timeout(20_000) == 30
+        assert tuned.upload_timeout(10_000_000) == 60
+
+    @pytest.mark.asyncio
+    async def test_stats_and_hooks(self, monkeypatch):
+        """Тест статистики по методам и хуков при успехе и ошибке"""
+        timeouts = []
+
+        async def make_request(self, bot, method, timeout=None):
+            timeouts.append(timeout)
+            if isinstance(method, SendMessage):
+                raise RuntimeError("network down")
+            return 'sent'
+
+        monkeypatch.setattr(AiohttpSession, 'make_request', make_request)
+        tuned = TunedAiohttpSession(base_timeout=10, min_upload_rate=100, max_timeout=60)
+        calls = []
+        tuned.add_hook(lambda name, size, seconds, ok: calls.append((name, size, ok)))
+        tuned.add_hook(lambda *args: 1 / 0)
+        bot = Bot('1:test', session=tuned)
+
+        video = SendVideo(chat_id=1, video=BufferedInputFile(b'v' * 1000, 'video.mp4'))
+        assert await tuned.make_request(bot, video) == 'sent'
+        with pytest.raises(RuntimeError):
+            await tuned.make_request(bot, SendMessage(chat_id=1, text='hi'))
+
+        # Таймаут задается только запросам с файлами
+        assert timeouts == [20, None]
+        # Сбой одного хука не мешает остальным и самому запросу
+        assert calls == [('SendVideo', 1000, True), ('SendMessage', 0, False)]
+        assert (tuned.stats['SendVideo'].calls, tuned.stats['SendVideo'].bytes, tuned.stats['SendVideo'].errors) == (1, 1000, 0)
+        assert (tuned.stats['SendMessage'].calls, tuned.stats['SendMessage'].errors) == (1, 1)
@@ -0,0 +1,35 @@
+from src.services.update_dedup import RecentUpdates
+
+
+class TestRecentUpdates:
+    """Тесты окна недавних update_id"""
+
+    def test_window_is_bounded(self):
+        """Тест вытеснения самых старых идентификаторов"""
+        seen = RecentUpdates(capacity=3)
+        for update_id in range(1, 5):
+            seen.add(update_id)
+
+        assert len(seen) == 3
+        assert 1 not in seen
+        assert all(update_id in seen for update_id in (2, 3, 4))
+
+    def test_repeated_add_is_noop(self):
+        """Тест повторного добавления того же идентификатора"""
+        seen = RecentUpdates(capacity=2)
+        seen.add(1)
+        seen.add(1)
+        seen.add(2)
+        assert 1 in seen and 2 in seen
+
+    def test_persisted_between_restarts(self, tmp_path):
+        """Тест сохранения окна на диск"""
+        path = str(tmp_path / 'seen.bin')
+        seen = RecentUpdates(capacity=3, path=path, save_every=100)
+        for update_id in (10, 11, 12, 13):
+            seen.add(update_id)
+        seen.flush()
+
+        restored = RecentUpdates(capacity=2, path=path)
+        assert 10 not in restored and 11 not in restored
+        assert 12 in restored and 13 in restored
@@ -0,0 +1,66 @@
+import asyncio
+
+import pytest
+from src.services.update_queue import UpdateQueue
+
+
+class TestUpdateQueue:
+    """Тесты очереди обновлений webhook"""
+
+    @pytest.mark.asyncio
+    async def test_submit_returns_before_processing(self):
+        """Тест немедленного приема обновления и фоновой обработки"""
+        gate = asyncio.Event()
+        processed = []
+
+        async def handler(item):
+            await gate.wait()
+            processed.append(item)
+
+        queue = UpdateQueue(handler, workers=2, max_size=10)
+        assert queue.submit(1)
+        assert queue.submit(2)
+        assert processed == []
+
+        gate.set()
+        await queue.join()
+        assert sorted(processed) == [1, 2]
+        await queue.stop()
+
+    @pytest.mark.asyncio
+    async def test_backpressure_when_full(self):
+        """Тест отказа при переполненной очереди"""
+        gate = asyncio.Event()
+
+        async def handler(item):
+            await gate.wait()
+
+        queue = UpdateQueue(handler, workers=1, max_size=1)
+        assert queue.submit(1)
+        await asyncio.sleep(0)
+        # Воркер занят первым обновлением, второе заполняет очередь
+        assert queue.submit(2)
+        assert not queue.submit(3)
+
+        gate.set()
+        await queue.join()
+        assert queue.submit(4)
+        await queue.join()
+        await queue.stop()
+
+    @pytest.mark.asyncio
+    async def test_handler_errors_do_not_stop_workers(self):
+        """Тест устойчивости воркеров к ошибкам обработчика"""
+        processed = []
+
+        async def handler(item):
+            if item == 'bad':
+                raise ValueError(item)
+            processed.append(item)
+
+        queue = UpdateQueue(handler, workers=1)
+        queue.submit('bad')
+        queue.submit('good')
+        await queue.join()
+        assert processed == ['good']
+        await queue.stop()
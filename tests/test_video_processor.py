@@ -0,0 +1,54 @@
+import asyncio
+import struct
+import pytest
+from src.services.video_processor import VideoProcessor, needs_faststart
+
+
+def box(box_type, payload=b''):
+    return struct.pack('>I4s', 8 + len(payload), box_type) + payload
+
+
+class TestVideoProcessor:
+    """Тесты постобработки видео"""
+
+    def test_faststart_not_needed_when_moov_first(self):
+        """Тест файла, уже оптимизированного для стриминга"""
+        data = box(b'ftyp', b'isom') + box(b'moov', b'\x00' * 16) + box(b'mdat', b'\x00' * 64)
+
+        assert not needs_faststart(data)
+
+    def test_faststart_needed_when_mdat_first(self):
+        """Тест файла с moov в конце"""
+        data = box(b'ftyp', b'isom') + box(b'mdat', b'\x00' * 64) + box(b'moov', b'\x00' * 16)
+
+        assert needs_faststart(data)
+
+    def test_faststart_with_free_box_and_garbage(self):
+        """Тест пропуска служебных атомов и нераспознанных данных"""
+        assert needs_faststart(box(b'ftyp') + box(b'free', b'\x00' * 4) + box(b'mdat'))
+        assert not needs_faststart(b'not a video')
+
+    @pytest.mark.asyncio
+    async def test_fit_video_without_ffmpeg(self, monkeypatch):
+        """Тест поведения без установленного ffmpeg"""
+        processor = VideoProcessor()
+        monkeypatch.setattr('src.services.video_processor.shutil.which', lambda name: None)
+
+        assert await processor.fit_video(b'x' * 100, max_bytes=1000) == [b'x' * 100]
+        assert await processor.fit_video(b'x' * 2000, max_bytes=1000) == []
+
+    @pytest.mark.asyncio
+    async def test_fit_video_ffmpeg_timeout(self, monkeypatch):
+        """Тест отправки оригинала, если ffmpeg не уложился в таймаут"""
+        processor = VideoProcessor()
+        monkeypatch.setattr('src.services.video_processor.shutil.which', lambda name: '/usr/bin/' + name)
+
+        async def timeout(*args):
+            raise asyncio.TimeoutError()
+
+        monkeypatch.setattr(processor, '_run', timeout)
+        # Видео с moov в конце требует faststart
+        video = box(b'ftyp', b'isom') + box(b'mdat', b'\x00' * 64) + box(b'moov', b'\x00' * 16)
+
+        assert await processor.fit_video(video, max_bytes=1000) == [video]
+        assert await processor.fit_video(b'x' * 2000, max_bytes=1000) == []
@@ -0,0 +1,181 @@
+import asyncio
+import json
+
+import pytest
+from aiogram import Bot
+from aiogram.methods import SendMessage, SendPhoto
+from aiogram.types import BufferedInputFile, KeyboardButton, ReplyKeyboardMarkup, Update
+
+from bot.webhook_reply import WebhookReply, feed_with_reply, serialize_method
+
+
+@pytest.fixture
+def bot():
+    # Запросы в тестах не отправляются: сессия нужна только для сериализации
+    return Bot('1:test')
+
+UPDATE = Update(update_id=1)
+
+
+class FakeDispatcher:
+    """Диспетчер, возвращающий заданный запрос и запоминающий отправленные"""
+
+    def __init__(self, result):
+        self.result = result
+        self.sent = []
+
+    async def feed_update(self, bot, update):
+        return self.result
+
+    async def silent_call_request(self, bot, result):
+        self.sent.append(result)
+
+
+def send_message():
+    return SendMessage(
+        chat_id=1,
+        text="Привет",
+        reply_markup=ReplyKeyboardMarkup(keyboard=[[KeyboardButton(text="❓ Помощь")]], resize_keyboard=True),
+    )
+
+
+class TestSerializeMethod:
+    """Тесты преобразования запроса в тело ответа webhook"""
+
+    @pytest.mark.asyncio
+    async def test_send_message_with_markup(self, bot):
+        """Тест JSON-представления sendMessage с клавиатурой"""
+        payload = serialize_method(bot, send_message())
+
+        assert payload['method'] == 'sendMessage'
+        # Значения готовятся так же, как для multipart-запроса aiogram
+        assert str(payload['chat_id']) == '1'
+        assert payload['text'] == "Привет"
+        markup = payload['reply_markup']
+        markup = json.loads(markup) if isinstance(markup, str) else markup
+        assert markup['keyboard'] == [[{'text': "❓ Помощь"}]]
+        assert markup['resize_keyboard'] is True
+        # Ответ webhook должен сериализоваться в JSON
+        json.dumps(payload)
+
+    @pytest.mark.asyncio
+    async def test_method_with_file_is_not_serialized(self, bot):
+        """Тест отказа для запроса с файлом"""
+        method = SendPhoto(chat_id=1, photo=BufferedInputFile(b'jpeg', 'photo.jpg'))
+        assert serialize_method(bot, method) is None
+
+
+class TestWebhookReply:
+    """Тесты места для ответа в теле webhook"""
+
+    @pytest.mark.asyncio
+    async def test_first_method_wins(self, bot):
+        """Тест того, что место занимает только первый запрос"""
+        reply = WebhookReply()
+        assert reply.offer(bot, send_message())
+        assert not reply.offer(bot, send_message())
+        payload = await reply.wait(1)
+        assert payload['method'] == 'sendMessage'
+
+    @pytest.mark.asyncio
+    async def test_closed_reply_is_empty(self, bot):
+        """Тест пустого ответа, если обработчик ничего не вернул"""
+        reply = WebhookReply()
+        reply.close()
+        assert await reply.wait(1) is None
+        assert not reply.offer(bot, send_message())
+
+
+class TestFeedWithReply:
+    """Тесты обработки обновления с ответом в теле webhook"""
+
+    @pytest.mark.asyncio
+    async def test_method_goes_to_webhook_response(self, bot):
+        """Тест ответа в теле webhook без отдельного запроса"""
+        dp = FakeDispatcher(send_message())
+        reply = WebhookReply()
+        await feed_with_reply(dp, bot, UPDATE, reply)
+        assert (await reply.wait(1))['method'] == 'sendMessage'
+        assert dp.sent == []
+
+    @pytest.mark.asyncio
+    async def test_sent_after_timeout(self, bot):
+        """Тест обычной отправки, если ответ webhook уже ушел по таймауту"""
+        dp = FakeDispatcher(send_message())
+        reply = WebhookReply()
+        assert await reply.wait(0.01) is None
+        await feed_with_reply(dp, bot, UPDATE, reply)
+        assert dp.sent == [dp.result]
+
+    @pytest.mark.asyncio
+    async def test_sent_when_slot_taken(self, bot):
+        """Тест обычной отправки, если место уже занято"""
+        dp = FakeDispatcher(send_message())
+        reply = WebhookReply()
+        reply.offer(bot, send_message())
+        await feed_with_reply(dp, bot, UPDATE, reply)
+        assert dp.sent == [dp.result]
+
+    @pytest.mark.asyncio
+    async def test_file_and_no_reply_are_sent(self, bot):
+        """Тест обычной отправки запроса с файлом и без места для ответа"""
+        photo = SendPhoto(chat_id=1, photo=BufferedInputFile(b'jpeg', 'photo.jpg'))
+        dp = FakeDispatcher(photo)
+        reply = WebhookReply()
+        await feed_with_reply(dp, bot, UPDATE, reply)
+        assert dp.sent == [photo]
+        assert await reply.wait(1) is None
+
+        dp = FakeDispatcher(send_message())
+        await feed_with_reply(dp, bot, UPDATE)
+        assert dp.sent == [dp.result]
+
+
+class SlowDownloader:
+    """Загрузчик, который не завершается, пока тест его не отпустит"""
+
+    def __init__(self):
+        self.started = asyncio.Event()
+        self.release = asyncio.Event()
+
+    def detect_platform(self, url):
+        return 'tiktok'
+
+    async def download_media(self, url):
+        self.started.set()
+        await self.release.wait()
+        return None, None
+
+
+class TestModernBotLinks:
+    """Тесты того, что обработка ссылки не держит ответ webhook"""
+
+    @pytest.mark.asyncio
+    async def test_link_is_queued_not_awaited(self):
+        """Тест постановки загрузки в очередь без ожидания ее завершения"""
+        from types import SimpleNamespace
+        from bot.modern_bot import ModernTelegramBot
+
+        modern = ModernTelegramBot()
+        modern.downloader = SlowDownloader()
+        answers = []
+
+        async def answer(text, **kwargs):
+            answers.append(text)
+            return SimpleNamespace(edit_text=answer)
+
+        message = SimpleNamespace(
+            text='https://www.tiktok.com/@user/video/1',
+            from_user=SimpleNamespace(id=1),
+            chat=SimpleNamespace(id=1),
+            answer=answer,
+        )
+        result = await asyncio.wait_for(modern._handle_media_link(message), 1)
+        assert result is None
+
+        # Загрузка идет в очереди уже после того, как обработчик вернулся
+        await asyncio.wait_for(modern.downloader.started.wait(), 1)
+        modern.downloader.release.set()
+        await asyncio.wait_for(modern.downloads.join(), 1)
+        await modern.downloads.stop()
+        await modern.admission.lag_monitor.stop()
@@ -0,0 +1,50 @@
+import asyncio
+import io
+import sys
+
+import pytest
+
+from bot.workers import WorkerProcesses
+
+
+def transcode_in_worker(index: int):
+    """Подготовка фото в процессе-воркере: код выхода 0, если фото пережато в JPEG"""
+    from PIL import Image
+    from services.image_processor import ImageProcessor
+
+    buffer = io.BytesIO()
+    Image.new('RGB', (4000, 100), 'red').save(buffer, 'PNG')
+    processor = ImageProcessor(max_workers=1)
+    result = asyncio.run(processor.prepare_photo(buffer.getvalue()))
+    processor.shutdown(wait=True)
+    sys.exit(0 if result[:2] == b'\xff\xd8' else 1)
+
+
+def wait_forever(index: int):
+    import time
+    while True:
+        time.sleep(1)
+
+
+class TestWorkerProcesses:
+    """Тесты процессов-воркеров загрузок"""
+
+    @pytest.mark.asyncio
+    async def test_worker_can_use_process_pool(self):
+        """Тест пережатия фото пулом процессов внутри воркера"""
+        workers = WorkerProcesses(1, target=transcode_in_worker)
+        workers._spawn(0)
+        process = workers._processes[0]
+        await asyncio.to_thread(process.join, 60)
+        assert process.exitcode == 0
+
+    @pytest.mark.asyncio
+    async def test_stop_terminates_workers(self):
+        """Тест остановки воркеров вместе с фронтендом"""
+        workers = WorkerProcesses(2, target=wait_forever)
+        workers.start()
+        processes = list(workers._processes)
+        assert all(process.is_alive() for process in processes)
+
+        await workers.stop()
+        assert not any(process.is_alive() for process in processes)
@@ -11,7 +11,7 @@ echo.
 echo Устанавливаю webhook...
 curl -X POST "https://api.telegram.org/bot%TOKEN%/setWebhook" ^
   -H "Content-Type: application/json" ^
-  -d "{\"url\": \"https://telegram-dc7abuxg5-mihails-projects-b1dd402a.vercel.app/api/webhook\", \"drop_pending_updates\": true}"
+  -d "{\"url\": \"https://telegram-dc7abuxg5-mihails-projects-b1dd402a.vercel.app/api/webhook\", \"drop_pending_updates\": true, \"allowed_updates\": [\"message\", \"inline_query\"]}"
 
 echo.
 echo Проверка статуса webhook...
@@ -18,6 +18,8 @@ $apiUrl = "https://api.telegram.org/bot$token/setWebhook"
 $body = @{
     url = $webhookUrl
     drop_pending_updates = $true
+    # Только те типы обновлений, которые обрабатывает бот
+    allowed_updates = @("message", "inline_query")
 } | ConvertTo-Json
 
 try {